@@ -1,18 +1,27 @@
 import os
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from telegram.ext import Updater, CommandHandler, MessageHandler, CallbackQueryHandler, Filters
-from handlers.start import start, settings_menu, batch_menu, bot_stats
+from handlers.start import settings_menu, batch_menu, bot_stats
 from handlers.file_handler import handle_file
-from handlers.clone_bot import create_clone_bot, view_clone_bots, handle_clone_input, handle_visibility_selection, handle_usage_selection
-from handlers.custom_caption import set_custom_caption, set_custom_buttons, handle_caption_input, handle_buttons_input
+from handlers.clone_bot import create_clone_bot, view_clone_bots, handle_visibility_selection, handle_usage_selection
+from handlers.custom_caption import set_custom_caption, set_custom_buttons
 from handlers.error import error_handler
-from handlers.search import search
-from handlers.request import handle_request
+from handlers.search import search, handle_search_page
+from handlers.router import route_text
 from handlers.tutorial import tutorial
-from handlers.settings import handle_settings, handle_settings_input
-from handlers.broadcast import broadcast, handle_broadcast_input, cancel_broadcast
-from handlers.batch import batch, handle_batch_input, handle_batch_edit, cancel_batch
-from handlers.filestore import store_file, genlink, batchgen, handle_genlink_selection, handle_batchgen_selection, handle_filestore_link  # Updated import
+from handlers.settings import handle_settings
+from handlers.broadcast import broadcast, cancel_broadcast
+from handlers.batch import batch, handle_batch_edit, cancel_batch
+from handlers.filestore import store_file, genlink, batchgen, handle_genlink_selection, handle_batchgen_selection, handle_start  # Updated import
+from handlers.clone_graph import clone_bot_data, install_clone_graph, clone_allowed_updates
+from utils.bot_identity import remember_identity, identity_from_entry
+from utils.broadcaster import resume_broadcast, stop_broadcast
+from features.auto_delete import get_deletion_scheduler
+from utils.clone_reloader import CloneReloader, CLONE_RELOAD_INTERVAL
+from utils.clone_runtime import get_clone_runtime, get_webhook_url, dispatcher_allowed_updates, CLONE_HIBERNATE_AFTER, CLONE_BOOT_CONCURRENCY
+from utils.clone_supervisor import run_shard, start_clone_supervisor, shard_storage_problem, CLONE_PROCESSES
 
 # 🌟 Logging setup for Render
 logging.basicConfig(
@@ -24,13 +33,27 @@ logger = logging.getLogger(__name__)
 # Global list to keep track of running bot instances
 bot_instances = []
 
-def start_cloned_bot(token, admin_ids):
-    """🤖 Start a cloned bot instance dynamically with visibility restrictions."""
+def build_clone_dispatcher(token, bot_info, admin_ids):
+    """🧩 Build a cloned bot's dispatcher: the shared handler graph for its usage plus its own bot_data."""
+    # All clones share one event loop and handler pool instead of an Updater each
+    runtime = get_clone_runtime()
+    clone_dispatcher = runtime.make_dispatcher(runtime.make_bot(token))
+    clone_dispatcher.bot_data.update(clone_bot_data(bot_info, admin_ids))
+    install_clone_graph(clone_dispatcher, clone_dispatcher.bot_data["usage"])
+    return clone_dispatcher
+
+def start_cloned_bot(token, admin_ids, lazy=False, bot_info=None):
+    """🤖 Start a cloned bot instance dynamically with visibility restrictions.
+
+    With `lazy`, the clone is registered hibernated: no handlers are built
+    and no API call is made until its first update arrives. Pass its
+    cloned_bots entry as `bot_info` to skip looking it up.
+    """
     try:
-        # Fetch cloned bots to get visibility and standalone status
-        from utils.db_channel import get_cloned_bots
-        cloned_bots = get_cloned_bots()
-        bot_info = next((bot for bot in cloned_bots if bot["token"] == token), None)
+        if bot_info is None:
+            # Fetch cloned bots to get visibility and standalone status
+            from utils.db_channel import get_cloned_bots
+            bot_info = next((bot for bot in get_cloned_bots() if bot["token"] == token), None)
         if not bot_info:
             raise ValueError("Bot not found in cloned_bots")
 
@@ -39,48 +62,23 @@ def start_cloned_bot(token, admin_ids):
             logger.info(f"ℹ️ Skipped starting cloned bot with token ending {token[-4:]} - marked as standalone! 🤖")
             return None
 
-        visibility = bot_info.get("visibility", "public")
-        usage = bot_info.get("usage", "searchbot")  # Default to searchbot if not set
-        owner_id = bot_info.get("owner_id", None)
-
-        clone_updater = Updater(token, use_context=True)
-        clone_dispatcher = clone_updater.dispatcher
-        clone_context_data = {"admin_ids": admin_ids, "is_main_bot": False, "visibility": visibility, "owner_id": owner_id}
-        clone_dispatcher.bot_data.update(clone_context_data)
+        runtime = get_clone_runtime()
+        factory = lambda: build_clone_dispatcher(token, bot_info, admin_ids)
+        if lazy:
+            instance = runtime.add_clone(
+                token=token, factory=factory, allowed_updates=clone_allowed_updates(bot_info.get("usage", "searchbot")),
+                identity=identity_from_entry(bot_info)
+            )
+            logger.info(f"💤 Registered cloned bot with token ending {token[-4:]} - it wakes on its first update! 🤖")
+            return instance
 
-        # Log the bot's username for debugging
-        bot_username = clone_updater.bot.get_me().username
+        clone_dispatcher = factory()
+        # Resolve the bot's identity once; handlers and links read it from bot_data
+        bot_username = remember_identity(clone_dispatcher, clone_dispatcher.bot.get_me()).username
         logger.info(f"ℹ️ Initializing cloned bot @{bot_username} with token ending {token[-4:]}")
-
-        # Access restriction for private bots
-        def restrict_access(handler_func):
-            def wrapper(update: Update, context: CallbackContext):
-                user_id = str(update.effective_user.id)
-                if context.bot_data.get("visibility") == "private" and user_id != context.bot_data.get("owner_id"):
-                    update.message.reply_text("🚫 This bot is private! Only the owner can use it! 🔒")
-                    logger.info(f"🚫 User {user_id} denied access to private bot with token ending {token[-4:]}")
-                    return
-                return handler_func(update, context)
-            return wrapper
-
-        # Handlers based on usage type
-        clone_dispatcher.add_handler(CommandHandler("start", restrict_access(start)))
-        if usage == "searchbot":
-            clone_dispatcher.add_handler(CommandHandler("search", restrict_access(search)))
-            clone_dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, restrict_access(handle_request)))
-            clone_dispatcher.add_handler(CommandHandler("start", handle_request, pass_args=True))
-        elif usage == "filestore":
-            clone_dispatcher.add_handler(MessageHandler(Filters.document | Filters.photo | Filters.video | Filters.audio, restrict_access(store_file)))
-            clone_dispatcher.add_handler(CommandHandler("genlink", restrict_access(genlink)))  # Updated to genlink
-            clone_dispatcher.add_handler(CommandHandler("batchgen", restrict_access(batchgen)))
-            clone_dispatcher.add_handler(CallbackQueryHandler(handle_genlink_selection, pattern="^(genlink_|cancel_genlink)"))  # Updated pattern
-            clone_dispatcher.add_handler(CallbackQueryHandler(handle_batchgen_selection, pattern="^(batch_select_|batch_done|cancel_batchgen)"))
-            clone_dispatcher.add_handler(CommandHandler("start", handle_filestore_link, pass_args=True))
-
-        clone_dispatcher.add_error_handler(error_handler)
-        clone_updater.start_polling()
-        logger.info(f"✅ Started cloned bot @{bot_username} with token ending {token[-4:]} and visibility {visibility} and usage {usage}! 🤖")
-        return clone_updater
+        instance = runtime.add_clone(clone_dispatcher, factory=factory)
+        logger.info(f"✅ Started cloned bot @{bot_username} with token ending {token[-4:]} and visibility {bot_info.get('visibility', 'public')} and usage {bot_info.get('usage', 'searchbot')}! 🤖")
+        return instance
     except Exception as e:
         error_msg = f"🚨 Failed to start cloned bot with token ending {token[-4:]}: {str(e)}"
         logger.error(error_msg)
@@ -88,6 +86,64 @@ def start_cloned_bot(token, admin_ids):
         log_error(error_msg)
         return None
 
+def update_cloned_bot(token, admin_ids, bot_info=None):
+    """🔧 Apply a changed cloned_bots entry (visibility, usage, owner) to a running clone in place.
+
+    The clone keeps its poll loop or webhook and its connections; only its
+    bot_data and handler graph are swapped. Hibernated clones pick the
+    change up when they wake.
+    """
+    if bot_info is None:
+        from utils.db_channel import get_cloned_bots
+        bot_info = next((bot for bot in get_cloned_bots() if bot["token"] == token), None)
+    runtime = get_clone_runtime()
+    clone = runtime.clones.get(token)
+    if clone is None or not bot_info:
+        return False
+    clone.factory = lambda: build_clone_dispatcher(token, bot_info, admin_ids)
+    dispatcher = clone.dispatcher
+    if dispatcher is not None:
+        dispatcher.bot_data.update(clone_bot_data(bot_info, admin_ids))
+        install_clone_graph(dispatcher, dispatcher.bot_data["usage"])
+    runtime.set_allowed_updates(token, clone_allowed_updates(bot_info.get("usage", "searchbot")))
+    logger.info(f"🔧 Updated cloned bot with token ending {token[-4:]}: visibility {bot_info.get('visibility', 'public')}, usage {bot_info.get('usage', 'searchbot')}! 🤖")
+    return True
+
+def start_cloned_bots(cloned_bots, admin_ids, lazy=False):
+    """🚀 Start a list of cloned bots at once, returning the running instances.
+
+    Each clone's get_me round-trip runs on a bounded thread pool, and every
+    clone begins polling as soon as its own check finishes.
+    """
+    bots = [bot for bot in cloned_bots if not bot.get("standalone", False)]
+    started = time.perf_counter()
+    if lazy:
+        instances = [start_cloned_bot(bot["token"], admin_ids, lazy=True, bot_info=bot) for bot in bots]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, CLONE_BOOT_CONCURRENCY), thread_name_prefix="clone-boot") as pool:
+            instances = list(pool.map(lambda bot: start_cloned_bot(bot["token"], admin_ids, bot_info=bot), bots))
+    instances = [instance for instance in instances if instance]
+    logger.info(
+        f"⏱️ Started {len(instances)}/{len(bots)} cloned bots in {time.perf_counter() - started:.2f}s "
+        f"({'lazy' if lazy else f'{CLONE_BOOT_CONCURRENCY} at a time'}, {len(cloned_bots) - len(bots)} standalone skipped)"
+    )
+    return instances
+
+def load_runtime_bots():
+    """🗂️ The cloned_bots entries this app runs (standalone ones run on their own)."""
+    from utils.db_channel import get_cloned_bots
+    return [bot for bot in get_cloned_bots() if not bot.get("standalone", False)]
+
+def run_clone_shard(conn, shard, shards, admin_ids):
+    """🧩 Entry point of a clone worker process: run the clones hashed to `shard`."""
+    run_shard(
+        conn, shard, shards,
+        load_bots=load_runtime_bots,
+        start_clones=lambda bots: start_cloned_bots(bots, admin_ids, lazy=bool(CLONE_HIBERNATE_AFTER)),
+        start_clone=lambda token: start_cloned_bot(token, admin_ids),
+        update_clone=lambda token: update_cloned_bot(token, admin_ids)
+    )
+
 def main():
     """🚀 Initialize and run the bot with cloned bots and custom captions/buttons."""
     global bot_instances
@@ -115,13 +171,17 @@ def main():
 
     context_data = {"admin_ids": admin_ids, "is_main_bot": True}
 
+    # ⏱️ Per-phase startup timings, logged once the bot is up
+    boot_started = phase_started = time.perf_counter()
+    timings = {}
+
     # 🤖 Initialize main bot
     try:
         updater = Updater(TELEGRAM_TOKEN, use_context=True)
         dispatcher = updater.dispatcher
         dispatcher.bot_data.update(context_data)
-        # Log the bot's username for debugging
-        bot_username = updater.bot.get_me().username
+        # Resolve the bot's identity once; handlers and links read it from bot_data
+        bot_username = remember_identity(dispatcher, updater.bot.get_me()).username
         logger.info(f"✅ Main bot initialized! 🎉 Bot username: @{bot_username}")
     except Exception as e:
         error_msg = f"🚨 Failed to initialize main bot: {str(e)}"
@@ -131,16 +191,11 @@ def main():
         raise
 
     # 📡 Add handlers for main bot (full admin features)
-    dispatcher.add_handler(CommandHandler("start", start))
+    dispatcher.add_handler(CommandHandler("start", handle_start))  # Welcome menu or file/batch deep link
     dispatcher.add_handler(CommandHandler("search", search))
+    dispatcher.add_handler(CallbackQueryHandler(handle_search_page, pattern="^search_page_"))
     dispatcher.add_handler(MessageHandler(Filters.document | Filters.photo | Filters.video | Filters.audio, handle_file))
-    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_caption_input))
-    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_buttons_input))
-    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_clone_input))
-    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_request))
-    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_broadcast_input))
-    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_batch_input))
-    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_settings_input))
+    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, route_text))  # Pending input or request
     dispatcher.add_handler(CallbackQueryHandler(create_clone_bot, pattern="^create_clone_bot$"))
     dispatcher.add_handler(CallbackQueryHandler(view_clone_bots, pattern="^view_clone_bots$"))
     dispatcher.add_handler(CallbackQueryHandler(handle_visibility_selection, pattern="^(visibility_private|visibility_public|cancel_clone)$"))
@@ -163,8 +218,8 @@ def main():
     dispatcher.add_handler(CommandHandler("batchgen", batchgen))
     dispatcher.add_handler(CallbackQueryHandler(handle_genlink_selection, pattern="^(genlink_|cancel_genlink)"))  # Updated pattern
     dispatcher.add_handler(CallbackQueryHandler(handle_batchgen_selection, pattern="^(batch_select_|batch_done|cancel_batchgen)"))
-    dispatcher.add_handler(CommandHandler("start", handle_filestore_link, pass_args=True))  # Handle deep links
     dispatcher.add_error_handler(error_handler)
+    timings["main bot init"], phase_started = time.perf_counter() - phase_started, time.perf_counter()
 
     # 🗄️ Load cloned bots from DB channel
     try:
@@ -180,27 +235,98 @@ def main():
         from utils.logging_utils import log_error
         log_error(error_msg)
         cloned_bots = []
+    timings["load cloned_bots"], phase_started = time.perf_counter() - phase_started, time.perf_counter()
+
+    # 🌍 Webhook mode: one server receives updates for the main bot and every clone
+    runtime = get_clone_runtime()
+    webhook_url = get_webhook_url()
+    if webhook_url:
+        try:
+            runtime.use_webhook(webhook_url)
+        except Exception as e:
+            error_msg = f"🚨 Failed to start webhook server, falling back to polling: {str(e)}"
+            logger.error(error_msg)
+            from utils.logging_utils import log_error
+            log_error(error_msg)
+            webhook_url = None
 
-    # Start cloned bots initially
+    # Start cloned bots initially (hibernated until first use when idle hibernation is on)
     bot_instances = []
-    for bot in cloned_bots:
-        instance = start_cloned_bot(bot["token"], admin_ids)
-        if instance:
-            bot_instances.append(instance)
+    supervisor = None
+    storage_problem = shard_storage_problem() if CLONE_PROCESSES else None
+    if CLONE_PROCESSES and not webhook_url and not storage_problem:
+        # 🧭 Shard clones across worker processes so one busy or crashing clone can't stall the rest
+        supervisor = start_clone_supervisor(CLONE_PROCESSES, run_clone_shard, (admin_ids,))
+    else:
+        if CLONE_PROCESSES and webhook_url:
+            logger.warning("⚠️ CLONE_PROCESSES is ignored in webhook mode - the webhook server runs every clone in this process")
+        elif storage_problem:
+            error_msg = f"🚨 CLONE_PROCESSES is ignored: {storage_problem}. Shards need STORAGE_BACKEND=sqlite, or json with SETTINGS_FLUSH_INTERVAL=0; running every clone in this process"
+            logger.error(error_msg)
+            from utils.logging_utils import log_error
+            log_error(error_msg)
+        bot_instances = start_cloned_bots(cloned_bots, admin_ids, lazy=bool(CLONE_HIBERNATE_AFTER))
+    timings["start clones"], phase_started = time.perf_counter() - phase_started, time.perf_counter()
+
+    # 🔄 Hot reload: apply edits to cloned_bots (by hand or by another instance) without a restart
+    reloader = None
+    if CLONE_RELOAD_INTERVAL > 0:
+        if supervisor:
+            reloader = CloneReloader(
+                load_runtime_bots,
+                start_clones=lambda bots: [supervisor.add_clone(bot["token"]) for bot in bots],
+                stop_clone=supervisor.remove_clone,
+                update_clone=lambda bot: supervisor.update_clone(bot["token"])
+            )
+        else:
+            reloader = CloneReloader(
+                load_runtime_bots,
+                # Clones added from the menu may already be running
+                start_clones=lambda bots: start_cloned_bots(
+                    [bot for bot in bots if bot["token"] not in runtime.clones], admin_ids, lazy=bool(CLONE_HIBERNATE_AFTER)
+                ),
+                stop_clone=runtime.remove_clone,
+                update_clone=lambda bot: update_cloned_bot(bot["token"], admin_ids, bot)
+            )
+        reloader.start([bot for bot in cloned_bots if not bot.get("standalone", False)])
 
     # 🌍 Start main bot
     try:
-        updater.start_polling()
-        logger.info(f"✅ Main bot started! 🚀 Bot username: @{bot_username}")
+        if webhook_url:
+            runtime.add_clone(dispatcher)
+        else:
+            updater.start_polling(allowed_updates=dispatcher_allowed_updates(dispatcher))
+        logger.info(f"✅ Main bot started! 🚀 Bot username: @{bot_username} | Mode: {'webhook' if webhook_url else 'polling'}")
     except Exception as e:
         error_msg = f"🚨 Failed to start main bot: {str(e)}"
         logger.error(error_msg)
         from utils.logging_utils import log_error
         log_error(error_msg)
         raise
+    timings["start main bot"] = time.perf_counter() - phase_started
+    resume_broadcast(updater.bot)  # An unfinished broadcast goes on from its last checkpoint
+    get_deletion_scheduler().start()  # Deletions that fell due while the bot was down go out first
+    logger.info(
+        f"⏱️ Startup took {time.perf_counter() - boot_started:.2f}s: "
+        + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items())
+    )
 
     # 💤 Keep the main thread running
-    updater.idle()
+    if webhook_url:
+        runtime.idle()
+    else:
+        updater.idle()
+    if reloader:
+        reloader.stop()
+    stop_broadcast(timeout=10)  # Checkpoint a running broadcast so the next start resumes it
+    get_deletion_scheduler().stop()
+    if supervisor:
+        supervisor.stop()
+    runtime.stop()
+
+    # 💾 Write out any buffered settings changes before exiting
+    from utils.db_channel import flush_settings
+    flush_settings()
 
 if __name__ == "__main__":
     main()
@@ -1,13 +1,210 @@
-import asyncio
+import heapq
+import logging
+import os
+import sqlite3
+import threading
+import time
 from telegram import Bot
+from telegram.error import BadRequest, Unauthorized
+from utils.clone_runtime import get_clone_runtime
+from utils.delivery import BULK_DELIVERY
 from utils.logging_utils import log_error
+from utils.outbound import get_outbound, BULK
 
-async def set_auto_delete(bot: Bot, chat_id: str, message_id: int, hours: int):
-    """Set auto-delete for messages."""
+logger = logging.getLogger(__name__)
+
+AUTO_DELETE_DB = os.getenv("AUTO_DELETE_DB", "config/auto_delete.db")
+AUTO_DELETE_WINDOW = 600  # Seconds ahead the in-memory heap covers; later deletions stay on disk only
+AUTO_DELETE_POLL = 5  # Seconds between checks for deletions queued by other processes
+AUTO_DELETE_RETRY = 60  # Seconds before a failed deletion is tried again
+AUTO_DELETE_MAX_ATTEMPTS = 5
+MAX_DELETE_BATCH = 100  # deleteMessages limit
+
+class DeletionScheduler:
+    """🗑️ Deletes messages when they're due, surviving restarts.
+
+    Every pending deletion is a row in an SQLite table indexed by due time.
+    Only the next AUTO_DELETE_WINDOW seconds are loaded into a heap, so
+    memory holds the near future no matter how many deletions are queued.
+    One thread pops what's due, groups it per bot and chat into
+    deleteMessages calls of up to MAX_DELETE_BATCH IDs, and sends them
+    through the outbound scheduler. A row is removed once its call
+    succeeds, or when Telegram says it can never succeed (message already
+    gone, bot removed). Other errors are retried AUTO_DELETE_RETRY seconds
+    later. At start the first load also picks up everything that fell due
+    while the bot was down.
+
+    Any process may queue deletions. Only the one that called start()
+    performs them, and it picks up rows from other processes within
+    AUTO_DELETE_POLL seconds.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS deletions (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            due REAL NOT NULL, token TEXT NOT NULL, chat_id TEXT NOT NULL,
+            message_id INTEGER NOT NULL, attempts INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_deletions_due ON deletions(due);
+    """
+
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._cond = threading.Condition()
+        self._heap = []  # (due, seq, token, chat_id, message_id, attempts)
+        self._horizon = float("-inf")  # Rows due before this were loaded...
+        self._last_seq = 0  # ...if they existed at this seq
+        self._bots = {}  # token -> Bot
+        self._thread = None
+        self._stopped = False
+
+    def schedule(self, bot, chat_id, message_ids, delay):
+        """⏰ Queue `message_ids` in `chat_id` for deletion by `bot` in `delay` seconds."""
+        due = time.time() + delay
+        self._bots.setdefault(bot.token, bot)
+        with self._cond:
+            self._conn.executemany(
+                "INSERT INTO deletions (due, token, chat_id, message_id) VALUES (?, ?, ?, ?)",
+                [(due, bot.token, str(chat_id), int(message_id)) for message_id in message_ids]
+            )
+            self._cond.notify()
+
+    def pending(self):
+        """📊 Deletions waiting on disk, and how many of them are already due."""
+        with self._cond:
+            return self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(due <= ?), 0) FROM deletions", (time.time(),)
+            ).fetchone()
+
+    def start(self):
+        """▶️ Start performing deletions, beginning with any that came due while the bot was down."""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="auto-delete", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _load(self, now):
+        """📥 Push rows due within the window that aren't in the heap yet (lock held)."""
+        horizon = now + AUTO_DELETE_WINDOW
+        self._conn.execute("BEGIN")  # One snapshot for the max seq and both queries
+        try:
+            last_seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM deletions").fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT due, seq, token, chat_id, message_id, attempts FROM deletions WHERE due >= ? AND due < ? AND seq <= ?",
+                (self._horizon, horizon, last_seq)
+            ).fetchall()
+            # Rows queued since the last load that fall inside the part already loaded
+            rows += self._conn.execute(
+                "SELECT due, seq, token, chat_id, message_id, attempts FROM deletions WHERE seq > ? AND seq <= ? AND due < ?",
+                (self._last_seq, last_seq, self._horizon)
+            ).fetchall()
+        finally:
+            self._conn.execute("COMMIT")
+        for row in rows:
+            heapq.heappush(self._heap, row)
+        self._horizon, self._last_seq = horizon, last_seq
+
+    def _run(self):
+        next_load = 0
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                now = time.time()
+                try:
+                    if now >= next_load or self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM deletions").fetchone()[0] != self._last_seq:
+                        self._load(now)
+                        next_load = now + AUTO_DELETE_POLL
+                except Exception as e:
+                    log_error(f"🚨 Auto-delete queue read failed: {str(e)}")
+                    next_load = now + AUTO_DELETE_POLL
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+                if not due:
+                    wake = min(next_load, self._heap[0][0]) if self._heap else next_load
+                    self._cond.wait(max(wake - now, 0))
+                    continue
+            self._dispatch(due)
+
+    def _dispatch(self, due):
+        """📦 Group due rows per bot and chat into deleteMessages calls."""
+        groups = {}
+        for row in due:
+            groups.setdefault((row[2], row[3]), []).append(row)
+        for (token, chat_id), rows in groups.items():
+            rows.sort(key=lambda row: row[4])
+            step = MAX_DELETE_BATCH if BULK_DELIVERY else 1
+            for i in range(0, len(rows), step):
+                chunk = rows[i:i + step]
+                bot = self._bot(token)
+                future = get_outbound().submit(
+                    bot, chat_id, lambda b=bot, c=chat_id, ids=[row[4] for row in chunk]: delete_messages(b, c, ids), BULK
+                )
+                future.add_done_callback(lambda f, chunk=chunk: self._settle(chunk, f))
+
+    def _settle(self, chunk, future):
+        error = future.exception()
+        seqs = [(row[1],) for row in chunk]
+        with self._cond:
+            try:
+                if error is None or isinstance(error, (BadRequest, Unauthorized)) or chunk[0][5] + 1 >= AUTO_DELETE_MAX_ATTEMPTS:
+                    if error is not None:
+                        log_error(f"🚨 Auto-delete of {len(chunk)} messages in {chunk[0][3]} gave up: {str(error)}")
+                    self._conn.executemany("DELETE FROM deletions WHERE seq = ?", seqs)
+                    return
+                due = time.time() + AUTO_DELETE_RETRY
+                self._conn.executemany("UPDATE deletions SET due = ?, attempts = attempts + 1 WHERE seq = ?", [(due,) + s for s in seqs])
+                if due < self._horizon:  # Past this, the next load finds them on disk
+                    for row in chunk:
+                        heapq.heappush(self._heap, (due, row[1], row[2], row[3], row[4], row[5] + 1))
+                self._cond.notify()
+                logger.warning(f"⚠️ Auto-delete of {len(chunk)} messages in {chunk[0][3]} failed, retrying in {AUTO_DELETE_RETRY}s: {str(error)}")
+            except Exception as e:
+                log_error(f"🚨 Auto-delete bookkeeping failed: {str(e)}")
+
+    def _bot(self, token):
+        bot = self._bots.get(token)
+        if bot is None:
+            # Queued before a restart (or by another process): any Bot with the token can delete
+            bot = self._bots[token] = get_clone_runtime().make_bot(token)
+        return bot
+
+def delete_messages(bot, chat_id, message_ids):
+    """🗑️ Delete messages in one call: deleteMessages for several, deleteMessage for one."""
+    if len(message_ids) == 1:
+        return bot.delete_message(chat_id=chat_id, message_id=message_ids[0])
+    # PTB 13 has no wrapper for the bulk method, so post it directly
+    return bot._post("deleteMessages", {"chat_id": chat_id, "message_ids": message_ids})
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_deletion_scheduler():
+    """🗑️ The process-wide deletion scheduler (call start() on it in the process that should delete)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = DeletionScheduler(AUTO_DELETE_DB)
+        return _scheduler
+
+def set_auto_delete(bot: Bot, chat_id: str, message_id: int, hours: int):
+    """⏰ Queue a message for deletion in `hours` hours; returns False if it couldn't be queued."""
     try:
-        await asyncio.sleep(hours * 3600)
-        await bot.delete_message(chat_id=chat_id, message_id=message_id)
-        logger.info(f"✅ Message {message_id} deleted from {chat_id}")
+        get_deletion_scheduler().schedule(bot, chat_id, [message_id], hours * 3600)
+        logger.info(f"✅ Message {message_id} in {chat_id} will be deleted in {hours}h")
+        return True
     except Exception as e:
-        await log_error(f"Auto-delete error: {str(e)}")
-        logger.info(f"⚠️ Failed to delete message {message_id}")
+        log_error(f"Auto-delete error: {str(e)}")
+        logger.info(f"⚠️ Failed to schedule deletion of message {message_id}")
+        return False
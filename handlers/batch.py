@@ -1,7 +1,9 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
-from utils.db_channel import get_setting, set_setting
+from utils.db_channel import get_setting, add_batch, next_batch_id
 from utils.logging_utils import log_error
+from utils.bot_identity import forget_identity_on_auth_error
+from handlers.router import expect_text, register_text_state
 import logging
 import json
 
@@ -22,7 +24,7 @@ def batch(update: Update, context: CallbackContext):
     try:
         callback_data = update.callback_query.data
         if callback_data == "generate_batch":
-            context.user_data["awaiting_batch_name"] = "generate"
+            expect_text(context, "awaiting_batch_name", "generate")
             update.callback_query.message.reply_text(
                 "📦 Send a name for the new batch! (e.g., 'Movie Collection') 📋",
                 reply_markup=InlineKeyboardMarkup([
@@ -44,6 +46,7 @@ def batch(update: Update, context: CallbackContext):
             )
             logger.info(f"✅ Admin {user_id} started editing batch! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Oops! Batch action failed! Try again! 😅")
         log_error(f"🚨 Batch action error for {user_id}: {str(e)}")
 
@@ -64,11 +67,9 @@ def handle_batch_input(update: Update, context: CallbackContext):
     try:
         batch_name = update.message.text.strip()
         if context.user_data["awaiting_batch_name"] == "generate":
-            batches = get_setting("batches", [])
-            batch_id = str(len(batches) + 1)
+            batch_id = next_batch_id()
             new_batch = {"id": batch_id, "name": batch_name, "files": []}
-            batches.append(new_batch)
-            set_setting("batches", batches)
+            add_batch(new_batch)
             update.message.reply_text(
                 f"✅ Batch '{batch_name}' created! 🎉\n"
                 "Add files via file uploads! 📤",
@@ -79,6 +80,7 @@ def handle_batch_input(update: Update, context: CallbackContext):
             logger.info(f"✅ Admin {user_id} created batch '{batch_name}'! 🌟")
         context.user_data["awaiting_batch_name"] = None
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to create batch! Try again! 😅")
         log_error(f"🚨 Batch input error for {user_id}: {str(e)}")
 
@@ -114,6 +116,7 @@ def handle_batch_edit(update: Update, context: CallbackContext):
             context.user_data["awaiting_batch_edit"] = batch_id
             logger.info(f"✅ Admin {user_id} started editing batch {batch_id}! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to edit batch! Try again! 😅")
         log_error(f"🚨 Batch edit error for {user_id}: {str(e)}")
 
@@ -138,5 +141,9 @@ def cancel_batch(update: Update, context: CallbackContext):
         else:
             update.callback_query.message.reply_text("⚠️ No batch action to cancel! 😅")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to cancel batch! Try again! 😅")
         log_error(f"🚨 Batch cancel error for {user_id}: {str(e)}")
+
+# 🧭 Text replies these handlers wait for
+register_text_state("awaiting_batch_name", handle_batch_input)
@@ -2,6 +2,10 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
 from utils.db_channel import get_setting
 from utils.logging_utils import log_error
+from utils.bot_identity import forget_identity_on_auth_error
+from utils.outbound import send_message
+from utils.broadcaster import start_broadcast, stop_broadcast
+from handlers.router import expect_text, register_text_state
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,16 +23,17 @@ def broadcast(update: Update, context: CallbackContext):
         return
 
     try:
-        context.user_data["awaiting_broadcast"] = True
+        expect_text(context, "awaiting_broadcast")
         update.callback_query.message.reply_text(
             "📢 Send the message you want to broadcast! 🗣️\n"
-            "It’ll go to all users or the configured channel! 🌐",
+            "It’ll go to every user of this bot, and a copy to the log channel if one is set! 🌐",
             reply_markup=InlineKeyboardMarkup([
                 [InlineKeyboardButton("Cancel 🚫", callback_data="cancel_broadcast")]
             ])
         )
         logger.info(f"✅ Admin {user_id} started broadcast! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Oops! Broadcast setup failed! Try again! 😅")
         log_error(f"🚨 Broadcast setup error for {user_id}: {str(e)}")
 
@@ -48,21 +53,25 @@ def handle_broadcast_input(update: Update, context: CallbackContext):
 
     try:
         message = update.message.text.strip()
+        # The engine edits this message with live progress
+        progress = update.message.reply_text(
+            "📢 Starting broadcast... 🚀",
+            reply_markup=InlineKeyboardMarkup([
+                [InlineKeyboardButton("Cancel 🚫", callback_data="cancel_broadcast")]
+            ])
+        )
+        job = start_broadcast(context.bot, message, progress.chat_id, progress.message_id)
+        if job is None:
+            progress.edit_text("⚠️ A broadcast is already running! Wait for it to finish or cancel it first! 😅")
+            context.user_data["awaiting_broadcast"] = None  # Or the admin's next text would be taken as a broadcast
+            return
         log_channel = get_setting("log_channel", None)
         if log_channel:
-            context.bot.send_message(chat_id=log_channel, text=f"📢 Broadcast: {message}")
-            update.message.reply_text("✅ Broadcast sent to log channel! 🎉")
-            logger.info(f"✅ Admin {user_id} broadcasted to log channel! 🌟")
-        else:
-            update.message.reply_text(
-                "⚠️ No log channel set! Set one in settings first! 😅",
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton("Go to Settings ⚙️", callback_data="settings")]
-                ])
-            )
-            logger.info(f"⚠️ Admin {user_id} attempted broadcast without log channel! 🌟")
+            send_message(context.bot, log_channel, f"📢 Broadcast: {message}")
+        logger.info(f"✅ Admin {user_id} started broadcast {job['id']} to {job['total']} users! 🌟")
         context.user_data["awaiting_broadcast"] = None
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to send broadcast! Try again! 😅")
         log_error(f"🚨 Broadcast error for {user_id}: {str(e)}")
 
@@ -83,8 +92,16 @@ def cancel_broadcast(update: Update, context: CallbackContext):
             context.user_data["awaiting_broadcast"] = None
             update.callback_query.message.reply_text("✅ Broadcast cancelled! 🎉")
             logger.info(f"✅ Admin {user_id} cancelled broadcast! 🌟")
+        elif stop_broadcast(cancel=True, timeout=0):
+            # The progress message shows the final counts once the queued sends settle
+            update.callback_query.answer("🛑 Stopping broadcast...")
+            logger.info(f"✅ Admin {user_id} cancelled the running broadcast! 🌟")
         else:
             update.callback_query.message.reply_text("⚠️ No broadcast to cancel! 😅")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to cancel broadcast! Try again! 😅")
         log_error(f"🚨 Broadcast cancel error for {user_id}: {str(e)}")
+
+# 🧭 Text replies these handlers wait for
+register_text_state("awaiting_broadcast", handle_broadcast_input)
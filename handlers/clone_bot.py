@@ -1,8 +1,12 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, Bot
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
 from telegram.error import TelegramError, Unauthorized, NetworkError
-from utils.db_channel import get_setting, set_setting
+from utils.db_channel import get_cloned_bots, add_cloned_bot
+from utils.clone_runtime import get_clone_runtime
+from utils.clone_supervisor import get_clone_supervisor
 from utils.logging_utils import log_error
+from utils.bot_identity import forget_identity_on_auth_error
+from handlers.router import expect_text, register_text_state
 import logging
 import os
 
@@ -32,6 +36,7 @@ def create_clone_bot(update: Update, context: CallbackContext):
         )
         logger.info(f"✅ Admin {user_id} started cloning bot - selecting visibility! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to start cloning! Try again! 😅")
         log_error(f"🚨 Clone bot error for {user_id}: {str(e)}")
 
@@ -70,6 +75,7 @@ def handle_visibility_selection(update: Update, context: CallbackContext):
         )
         logger.info(f"✅ Admin {user_id} set visibility to {visibility} and awaiting usage selection! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to set visibility! Try again! 😅")
         log_error(f"🚨 Visibility selection error for {user_id}: {str(e)}")
 
@@ -95,7 +101,7 @@ def handle_usage_selection(update: Update, context: CallbackContext):
         # Store usage selection
         usage = "filestore" if callback_data == "usage_filestore" else "searchbot"
         context.user_data["new_bot_usage"] = usage
-        context.user_data["awaiting_clone_token"] = True
+        expect_text(context, "awaiting_clone_token")
 
         update.callback_query.message.reply_text(
             f"🤖 Usage set to {usage.upper()}! 🛠️\n"
@@ -106,6 +112,7 @@ def handle_usage_selection(update: Update, context: CallbackContext):
         )
         logger.info(f"✅ Admin {user_id} set usage to {usage} and awaiting token! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to set usage! Try again! 😅")
         log_error(f"🚨 Usage selection error for {user_id}: {str(e)}")
 
@@ -122,7 +129,7 @@ def view_clone_bots(update: Update, context: CallbackContext):
         return
 
     try:
-        cloned_bots = get_setting("cloned_bots", [])
+        cloned_bots = get_cloned_bots()
         if not cloned_bots:
             update.callback_query.message.reply_text("⚠️ No cloned bots found! Create one first! 😅")
             logger.info(f"✅ Admin {user_id} viewed clone bots - none found! 🌟")
@@ -131,6 +138,7 @@ def view_clone_bots(update: Update, context: CallbackContext):
         update.callback_query.message.reply_text(response)
         logger.info(f"✅ Admin {user_id} viewed {len(cloned_bots)} cloned bots! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to view cloned bots! Try again! 😅")
         log_error(f"🚨 View clone bots error for {user_id}: {str(e)}")
 
@@ -163,7 +171,7 @@ def handle_clone_input(update: Update, context: CallbackContext):
 
         # Verify token with Telegram API
         try:
-            bot = Bot(token)
+            bot = get_clone_runtime().make_bot(token)
             bot_info = bot.get_me()  # This will raise an exception if the token is invalid
             bot_username = bot_info.username
             logger.info(f"✅ Token verification successful for bot @{bot_username} with token ending {token[-4:]}")
@@ -184,7 +192,7 @@ def handle_clone_input(update: Update, context: CallbackContext):
             logger.error(f"🚨 Token verification failed for user {user_id}: {str(e)}")
             return
 
-        cloned_bots = get_setting("cloned_bots", [])
+        cloned_bots = get_cloned_bots()
         # Check if token already exists
         existing_bot = next((bot for bot in cloned_bots if bot["token"] == token), None)
         if existing_bot:
@@ -202,24 +210,40 @@ def handle_clone_input(update: Update, context: CallbackContext):
             return
 
         # Store bot with visibility, usage, and standalone status
-        cloned_bots.append({
+        added = add_cloned_bot({
             "token": token,
             "visibility": visibility,
             "usage": usage,
             "owner_id": user_id,
-            "standalone": is_standalone
+            "standalone": is_standalone,
+            # Lazily started clones wake with this identity instead of asking getMe
+            "bot_id": bot_info.id,
+            "username": bot_username,
+            "first_name": bot_info.first_name
         })
-        set_setting("cloned_bots", cloned_bots)
+        if not added:
+            update.message.reply_text(f"⚠️ This bot token was just added by someone else! It’s @{bot_username}. Try a different token! 😅")
+            logger.info(f"⚠️ Admin {user_id} lost a race adding token ending {token[-4:]} for @{bot_username}")
+            return
 
         # Dynamically start the cloned bot (if not standalone)
         if not is_standalone:
             admin_ids = context.bot_data.get("admin_ids", [])
-            instance = start_cloned_bot(token, admin_ids)
-            if instance:
-                bot_instances.append(instance)
+            supervisor = get_clone_supervisor()
+            if supervisor:
+                # Runs on the worker process that owns this token; no restart needed
+                started = supervisor.add_clone(token)
+            else:
+                instance = start_cloned_bot(token, admin_ids)
+                started = instance is not None
+                if instance:
+                    bot_instances.append(instance)
+            if started:
                 update.message.reply_text(f"✅ Cloned bot @{bot_username} added and started! 🎉\nVisibility: {visibility.upper()} 🔒 | Usage: {usage.upper()} 🛠️")
                 logger.info(f"✅ Admin {user_id} added and started cloned bot @{bot_username} with token ending {token[-4:]} and visibility {visibility} and usage {usage}! 🌟")
             else:
+                # Don't leave a webhook pointing at a bot we aren't serving
+                get_clone_runtime().remove_clone(token)
                 update.message.reply_text(f"⚠️ Cloned bot @{bot_username} added but failed to start! Check the token or logs! 😅")
                 logger.info(f"⚠️ Admin {user_id} added cloned bot @{bot_username} but failed to start, token ending {token[-4:]}")
         else:
@@ -230,5 +254,9 @@ def handle_clone_input(update: Update, context: CallbackContext):
         context.user_data["new_bot_visibility"] = None
         context.user_data["new_bot_usage"] = None
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to add cloned bot! Check token or logs! 😅")
         log_error(f"🚨 Clone input error for {user_id}: {str(e)}")
+
+# 🧭 Text replies these handlers wait for
+register_text_state("awaiting_clone_token", handle_clone_input)
@@ -0,0 +1,81 @@
+from functools import wraps
+from telegram import Update
+from telegram.ext import CommandHandler, MessageHandler, CallbackQueryHandler, Filters, CallbackContext
+from handlers.start import start
+from handlers.error import error_handler
+from handlers.search import search, handle_search_page
+from handlers.request import handle_request
+from utils.clone_runtime import allowed_updates_for
+from handlers.filestore import store_file, genlink, batchgen, handle_genlink_selection, handle_batchgen_selection, handle_start
+import logging
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_USER_KEY = "allowed_user"  # bot_data key: the only user ID a private clone serves, None when public
+
+def restricted(handler_func):
+    """🔒 Let a private clone's handler run only for its owner.
+
+    Whether the clone is private is decided once in clone_bot_data, so the
+    check here is a single bot_data lookup and comparison.
+    """
+    @wraps(handler_func)
+    def wrapper(update: Update, context: CallbackContext):
+        allowed_user = context.bot_data.get(ALLOWED_USER_KEY)
+        if allowed_user is not None and str(update.effective_user.id) != allowed_user:
+            update.message.reply_text("🚫 This bot is private! Only the owner can use it! 🔒")
+            logger.info(f"🚫 User {update.effective_user.id} denied access to private bot with token ending {context.bot.token[-4:]}")
+            return None
+        return handler_func(update, context)
+    return wrapper
+
+def _build_graphs():
+    """🧩 Build each usage's handlers once; tuples so no clone can change them for the others."""
+    media = Filters.document | Filters.photo | Filters.video | Filters.audio
+    searchbot = (
+        CommandHandler("start", restricted(start)),
+        CommandHandler("search", restricted(search)),
+        CallbackQueryHandler(handle_search_page, pattern="^search_page_"),
+        MessageHandler(Filters.text & ~Filters.command, restricted(handle_request)),
+    )
+    filestore = (
+        CommandHandler("start", restricted(handle_start)),  # Deep links and the welcome menu
+        MessageHandler(media, restricted(store_file)),
+        CommandHandler("genlink", restricted(genlink)),
+        CommandHandler("batchgen", restricted(batchgen)),
+        CallbackQueryHandler(handle_genlink_selection, pattern="^(genlink_|cancel_genlink)"),
+        CallbackQueryHandler(handle_batchgen_selection, pattern="^(batch_select_|batch_done|cancel_batchgen)"),
+    )
+    return {"searchbot": searchbot, "filestore": filestore}
+
+# usage -> shared handler tuple, identical for every clone of that usage
+CLONE_HANDLER_GRAPHS = _build_graphs()
+DEFAULT_GRAPH = (CommandHandler("start", restricted(start)),)  # Unknown usage types only answer /start
+
+def clone_allowed_updates(usage):
+    """📮 The allowed_updates a clone of this usage polls with, derived once from its handler graph."""
+    return _ALLOWED_UPDATES.get(usage, _ALLOWED_UPDATES[None])
+
+_ALLOWED_UPDATES = {usage: allowed_updates_for(graph) for usage, graph in CLONE_HANDLER_GRAPHS.items()}
+_ALLOWED_UPDATES[None] = allowed_updates_for(DEFAULT_GRAPH)
+
+def clone_bot_data(bot_info, admin_ids):
+    """🗂️ A clone's per-bot config for bot_data, including its precomputed access rule."""
+    visibility = bot_info.get("visibility", "public")
+    owner_id = bot_info.get("owner_id", None)
+    return {
+        "admin_ids": admin_ids,
+        "is_main_bot": False,
+        "visibility": visibility,
+        "owner_id": owner_id,
+        "usage": bot_info.get("usage", "searchbot"),
+        # Private clones without an owner serve nobody, as before
+        ALLOWED_USER_KEY: (str(owner_id) if owner_id is not None else "") if visibility == "private" else None,
+    }
+
+def install_clone_graph(dispatcher, usage):
+    """📌 Point a clone's dispatcher at the shared handler graph for its usage."""
+    dispatcher.handlers = {0: CLONE_HANDLER_GRAPHS.get(usage, DEFAULT_GRAPH)}
+    dispatcher.groups = [0]
+    if error_handler not in dispatcher.error_handlers:
+        dispatcher.add_error_handler(error_handler)
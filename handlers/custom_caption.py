@@ -2,6 +2,8 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
 from utils.db_channel import set_setting, get_setting
 from utils.logging_utils import log_error
+from utils.bot_identity import forget_identity_on_auth_error
+from handlers.router import expect_text, register_text_state
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,7 +21,7 @@ def set_custom_caption(update: Update, context: CallbackContext):
         return
 
     try:
-        context.user_data["awaiting_caption"] = True
+        expect_text(context, "awaiting_caption")
         update.callback_query.message.reply_text(
             "📝 Send the custom caption for files! 📄",
             reply_markup=InlineKeyboardMarkup([
@@ -28,6 +30,7 @@ def set_custom_caption(update: Update, context: CallbackContext):
         )
         logger.info(f"✅ Admin {user_id} started setting caption! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to set caption! Try again! 😅")
         log_error(f"🚨 Caption error for {user_id}: {str(e)}")
 
@@ -44,7 +47,7 @@ def set_custom_buttons(update: Update, context: CallbackContext):
         return
 
     try:
-        context.user_data["awaiting_buttons"] = True
+        expect_text(context, "awaiting_buttons")
         update.callback_query.message.reply_text(
             "🔘 Send the custom buttons in format: Button Text | URL (one per line)\n"
             "Example:\nDownload | https://example.com\nSupport | https://t.me/support",
@@ -54,6 +57,7 @@ def set_custom_buttons(update: Update, context: CallbackContext):
         )
         logger.info(f"✅ Admin {user_id} started setting buttons! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to set buttons! Try again! 😅")
         log_error(f"🚨 Buttons error for {user_id}: {str(e)}")
 
@@ -78,6 +82,7 @@ def handle_caption_input(update: Update, context: CallbackContext):
         update.message.reply_text("✅ Custom caption set! 🎉")
         logger.info(f"✅ Admin {user_id} set custom caption! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to save caption! Try again! 😅")
         log_error(f"🚨 Caption input error for {user_id}: {str(e)}")
 
@@ -107,5 +112,10 @@ def handle_buttons_input(update: Update, context: CallbackContext):
         update.message.reply_text("✅ Custom buttons set! 🎉")
         logger.info(f"✅ Admin {user_id} set custom buttons! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to save buttons! Check format! 😅")
         log_error(f"🚨 Buttons input error for {user_id}: {str(e)}")
+
+# 🧭 Text replies these handlers wait for
+register_text_state("awaiting_caption", handle_caption_input)
+register_text_state("awaiting_buttons", handle_buttons_input)
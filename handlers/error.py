@@ -1,6 +1,7 @@
 from telegram import Update  # Added import for Update
 from telegram.ext import CallbackContext
 from utils.logging_utils import log_error
+from utils.bot_identity import forget_identity_on_auth_error
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,6 +12,7 @@ def error_handler(update: Update, context: CallbackContext):
     error_msg = f"🚨 Update caused error for user {user_id}: {str(context.error)}"
     logger.error(error_msg)
     log_error(error_msg)
+    forget_identity_on_auth_error(context, context.error)  # Token changed or revoked; re-resolve the identity on next use
     if update and update.message:
         update.message.reply_text("⚠️ Something went wrong! Try again! 😅")
     else:
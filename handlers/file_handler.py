@@ -1,7 +1,9 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
-from utils.db_channel import get_setting, set_setting
+from utils.db_channel import get_setting, append_batch_file, put_file
+from utils.search_index import index_file_name
 from utils.logging_utils import log_error
+from utils.bot_identity import forget_identity_on_auth_error
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,23 +12,19 @@ def handle_file(update: Update, context: CallbackContext):
     """📤 Handle file uploads and store metadata."""
     user_id = update.effective_user.id
     message = update.message
-    file = message.document or message.photo[-1] if message.photo else message.video or message.audio
+    file = message.document or (message.photo[-1] if message.photo else None) or message.video or message.audio
 
     try:
         file_id = file.file_id
         file_name = getattr(file, "file_name", f"File_{file_id}")
-        files = get_setting("files", {})
-        files[file_name] = {"file_id": file_id, "uploader": user_id}
-        set_setting("files", files)
+        put_file(file_name, {"file_id": file_id, "uploader": user_id})
+        index_file_name(file_name)
 
         # Check if user is in batch edit mode
         batch_id = context.user_data.get("awaiting_batch_edit")
         if batch_id:
-            batches = get_setting("batches", [])
-            batch = next((b for b in batches if b["id"] == batch_id), None)
+            batch = append_batch_file(batch_id, file_id)
             if batch:
-                batch["files"].append(file_id)
-                set_setting("batches", batches)
                 update.message.reply_text(f"✅ File added to batch '{batch['name']}'! 🎉")
                 logger.info(f"✅ User {user_id} added file {file_id} to batch {batch_id}! 🌟")
                 return
@@ -45,5 +43,6 @@ def handle_file(update: Update, context: CallbackContext):
         )
         logger.info(f"✅ User {user_id} uploaded file {file_id}! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to upload file! Try again! 😅")
         log_error(f"🚨 File upload error for user {user_id}: {str(e)}")
@@ -1,15 +1,39 @@
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
 from telegram.error import TelegramError, Unauthorized, BadRequest
-from utils.db_channel import get_setting, set_setting
+from utils.db_channel import add_stored_file, add_batch, next_batch_id, get_stored_file, get_user_files, get_batch
+from utils.search_index import index_file_name
 from utils.logging_utils import log_error
+from utils.bot_identity import get_identity, forget_identity_on_auth_error
+from utils.outbound import get_outbound, reply_text, log_failure, BULK, INTERACTIVE
+from utils.delivery import deliver_files
+from utils.user_registry import record_user
+from handlers.start import start
 
 logger = logging.getLogger(__name__)
 
 # File Store configuration
 CHANNEL_ID = os.getenv("FILESTORE_CHANNEL_ID")  # Private channel ID for storing files
+RECENT_FILES_LIMIT = 5  # How many of a user's latest files genlink/batchgen offer
+LINK_PREFIXES = ("file_", "batch_")  # /start payloads that are file-store deep links
+SAVE_WORKERS = 2  # Threads saving stored files' metadata once their forward lands
+
+# Saves can take a full catalog rewrite (JSON backend), so they get their own threads
+# instead of holding up the outbound scheduler's senders, which run the forward's callbacks
+_savers = ThreadPoolExecutor(max_workers=SAVE_WORKERS, thread_name_prefix="filestore-save")
+
+if CHANNEL_ID:
+    get_outbound().add_storage_chat(CHANNEL_ID)  # Uploads are paced at the bot's rate, not a group's
+
+def get_owned_file(user_id, message_id):
+    """🔎 Resolve a button's message ID to the user's stored file, or None."""
+    file_entry = get_stored_file(message_id)
+    if file_entry and file_entry["user_id"] == user_id:
+        return file_entry
+    return None
 
 def store_file(update: Update, context: CallbackContext):
     """📦 Store files in the private channel and save metadata."""
@@ -41,28 +65,46 @@ def store_file(update: Update, context: CallbackContext):
             update.message.reply_text("⚠️ Unsupported file type! Send a document, photo, video, or audio! 😅")
             return
 
-        # Forward the file to the private channel
+        # Forward the file to the private channel; the handler thread doesn't wait for it,
+        # save_stored_file finishes the job once the forward lands
+        chat_id, message_id = update.message.chat_id, update.message.message_id
+        get_outbound().submit(
+            context.bot, CHANNEL_ID,
+            lambda: context.bot.forward_message(chat_id=CHANNEL_ID, from_chat_id=chat_id, message_id=message_id)
+        ).add_done_callback(lambda forwarded: _savers.submit(save_stored_file, update, context, forwarded, file_id, file_name))
+    except Exception as e:
+        forget_identity_on_auth_error(context, e)
+        update.message.reply_text("⚠️ Failed to store file! Try again! 😅")
+        log_error(f"🚨 File store error for user {user_id}: {str(e)}")
+
+def save_stored_file(update: Update, context: CallbackContext, forwarded, file_id, file_name):
+    """💾 Save a stored file's metadata and confirm, once its forward to the channel is done."""
+    user_id = str(update.effective_user.id)
+
+    def reply(text):
+        # Queued, not waited for: the save thread moves on to the next upload
+        get_outbound().submit(context.bot, update.message.chat_id, lambda: update.message.reply_text(text)).add_done_callback(
+            log_failure(f"Store reply to {user_id}")
+        )
+
+    try:
         try:
-            forwarded_message = context.bot.forward_message(
-                chat_id=CHANNEL_ID,
-                from_chat_id=update.message.chat_id,
-                message_id=update.message.message_id
-            )
-        except Unauthorized:
-            update.message.reply_text("⚠️ Bot lacks permission to forward messages to the channel! Contact the admin! 😅")
+            forwarded_message = forwarded.result()
+        except Unauthorized as e:
+            forget_identity_on_auth_error(context, e)
+            reply("⚠️ Bot lacks permission to forward messages to the channel! Contact the admin! 😅")
             logger.error(f"🚨 Unauthorized error: Bot cannot forward messages to channel {CHANNEL_ID} for user {user_id}")
             return
         except BadRequest as e:
-            update.message.reply_text("⚠️ Failed to forward file: Invalid channel ID or message! Check the channel setup! 😅")
+            reply("⚠️ Failed to forward file: Invalid channel ID or message! Check the channel setup! 😅")
             logger.error(f"🚨 BadRequest error while forwarding to channel {CHANNEL_ID} for user {user_id}: {str(e)}")
             return
         except TelegramError as e:
-            update.message.reply_text(f"⚠️ Telegram error while forwarding file: {str(e)}! Try again! 😅")
+            reply(f"⚠️ Telegram error while forwarding file: {str(e)}! Try again! 😅")
             logger.error(f"🚨 Telegram error while forwarding to channel {CHANNEL_ID} for user {user_id}: {str(e)}")
             return
 
         # Save file metadata
-        stored_files = get_setting("stored_files", [])
         file_entry = {
             "file_id": file_id,
             "file_name": file_name,
@@ -70,36 +112,33 @@ def store_file(update: Update, context: CallbackContext):
             "chat_id": CHANNEL_ID,
             "user_id": user_id
         }
-        stored_files.append(file_entry)
-        set_setting("stored_files", stored_files)
+        add_stored_file(file_entry)
+        index_file_name(file_name)
 
-        update.message.reply_text(
+        reply(
             f"✅ File '{file_name}' stored successfully! 📦\n"
             "Use /genlink to create a shareable link for this file, or /batchgen for multiple files! 🔗"
         )
         logger.info(f"✅ User {user_id} stored file '{file_name}'! 🌟")
     except Exception as e:
-        update.message.reply_text("⚠️ Failed to store file! Try again! 😅")
+        forget_identity_on_auth_error(context, e)
+        reply("⚠️ Failed to store file! Try again! 😅")
         log_error(f"🚨 File store error for user {user_id}: {str(e)}")
 
 def genlink(update: Update, context: CallbackContext):
     """🔗 Generate a shareable link for a single file (GenLink)."""
     user_id = str(update.effective_user.id)
     try:
-        stored_files = get_setting("stored_files", [])
-        if not stored_files:
-            update.message.reply_text("⚠️ No files stored yet! Send a file first! 😅")
-            return
-
         # Show the last 5 stored files by this user
-        user_files = [f for f in stored_files if f["user_id"] == user_id][-5:]
+        user_files = get_user_files(user_id, RECENT_FILES_LIMIT)
         if not user_files:
             update.message.reply_text("⚠️ You haven’t stored any files yet! Send a file first! 😅")
             return
 
+        # Buttons carry the message ID so they keep pointing at the same file after new uploads
         buttons = [
-            [InlineKeyboardButton(f"{f['file_name']}", callback_data=f"genlink_{i}")]
-            for i, f in enumerate(user_files)
+            [InlineKeyboardButton(f"{f['file_name']}", callback_data=f"genlink_{f['message_id']}")]
+            for f in user_files
         ]
         buttons.append([InlineKeyboardButton("Cancel 🚫", callback_data="cancel_genlink")])
 
@@ -109,6 +148,7 @@ def genlink(update: Update, context: CallbackContext):
         )
         logger.info(f"✅ User {user_id} requested to generate a link! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to generate link! Try again! 😅")
         log_error(f"🚨 GenLink error for user {user_id}: {str(e)}")
 
@@ -121,20 +161,20 @@ def handle_genlink_selection(update: Update, context: CallbackContext):
             update.callback_query.message.reply_text("🚫 Link generation cancelled! 😅")
             return
 
-        file_index = int(callback_data.split("_")[1])
-        stored_files = get_setting("stored_files", [])
-        user_files = [f for f in stored_files if f["user_id"] == user_id][-5:]
-        selected_file = user_files[file_index]
+        selected_file = get_owned_file(user_id, callback_data.split("_", 1)[1])
+        if not selected_file:
+            update.callback_query.message.reply_text("⚠️ File not found! Run /genlink again! 😅")
+            return
 
         # Generate a shareable link
-        bot_username = context.bot.get_me().username
-        link = f"https://t.me/{bot_username}?start=file_{selected_file['message_id']}"
+        link = f"https://t.me/{get_identity(context).username}?start=file_{selected_file['message_id']}"
 
         update.callback_query.message.reply_text(
             f"✅ Shareable link for '{selected_file['file_name']}':\n{link} 🔗"
         )
         logger.info(f"✅ User {user_id} generated link for file '{selected_file['file_name']}'! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to generate link! Try again! 😅")
         log_error(f"🚨 GenLink selection error for user {user_id}: {str(e)}")
 
@@ -142,21 +182,16 @@ def batchgen(update: Update, context: CallbackContext):
     """📦 Generate a shareable link for multiple files (BatchGen)."""
     user_id = str(update.effective_user.id)
     try:
-        stored_files = get_setting("stored_files", [])
-        if not stored_files:
-            update.message.reply_text("⚠️ No files stored yet! Send a file first! 😅")
-            return
-
         # Show the last 5 stored files by this user
-        user_files = [f for f in stored_files if f["user_id"] == user_id][-5:]
+        user_files = get_user_files(user_id, RECENT_FILES_LIMIT)
         if len(user_files) < 2:
             update.message.reply_text("⚠️ You need at least 2 files to create a batch! Send more files! 😅")
             return
 
         context.user_data["batch_selection"] = []
         buttons = [
-            [InlineKeyboardButton(f"{f['file_name']}", callback_data=f"batch_select_{i}")]
-            for i, f in enumerate(user_files)
+            [InlineKeyboardButton(f"{f['file_name']}", callback_data=f"batch_select_{f['message_id']}")]
+            for f in user_files
         ]
         buttons.append([InlineKeyboardButton("Done ✅", callback_data="batch_done")])
         buttons.append([InlineKeyboardButton("Cancel 🚫", callback_data="cancel_batchgen")])
@@ -167,6 +202,7 @@ def batchgen(update: Update, context: CallbackContext):
         )
         logger.info(f"✅ User {user_id} started batch creation! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to create batch! Try again! 😅")
         log_error(f"🚨 BatchGen error for user {user_id}: {str(e)}")
 
@@ -185,21 +221,19 @@ def handle_batchgen_selection(update: Update, context: CallbackContext):
                 update.callback_query.message.reply_text("⚠️ No files selected for the batch! 😅")
                 return
 
-            stored_files = get_setting("stored_files", [])
-            user_files = [f for f in stored_files if f["user_id"] == user_id][-5:]
-            selected_indices = context.user_data["batch_selection"]
-            selected_files = [user_files[i] for i in selected_indices]
+            selected_files = [get_owned_file(user_id, m) for m in context.user_data["batch_selection"]]
+            selected_files = [f for f in selected_files if f]
+            if not selected_files:
+                update.callback_query.message.reply_text("⚠️ Selected files not found! Run /batchgen again! 😅")
+                return
 
             # Generate a batch ID and save the batch
-            batch_id = str(len(get_setting("batches", [])) + 1)
+            batch_id = next_batch_id()
             batch_entry = {"batch_id": batch_id, "files": [f["message_id"] for f in selected_files]}
-            batches = get_setting("batches", [])
-            batches.append(batch_entry)
-            set_setting("batches", batches)
+            add_batch(batch_entry)
 
             # Generate a shareable link for the batch
-            bot_username = context.bot.get_me().username
-            link = f"https://t.me/{bot_username}?start=batch_{batch_id}"
+            link = f"https://t.me/{get_identity(context).username}?start=batch_{batch_id}"
 
             file_names = [f["file_name"] for f in selected_files]
             update.callback_query.message.reply_text(
@@ -210,20 +244,22 @@ def handle_batchgen_selection(update: Update, context: CallbackContext):
             return
 
         # Add file to batch selection
-        file_index = int(callback_data.split("_")[2])
-        if file_index not in context.user_data["batch_selection"]:
-            context.user_data["batch_selection"].append(file_index)
+        message_id = callback_data.split("_", 2)[2]
+        if message_id not in context.user_data["batch_selection"]:
+            context.user_data["batch_selection"].append(message_id)
             update.callback_query.answer("✅ File added to batch!")
         else:
-            context.user_data["batch_selection"].remove(file_index)
+            context.user_data["batch_selection"].remove(message_id)
             update.callback_query.answer("✅ File removed from batch!")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to create batch! Try again! 😅")
         log_error(f"🚨 BatchGen selection error for user {user_id}: {str(e)}")
 
 def handle_filestore_link(update: Update, context: CallbackContext):
     """🔗 Handle deep links to share files or batches."""
     user_id = str(update.effective_user.id)
+    record_user(context.bot, user_id)
     try:
         args = context.args
         if not args:
@@ -231,39 +267,39 @@ def handle_filestore_link(update: Update, context: CallbackContext):
 
         link_type, identifier = args[0].split("_", 1)
         if link_type == "file":
-            stored_files = get_setting("stored_files", [])
-            file_entry = next((f for f in stored_files if str(f["message_id"]) == identifier), None)
+            file_entry = get_stored_file(identifier)
             if not file_entry:
                 update.message.reply_text("⚠️ File not found! It may have been deleted! 😅")
                 return
 
-            context.bot.forward_message(
-                chat_id=update.message.chat_id,
-                from_chat_id=file_entry["chat_id"],
-                message_id=file_entry["message_id"]
-            )
-            update.message.reply_text(f"✅ Here’s your file: {file_entry['file_name']} 📦")
+            deliver_files(context.bot, update.message.chat_id, [file_entry], INTERACTIVE)[0].result()
+            reply_text(update.message, f"✅ Here’s your file: {file_entry['file_name']} 📦")
             logger.info(f"✅ User {user_id} accessed file '{file_entry['file_name']}' via link! 🌟")
 
         elif link_type == "batch":
-            batches = get_setting("batches", [])
-            batch_entry = next((b for b in batches if b["batch_id"] == identifier), None)
+            batch_entry = get_batch(identifier)
             if not batch_entry:
                 update.message.reply_text("⚠️ Batch not found! It may have been deleted! 😅")
                 return
 
-            stored_files = get_setting("stored_files", [])
-            for message_id in batch_entry["files"]:
-                file_entry = next((f for f in stored_files if str(f["message_id"]) == str(message_id)), None)
-                if file_entry:
-                    context.bot.forward_message(
-                        chat_id=update.message.chat_id,
-                        from_chat_id=file_entry["chat_id"],
-                        message_id=file_entry["message_id"]
-                    )
-            update.message.reply_text("✅ Here are your batch files! 📦")
+            # A few bulk forwards on the bulk lane, paced per chat and behind other users' replies.
+            # One chat's sends go out in order, so the closing reply is queued last and nobody waits here.
+            file_entries = [f for f in (get_stored_file(m) for m in batch_entry["files"]) if f]
+            deliver_files(context.bot, update.message.chat_id, file_entries, label=f"Batch {identifier} delivery")
+            get_outbound().submit(context.bot, update.message.chat_id, lambda: update.message.reply_text("✅ Here are your batch files! 📦"), BULK)
             logger.info(f"✅ User {user_id} accessed batch {identifier} via link! 🌟")
 
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to access file/batch! Try again! 😅")
         log_error(f"🚨 File store link error for user {user_id}: {str(e)}")
+
+def handle_start(update: Update, context: CallbackContext):
+    """🚀 /start: open a file or batch deep link when one is given, else show the welcome menu.
+
+    Other payloads (referral or ad tags) get the welcome menu too.
+    """
+    if context.args and context.args[0].startswith(LINK_PREFIXES):
+        handle_filestore_link(update, context)
+    else:
+        start(update, context)
@@ -2,6 +2,8 @@ from telegram import Update
 from telegram.ext import CallbackContext
 from utils.db_channel import get_setting
 from utils.logging_utils import log_error
+from utils.bot_identity import forget_identity_on_auth_error
+from utils.outbound import send_message
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,12 +20,10 @@ def handle_request(update: Update, context: CallbackContext):
             logger.info(f"⚠️ User {user_id} attempted request - no log channel set")
             return
 
-        context.bot.send_message(
-            chat_id=log_channel,
-            text=f"📩 New Request from User {user_id}:\n\n{request_text}"
-        )
+        send_message(context.bot, log_channel, f"📩 New Request from User {user_id}:\n\n{request_text}")
         update.message.reply_text("✅ Your request has been sent to the admins! 🎉")
         logger.info(f"✅ User {user_id} sent request: {request_text}! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to send request! Try again! 😅")
         log_error(f"🚨 Request error for user {user_id}: {str(e)}")
@@ -0,0 +1,35 @@
+from telegram import Update
+from telegram.ext import CallbackContext
+from handlers.request import handle_request
+import logging
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATE_KEY = "pending_state"  # user_data key naming the awaiting_* flag that gets the next text
+
+# awaiting_* flag -> handler for the text it waits for; modules plug in with register_text_state
+_text_routes = {}
+
+def register_text_state(state, handler):
+    """📌 Send a user's next text message to `handler` while user_data[state] is set."""
+    _text_routes[state] = handler
+
+def expect_text(context: CallbackContext, state, value=True):
+    """⏳ Set a waiting flag and make it the user's pending state for the router."""
+    context.user_data[state] = value
+    context.user_data[PENDING_STATE_KEY] = state
+
+def route_text(update: Update, context: CallbackContext):
+    """🧭 Route a text message to the handler waiting for it, or to handle_request."""
+    user_data = context.user_data
+    state = user_data.get(PENDING_STATE_KEY)
+    handler = _text_routes.get(state)
+    if handler is None or not user_data.get(state):
+        # Nothing pending, or the flag was cleared since (e.g. by a cancel button)
+        user_data.pop(PENDING_STATE_KEY, None)
+        handle_request(update, context)
+        return
+    handler(update, context)
+    # Handlers clear their flag when done; drop the pending state unless they set a new one
+    if not user_data.get(state) and user_data.get(PENDING_STATE_KEY) == state:
+        user_data.pop(PENDING_STATE_KEY, None)
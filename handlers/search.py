@@ -1,15 +1,66 @@
-from telegram import Update
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
-from utils.db_channel import get_setting
+from utils.search_index import get_search_index
+from utils.user_registry import record_user
 from utils.logging_utils import log_error
+from utils.bot_identity import forget_identity_on_auth_error
+from collections import OrderedDict
 import logging
+import secrets
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+SEARCH_RESULTS_LIMIT = 200  # Top-ranked results kept per query for paging
+SEARCH_PAGE_SIZE = 10  # Results shown per page
+SEARCH_CURSOR_TTL = 600  # Seconds a result cursor stays pageable
+SEARCH_MAX_CURSORS = 1000  # Oldest cursors are evicted beyond this
+MAX_MESSAGE_LENGTH = 4096  # Telegram's text limit
+
+# Server-side result cursors: cursor_id -> (expires_at, query, results)
+_cursors = OrderedDict()
+_cursors_lock = threading.Lock()
+
+def save_cursor(query, results):
+    """💾 Keep a query's ranked results so page buttons don't recompute them."""
+    cursor_id = secrets.token_hex(4)
+    now = time.monotonic()
+    with _cursors_lock:
+        while _cursors and (len(_cursors) >= SEARCH_MAX_CURSORS or next(iter(_cursors.values()))[0] < now):
+            _cursors.popitem(last=False)
+        _cursors[cursor_id] = (now + SEARCH_CURSOR_TTL, query, results)
+    return cursor_id
+
+def load_cursor(cursor_id):
+    """📂 Get (query, results) for a cursor, or None if it expired."""
+    with _cursors_lock:
+        entry = _cursors.get(cursor_id)
+        if not entry or entry[0] < time.monotonic():
+            _cursors.pop(cursor_id, None)
+            return None
+        return entry[1], entry[2]
+
+def render_page(cursor_id, query, results, page):
+    """📄 Build the text and prev/next buttons for one page of results."""
+    pages = (len(results) + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+    page = max(0, min(page, pages - 1))
+    chunk = results[page * SEARCH_PAGE_SIZE:(page + 1) * SEARCH_PAGE_SIZE]
+    text = f"🔍 Search Results for '{query}' (page {page + 1}/{pages}):\n\n" + "\n".join([f"📄 {file}" for file in chunk])
+    if len(text) > MAX_MESSAGE_LENGTH:
+        text = text[:MAX_MESSAGE_LENGTH - 3] + "..."
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"search_page_{cursor_id}_{page - 1}"))
+    if page < pages - 1:
+        nav.append(InlineKeyboardButton("Next ➡️", callback_data=f"search_page_{cursor_id}_{page + 1}"))
+    return text, InlineKeyboardMarkup([nav]) if nav else None
+
 def search(update: Update, context: CallbackContext):
     """🔍 Search for files based on user query."""
     user_id = update.effective_user.id
     query = update.message.text.replace("/search", "").strip()
+    record_user(context.bot, user_id)
 
     try:
         if not query:
@@ -17,17 +68,37 @@ def search(update: Update, context: CallbackContext):
             logger.info(f"⚠️ User {user_id} sent empty search query")
             return
 
-        files = get_setting("files", {})
-        matching_files = [name for name, data in files.items() if query.lower() in name.lower()]
-        
+        matching_files = get_search_index().search(query, limit=SEARCH_RESULTS_LIMIT)
+
         if not matching_files:
             update.message.reply_text("⚠️ No files found for your search! Try another term! 😅")
             logger.info(f"✅ User {user_id} searched for '{query}' - no results")
             return
 
-        response = "🔍 Search Results:\n\n" + "\n".join([f"📄 {file}" for file in matching_files])
-        update.message.reply_text(response)
+        cursor_id = save_cursor(query, matching_files)
+        text, reply_markup = render_page(cursor_id, query, matching_files, 0)
+        update.message.reply_text(text, reply_markup=reply_markup)
         logger.info(f"✅ User {user_id} searched for '{query}' - found {len(matching_files)} results! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to search files! Try again! 😅")
         log_error(f"🚨 Search error for user {user_id}: {str(e)}")
+
+def handle_search_page(update: Update, context: CallbackContext):
+    """📄 Show another page of a previous search from its cursor."""
+    user_id = update.effective_user.id
+    try:
+        cursor_id, page = update.callback_query.data[len("search_page_"):].rsplit("_", 1)
+        cursor = load_cursor(cursor_id)
+        if not cursor:
+            update.callback_query.answer("⚠️ Search expired! Run /search again! 😅")
+            return
+        query, results = cursor
+        text, reply_markup = render_page(cursor_id, query, results, int(page))
+        update.callback_query.answer()
+        update.callback_query.edit_message_text(text, reply_markup=reply_markup)
+        logger.info(f"✅ User {user_id} opened page {int(page) + 1} of search '{query}'! 🌟")
+    except Exception as e:
+        forget_identity_on_auth_error(context, e)
+        update.callback_query.answer("⚠️ Failed to load page! Try again! 😅")
+        log_error(f"🚨 Search page error for user {user_id}: {str(e)}")
@@ -1,8 +1,11 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
-from utils.db_channel import set_setting, get_setting
+from utils.db_channel import set_setting, update_setting
 from utils.logging_utils import log_error
+from utils.bot_identity import forget_identity_on_auth_error
+from handlers.router import expect_text, register_text_state
 from handlers.start import shortener_menu
+from utils.clone_runtime import get_webhook_url, WEBHOOK_URL
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,26 +25,34 @@ def handle_settings(update: Update, context: CallbackContext):
     callback_data = update.callback_query.data
     try:
         if callback_data == "add_channel":
-            context.user_data["awaiting_channel"] = "add"
+            expect_text(context, "awaiting_channel", "add")
             update.callback_query.message.reply_text(
                 "📺 Send the channel ID or username to add! (e.g., @ChannelName or -100123456789)"
             )
             logger.info(f"✅ Admin {user_id} started adding channel! 🌟")
         elif callback_data == "remove_channel":
-            context.user_data["awaiting_channel"] = "remove"
+            expect_text(context, "awaiting_channel", "remove")
             update.callback_query.message.reply_text(
                 "🗑️ Send the channel ID or username to remove! (e.g., @ChannelName or -100123456789)"
             )
             logger.info(f"✅ Admin {user_id} started removing channel! 🌟")
         elif callback_data == "set_group_link":
-            context.user_data["awaiting_group_link"] = True
+            expect_text(context, "awaiting_group_link")
             update.callback_query.message.reply_text(
                 "🔗 Send the group link! (e.g., https://t.me/+GroupLink)"
             )
             logger.info(f"✅ Admin {user_id} started setting group link! 🌟")
         elif callback_data == "shortener":
             shortener_menu(update, context)
-        elif callback_data in ["set_force_sub", "set_db_channel", "set_log_channel", "welcome_message", "auto_delete", "banner", "set_webhook", "anti_ban", "enable_redis"]:
+        elif callback_data == "set_webhook":
+            expect_text(context, "awaiting_webhook_url")
+            current_url = get_webhook_url()
+            update.callback_query.message.reply_text(
+                f"🌍 Current mode: {f'webhook at {current_url}' if current_url else 'polling'}\n"
+                "Send the public HTTPS base URL of this deployment (e.g., https://yourapp.onrender.com), or 'off' to go back to polling!"
+            )
+            logger.info(f"✅ Admin {user_id} started setting webhook! 🌟")
+        elif callback_data in ["set_force_sub", "set_db_channel", "set_log_channel", "welcome_message", "auto_delete", "banner", "anti_ban", "enable_redis"]:
             update.callback_query.message.reply_text(
                 f"⚙️ {callback_data.replace('_', ' ').title()} is not fully implemented yet! Coming soon! 🚧"
             )
@@ -50,6 +61,7 @@ def handle_settings(update: Update, context: CallbackContext):
             update.callback_query.message.reply_text("⚠️ Unknown setting! Try again! 😅")
             log_error(f"🚨 Unknown callback {callback_data} by {user_id}")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to process setting! Try again! 😅")
         log_error(f"🚨 Settings error for {user_id}: {str(e)}")
 
@@ -69,19 +81,26 @@ def handle_settings_input(update: Update, context: CallbackContext):
         if context.user_data.get("awaiting_channel"):
             action = context.user_data["awaiting_channel"]
             channel = update.message.text.strip()
-            channels = get_setting("channels", [])
-            if action == "add":
-                if channel not in channels:
+            changed = {}
+
+            def edit_channels(channels):
+                if action == "add" and channel not in channels:
                     channels.append(channel)
-                    set_setting("channels", channels)
+                    changed["done"] = True
+                elif action == "remove" and channel in channels:
+                    channels.remove(channel)
+                    changed["done"] = True
+                return channels
+
+            update_setting("channels", edit_channels, [])
+            if action == "add":
+                if changed.get("done"):
                     update.message.reply_text(f"📺 Channel {channel} added! 🎉")
                     logger.info(f"✅ Admin {user_id} added channel {channel}! 🌟")
                 else:
                     update.message.reply_text(f"⚠️ Channel {channel} already added! 😅")
             elif action == "remove":
-                if channel in channels:
-                    channels.remove(channel)
-                    set_setting("channels", channels)
+                if changed.get("done"):
                     update.message.reply_text(f"🗑️ Channel {channel} removed! 🎉")
                     logger.info(f"✅ Admin {user_id} removed channel {channel}! 🌟")
                 else:
@@ -97,8 +116,30 @@ def handle_settings_input(update: Update, context: CallbackContext):
             update.message.reply_text("🔗 Group link set! 🎉")
             logger.info(f"✅ Admin {user_id} set group link! 🌟")
             context.user_data["awaiting_group_link"] = None
+        elif context.user_data.get("awaiting_webhook_url"):
+            webhook_url = update.message.text.strip().rstrip("/")
+            if webhook_url.lower() == "off":
+                set_setting("webhook_url", None)
+                update.message.reply_text("📡 Webhook mode off! Restart the bot to switch back to polling! 🔄")
+            elif not webhook_url.startswith("https://"):
+                update.message.reply_text("⚠️ Invalid webhook URL! Must start with https:// 😅")
+                log_error(f"🚨 Invalid webhook URL input by {user_id}")
+                return
+            else:
+                set_setting("webhook_url", webhook_url)
+                update.message.reply_text("🌍 Webhook URL set! Restart the bot to receive updates for all bots through it! 🔄")
+            if WEBHOOK_URL:
+                update.message.reply_text(f"ℹ️ WEBHOOK_URL is set in the environment and takes precedence ({WEBHOOK_URL})!")
+            logger.info(f"✅ Admin {user_id} set webhook URL to {webhook_url}! 🌟")
+            context.user_data["awaiting_webhook_url"] = None
         else:
             update.message.reply_text("⚠️ No setting input expected! Use the menu! 😅")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to process input! Try again! 😅")
         log_error(f"🚨 Settings input error for {user_id}: {str(e)}")
+
+# 🧭 Text replies these handlers wait for
+register_text_state("awaiting_channel", handle_settings_input)
+register_text_state("awaiting_group_link", handle_settings_input)
+register_text_state("awaiting_webhook_url", handle_settings_input)
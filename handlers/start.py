@@ -1,16 +1,26 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
-from utils.db_channel import set_setting, get_setting
+from utils.db_channel import set_setting, get_setting, get_cloned_bots
+from utils.clone_runtime import get_clone_runtime
+from utils.clone_supervisor import get_clone_supervisor
+from utils.outbound import get_outbound
+from utils.user_registry import get_user_registry, record_user, bot_id_of
 from utils.logging_utils import log_error
+from utils.bot_identity import forget_identity_on_auth_error
+from handlers.router import expect_text, register_text_state
+from collections import Counter
 import logging
 
 logger = logging.getLogger(__name__)
 
+CLONE_STATE_ICONS = {"active": "⚡", "hibernated": "💤", "standalone": "🏠", "stopped": "⏹️"}
+
 def start(update: Update, context: CallbackContext):
     """🚀 Welcome users to the Cloner Bot with a cool menu for admins!"""
     user_id = str(update.effective_user.id)  # Ensure user_id is a string
     admin_ids = context.bot_data.get("admin_ids", [])
     is_main_bot = context.bot_data.get("is_main_bot", False)
+    record_user(context.bot, user_id)
 
     try:
         logger.info(f"🔍 Checking admin status: user_id={user_id}, admin_ids={admin_ids}, is_main_bot={is_main_bot}")
@@ -38,6 +48,7 @@ def start(update: Update, context: CallbackContext):
             )
             logger.info(f"✅ User {user_id} started bot (non-admin)! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Oops! Something broke! Try again! 😅")
         log_error(f"🚨 Start error for user {user_id}: {str(e)}")
 
@@ -68,6 +79,7 @@ def settings_menu(update: Update, context: CallbackContext):
         )
         logger.info(f"✅ Admin {user_id} opened settings menu! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to load settings! Try again! 😅")
         log_error(f"🚨 Settings menu error for {user_id}: {str(e)}")
 
@@ -94,6 +106,7 @@ def batch_menu(update: Update, context: CallbackContext):
         )
         logger.info(f"✅ Admin {user_id} opened batch menu! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to load batch menu! Try again! 😅")
         log_error(f"🚨 Batch menu error for {user_id}: {str(e)}")
 
@@ -110,17 +123,38 @@ def bot_stats(update: Update, context: CallbackContext):
         return
 
     try:
-        cloned_bots = get_setting("cloned_bots", [])
+        cloned_bots = get_cloned_bots()
         batches = get_setting("batches", [])
+        supervisor = get_clone_supervisor()
+        running = supervisor.states() if supervisor else get_clone_runtime().states()
+        states = Counter()
+        queue = get_outbound().depth()
+        user_counts = get_user_registry().counts()
+        main_users, main_blocked = user_counts.get(bot_id_of(context.bot.token), (0, 0))
+        clone_lines = []
+        clone_users = 0
+        for bot in cloned_bots:
+            state = "standalone" if bot.get("standalone", False) else running.get(bot["token"], "stopped")
+            states[state] += 1
+            users = user_counts.get(bot_id_of(bot["token"]), (0, 0))[0]
+            clone_users += users
+            clone_lines.append(f"{CLONE_STATE_ICONS[state]} …{bot['token'][-4:]} | {bot.get('usage', 'searchbot').upper()} | {state.upper()} | 👥 {users}")
         stats_message = (
             "📊 Bot Stats for @bot_paiyan_official! 🌟\n"
-            f"🤖 Cloned Bots: {len(cloned_bots)}\n"
+            f"🤖 Cloned Bots: {len(cloned_bots)} (⚡ {states['active']} active | 💤 {states['hibernated']} hibernated | ⏹️ {states['stopped']} stopped)\n"
+            f"👥 Users: {main_users} ({main_blocked} blocked) | {clone_users} across clones\n"
             f"📦 Batches Created: {len(batches)}\n"
+            f"📤 Send queue: {queue['interactive']} replies | {queue['bulk']} bulk\n"
             "Keep ruling Telegram! 💪"
         )
+        if clone_lines:
+            stats_message += "\n\n" + "\n".join(clone_lines)
+        if len(stats_message) > 4096:
+            stats_message = stats_message[:4093] + "..."
         update.callback_query.message.reply_text(stats_message)
         logger.info(f"✅ Admin {user_id} viewed bot stats! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to load stats! Try again! 😅")
         log_error(f"🚨 Bot stats error for {user_id}: {str(e)}")
 
@@ -147,6 +181,7 @@ def shortener_menu(update: Update, context: CallbackContext):
         )
         logger.info(f"✅ Admin {user_id} opened shortener menu! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to load shortener menu! Try again! 😅")
         log_error(f"🚨 Shortener menu error for {user_id}: {str(e)}")
 
@@ -170,12 +205,13 @@ def handle_shortener_selection(update: Update, context: CallbackContext):
             logger.info(f"✅ Admin {user_id} disabled shortener! 🌟")
         else:
             service = callback_data.split("_")[1]  # e.g., "gplinks" or "tinyurl"
-            context.user_data["awaiting_shortener_input"] = service
+            expect_text(context, "awaiting_shortener_input", service)
             update.callback_query.message.reply_text(
                 f"🔗 Enter the API key or base URL for {service}! 🛠️"
             )
             logger.info(f"✅ Admin {user_id} selected shortener: {service}! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to select shortener! Try again! 😅")
         log_error(f"🚨 Shortener selection error for {user_id}: {str(e)}")
 
@@ -202,5 +238,9 @@ def handle_shortener_input(update: Update, context: CallbackContext):
         update.message.reply_text(f"✅ {service} shortener set! 🎉")
         logger.info(f"✅ Admin {user_id} set {service} shortener! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.message.reply_text("⚠️ Failed to set shortener! Check input! 😅")
         log_error(f"🚨 Shortener input error for {user_id}: {str(e)}")
+
+# 🧭 Text replies these handlers wait for
+register_text_state("awaiting_shortener_input", handle_shortener_input)
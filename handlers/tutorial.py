@@ -1,6 +1,7 @@
 from telegram import Update
 from telegram.ext import CallbackContext
 from utils.logging_utils import log_error
+from utils.bot_identity import forget_identity_on_auth_error
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,5 +21,6 @@ def tutorial(update: Update, context: CallbackContext):
         update.callback_query.message.reply_text(tutorial_text)
         logger.info(f"✅ User {user_id} viewed tutorial! 🌟")
     except Exception as e:
+        forget_identity_on_auth_error(context, e)
         update.callback_query.message.reply_text("⚠️ Failed to load tutorial! Try again! 😅")
         log_error(f"🚨 Tutorial error for user {user_id}: {str(e)}")
@@ -0,0 +1,115 @@
+import argparse
+import gc
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def rss_kb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+def wait_for(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def main():
+    """🧵 Start N clones against a local fake Bot API and report per-clone memory, threads and latency."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--clones", type=int, default=200)
+    parser.add_argument("--webhook", action="store_true", help="receive updates through the shared webhook server instead of polling")
+    parser.add_argument("--latency", type=float, default=0, help="seconds the fake API adds to every call (startup is dominated by get_me round-trips)")
+    parser.add_argument("--hibernate", type=int, default=0, metavar="SECONDS", help="start clones lazily and hibernate them after this much idle time")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_clones_")
+    os.makedirs(os.path.join(workdir, "config"))
+    os.chdir(workdir)
+    port = free_port()
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{port}"
+    webhook_port = free_port()
+    if args.webhook:
+        os.environ["WEBHOOK_URL"] = f"http://127.0.0.1:{webhook_port}"
+        os.environ["WEBHOOK_LISTEN"] = "127.0.0.1"
+        os.environ["WEBHOOK_PORT"] = str(webhook_port)
+    if args.hibernate:
+        os.environ["CLONE_HIBERNATE_AFTER"] = str(args.hibernate)
+        os.environ["CLONE_HIBERNATE_POLL_INTERVAL"] = "1"
+
+    from fake_bot_api import FakeBotApi, message_update
+    from utils.db_channel import add_cloned_bot
+    from bot import start_cloned_bots
+    from utils.clone_runtime import get_clone_runtime, get_webhook_url
+    api = FakeBotApi(port=port, latency=args.latency).start()
+    if args.webhook:
+        get_clone_runtime().use_webhook(get_webhook_url())
+
+    tokens = [f"{100000 + i}:fake-token-{i:06d}" for i in range(args.clones)]
+    bots = [
+        {"token": token, "visibility": "public", "usage": "searchbot" if i % 2 else "filestore", "owner_id": "1", "standalone": False}
+        for i, token in enumerate(tokens)
+    ]
+    for bot in bots:
+        add_cloned_bot(bot)
+
+    gc.collect()
+    tracemalloc.start()
+    threads_before, rss_before = threading.active_count(), rss_kb()
+    started = time.perf_counter()
+    instances = start_cloned_bots(bots, ["1"], lazy=bool(args.hibernate))
+    startup = time.perf_counter() - started
+    registered = (lambda: len(api.webhooks) >= args.clones) if args.webhook else (lambda: len({c[0] for c in api.calls_to("getUpdates")}) >= args.clones)
+    wait_for(registered, 30)
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    threads_after, rss_after = threading.active_count(), rss_kb()
+
+    started = time.perf_counter()
+    for token in tokens:
+        api.inject(token, message_update(42, "/start"))
+    answered = wait_for(lambda: len({c[0] for c in api.calls_to("sendMessage")}) >= args.clones, 60)
+    roundtrip = time.perf_counter() - started
+
+    print(f"🧵 {args.clones} clones started in {startup:.2f}s ({len(instances)} running)")
+    print(f"📏 Python heap per clone: {traced / args.clones / 1024:.1f} KB | RSS per clone: {(rss_after - rss_before) / args.clones:.1f} KB")
+    print(f"🧶 Threads: {threads_before} -> {threads_after}")
+    print(f"📨 /start answered by {len({c[0] for c in api.calls_to('sendMessage')})}/{args.clones} clones in {roundtrip:.2f}s")
+    if args.webhook:
+        # A delivery with the wrong secret header must be refused
+        api.webhooks[tokens[0]] = (api.webhooks[tokens[0]][0], "wrong-secret")
+        api.inject(tokens[0], message_update(42, "/start"))
+        wait_for(lambda: len(api.deliveries) > args.clones, 10)
+        print(f"🌍 getUpdates calls: {len(api.calls_to('getUpdates'))} | webhook statuses: {sorted(set(status for _, status in api.deliveries))}")
+        answered = answered and api.deliveries[-1][1] == 403 and not api.calls_to("getUpdates")
+
+    if args.hibernate:
+        runtime = get_clone_runtime()
+        asleep = wait_for(lambda: set(runtime.states().values()) == {"hibernated"}, args.hibernate * 3 + 5)
+        sent = len(api.calls_to("sendMessage"))
+        started = time.perf_counter()
+        api.inject(tokens[-1], message_update(42, "/start"))
+        woke = wait_for(lambda: len(api.calls_to("sendMessage")) > sent, 10)
+        print(f"💤 All clones hibernated: {asleep} | woke and answered in {time.perf_counter() - started:.2f}s: {woke} | states: {dict(Counter(runtime.states().values()))}")
+        answered = answered and asleep and woke
+
+    get_clone_runtime().stop()
+    sys.exit(0 if answered else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.search_index import SearchIndex
+
+WORDS = [
+    "movie", "series", "season", "episode", "tamil", "telugu", "hindi", "english", "dubbed", "hdrip",
+    "webrip", "bluray", "1080p", "720p", "480p", "x264", "x265", "hevc", "aac", "dts", "extended",
+    "directors", "cut", "remastered", "part", "collection", "trilogy", "documentary", "anime", "ost",
+]
+QUERIES = ["movie", "tamil 1080p", "sea", "season episode", "blu", "directors cut", "x265 hevc", "zzz"]
+
+def synthetic_names(count, seed=42):
+    """🎲 Generate file names like 'Tamil.Movie.1234.1080p.x264.mkv'."""
+    rng = random.Random(seed)
+    for i in range(count):
+        words = rng.sample(WORDS, rng.randint(3, 6))
+        yield ".".join(w.title() for w in words) + f".{i}." + rng.choice(["mkv", "mp4", "pdf", "zip"])
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+def bench(count, rounds=20):
+    index = SearchIndex()
+    started = time.perf_counter()
+    for name in synthetic_names(count):
+        index.add(name)
+    build = time.perf_counter() - started
+    print(f"📦 {count} names indexed in {build:.1f}s")
+    for query in QUERIES:
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            results = index.search(query, limit=50)
+            samples.append((time.perf_counter() - started) * 1000)
+        print(f"   🔍 {query!r:18} p50={percentile(samples, 50):7.2f}ms p99={percentile(samples, 99):7.2f}ms hits={len(results)}")
+
+def main():
+    """⏱️ Measure search latency over synthetic catalogs (default: 100k and 1M names)."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for count in sizes:
+        bench(count)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.user_registry import UserRegistry
+
+def bench(count, bots=10):
+    """⏱️ Record `count` users spread over `bots` bots, then time lookups, reload and a full scan."""
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_users_"), "users.log")
+    rng = random.Random(42)
+    users = [(rng.randrange(bots), rng.randrange(1, 8_000_000_000)) for _ in range(count)]
+    registry = UserRegistry(path)
+    started = time.perf_counter()
+    for bot_id, user_id in users:
+        registry.record(bot_id, user_id)
+    record = time.perf_counter() - started
+    started = time.perf_counter()
+    for bot_id, user_id in users[:100_000]:
+        registry.record(bot_id, user_id)
+    repeat = time.perf_counter() - started
+    print(f"👥 {count} users over {bots} bots: {os.path.getsize(path) / count:.0f} bytes/user on disk")
+    print(f"   ✍️ new user {record / count * 1e6:.1f}µs | returning user {repeat / min(count, 100_000) * 1e6:.1f}µs")
+    started = time.perf_counter()
+    reloaded = UserRegistry(path)
+    counts = reloaded.counts()
+    print(f"   🔄 reload {time.perf_counter() - started:.2f}s ({sum(n for n, _ in counts.values())} users)")
+    tracemalloc.start()
+    measured = UserRegistry(path)
+    measured.counts()
+    for ids in measured._users.values():
+        ids.merge()
+    print(f"   🧠 {tracemalloc.get_traced_memory()[0] / count:.1f} bytes/user in memory")
+    tracemalloc.stop()
+    started = time.perf_counter()
+    streamed = sum(1 for _ in reloaded.iter_users(0))
+    print(f"   📜 streamed bot 0's {streamed} users in {time.perf_counter() - started:.2f}s")
+
+def main():
+    """⏱️ Measure the user registry at growing sizes (default: 100k and 1M users)."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for count in sizes:
+        bench(count)
+
+if __name__ == "__main__":
+    main()
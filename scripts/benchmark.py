@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stress_storage import FakeBot, FakeMessage, wait_until_stored
+from bench_search import synthetic_names, percentile, QUERIES
+
+CHANNEL_ID = "-100"
+
+def rss_mb():
+    """📏 Current resident memory of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+def generate_catalog(size, seed=7):
+    """🎲 Build synthetic settings: `size` stored files and files, ~size/100 users and batches."""
+    rng = random.Random(seed)
+    users = max(10, size // 100)
+    stored_files, files = [], {}
+    for message_id, name in enumerate(synthetic_names(size, seed), start=1):
+        user_id = str(rng.randrange(users))
+        stored_files.append({"file_id": f"f{message_id}", "file_name": name, "message_id": message_id, "chat_id": CHANNEL_ID, "user_id": user_id})
+        files[name] = {"file_id": f"f{message_id}", "uploader": int(user_id)}
+    batches = [
+        {"batch_id": str(i + 1), "files": rng.sample(range(1, size + 1), rng.randint(2, min(10, size)))}
+        for i in range(max(10, size // 100))
+    ]
+    return {"stored_files": stored_files, "files": files, "batches": batches, "sequences": {"batches": len(batches)}}, users
+
+def fake_update(user_id, text="", document=None, data=None):
+    message = FakeMessage(user_id, random.randrange(1, 10**9), document)
+    message.text = text
+    query = SimpleNamespace(data=data, message=message, answer=lambda *a, **k: None, edit_message_text=lambda *a, **k: None) if data else None
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), effective_chat=SimpleNamespace(id=user_id), message=message, callback_query=query)
+
+def fake_context(args=None):
+    from utils.bot_identity import BOT_IDENTITY_KEY
+    bot = FakeBot()
+    return SimpleNamespace(bot=bot, user_data={}, args=args or [], bot_data={"is_main_bot": True, "admin_ids": [], BOT_IDENTITY_KEY: bot.get_me()})
+
+def measure(fn, rounds):
+    samples = []
+    for i in range(rounds):
+        started = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"count": rounds, "p50_ms": round(percentile(samples, 50), 3), "p99_ms": round(percentile(samples, 99), 3)}
+
+def run_case(size, rounds):
+    """⏱️ Load a synthetic catalog into the configured backend and time the handlers."""
+    from utils.db_channel import set_setting, get_user_files, flush_settings
+    catalog, users = generate_catalog(size)
+    started = time.perf_counter()
+    for key, value in catalog.items():
+        set_setting(key, value)
+    flush_settings()
+    load_seconds = time.perf_counter() - started
+    del catalog
+    rss_loaded = rss_mb()
+
+    from handlers.filestore import store_file, genlink, handle_genlink_selection, handle_filestore_link
+    from handlers.search import search
+    from handlers.file_handler import handle_file
+    from utils.search_index import get_search_index
+
+    started = time.perf_counter()
+    get_search_index()
+    index_seconds = time.perf_counter() - started
+    rng = random.Random(11)
+    batch_count = max(10, size // 100)
+
+    def store(i):
+        # Timed until the file is saved, not just until the handler hands the forward to the outbound scheduler
+        user_id = rng.randrange(users)
+        document = SimpleNamespace(file_id=f"new{i}", file_name=f"Bench.Upload.{i}.mkv")
+        store_file(fake_update(user_id, document=document), fake_context())
+        wait_until_stored(user_id, document.file_id)
+
+    def upload(i):
+        document = SimpleNamespace(file_id=f"up{i}", file_name=f"Bench.Handle.{i}.pdf")
+        handle_file(fake_update(rng.randrange(users), document=document), fake_context())
+
+    def do_search(i):
+        search(fake_update(1, text=f"/search {QUERIES[i % len(QUERIES)]}"), fake_context())
+
+    def do_genlink(i):
+        user_id = rng.randrange(users)
+        genlink(fake_update(user_id), fake_context())
+        user_files = get_user_files(user_id, 5)
+        if user_files:
+            handle_genlink_selection(fake_update(user_id, data=f"genlink_{user_files[-1]['message_id']}"), fake_context())
+
+    # A fresh requester per round: deliveries to one chat would time its 1 msg/s pacing, not the handler
+    def deeplink_file(i):
+        handle_filestore_link(fake_update(10**6 + i), fake_context([f"file_{rng.randrange(1, size + 1)}"]))
+
+    def deeplink_batch(i):
+        handle_filestore_link(fake_update(2 * 10**6 + i), fake_context([f"batch_{rng.randrange(1, batch_count + 1)}"]))
+
+    ops = {
+        "store": measure(store, rounds),
+        "upload": measure(upload, rounds),
+        "search": measure(do_search, rounds),
+        "genlink": measure(do_genlink, rounds),
+        "deeplink_file": measure(deeplink_file, rounds),
+        "deeplink_batch": measure(deeplink_batch, rounds),
+    }
+    flush_settings()
+    return {
+        "size": size,
+        "load_s": round(load_seconds, 3),
+        "index_build_s": round(index_seconds, 3),
+        "rss_loaded_mb": round(rss_loaded, 1),
+        "rss_final_mb": round(rss_mb(), 1),
+        "ops": ops,
+    }
+
+def git_version():
+    try:
+        return subprocess.check_output(["git", "describe", "--always", "--dirty"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def compare(baseline_path, current_path, threshold):
+    """📊 Print per-op p50/p99 ratios between two result files; exit 1 on regressions."""
+    def index(path):
+        with open(path) as f:
+            results = json.load(f)["results"]
+        return {(r["backend"], r["size"], op): stats for r in results for op, stats in r["ops"].items()}
+    baseline, current = index(baseline_path), index(current_path)
+    regressions = 0
+    for key in sorted(set(baseline) & set(current)):
+        for metric in ("p50_ms", "p99_ms"):
+            ratio = current[key][metric] / max(baseline[key][metric], 1e-6)
+            flag = "🚨" if ratio > threshold else "  "
+            regressions += ratio > threshold
+            print(f"{flag} {key[0]:8} {key[1]:>8} {key[2]:15} {metric}: {baseline[key][metric]:9.3f} -> {current[key][metric]:9.3f} ({ratio:.2f}x)")
+    sys.exit(1 if regressions else 0)
+
+def main():
+    """📈 Benchmark storage and handlers over synthetic catalogs, writing JSON results."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--sizes", default="1000,100000", help="comma-separated catalog sizes (e.g. 1000,100000,1000000)")
+    parser.add_argument("--backends", default="json,sqlite", help="comma-separated STORAGE_BACKEND values")
+    parser.add_argument("--rounds", type=int, default=200, help="calls timed per operation")
+    parser.add_argument("--output", default="bench_output.json", help="where to write machine-readable results")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=1.5, help="ratio counted as a regression by --compare")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.compare[0], args.compare[1], args.threshold)
+        return
+
+    if args.child:
+        # One backend and size per process, so memory numbers and module state don't leak between cases
+        print(json.dumps(run_case(int(args.sizes), args.rounds)))
+        return
+
+    results = []
+    for backend in args.backends.split(","):
+        for size in [int(s) for s in args.sizes.split(",")]:
+            workdir = tempfile.mkdtemp(prefix="bench_")
+            os.makedirs(os.path.join(workdir, "config"))
+            env = dict(os.environ, STORAGE_BACKEND=backend, FILESTORE_CHANNEL_ID=CHANNEL_ID)
+            output = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), "--child", "--sizes", str(size), "--rounds", str(args.rounds)],
+                cwd=workdir, env=env, text=True, stderr=subprocess.DEVNULL
+            )
+            result = json.loads(output.strip().splitlines()[-1])
+            result["backend"] = backend
+            results.append(result)
+            ops = " ".join(f"{op}={stats['p50_ms']}/{stats['p99_ms']}ms" for op, stats in result["ops"].items())
+            print(f"📦 {backend:8} {size:>8} files | rss {result['rss_final_mb']}MB | p50/p99 {ops}")
+
+    with open(args.output, "w") as f:
+        json.dump({"version": git_version(), "python": sys.version.split()[0], "created": time.time(), "results": results}, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_clones import free_port
+
+USER_ID = 42  # The clone's owner, who runs /genlink
+
+def callback_update(user_id, data):
+    """🔘 An inline-button press from `user_id` on a message in their private chat."""
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+    message = {"message_id": 1, "date": 0, "chat": {"id": user_id, "type": "private"}, "text": "menu"}
+    return {"update_id": 2, "callback_query": {"id": "1", "from": user, "chat_instance": "1", "data": data, "message": message}}
+
+def main():
+    """🔑 Send a 401 through a clone's own handler and check its cached identity is dropped and re-fetched."""
+    workdir = tempfile.mkdtemp(prefix="check_auth_errors_")
+    os.makedirs(os.path.join(workdir, "config"))
+    os.chdir(workdir)
+    port = free_port()
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["FILESTORE_CHANNEL_ID"] = "-100"
+
+    from telegram import Update
+    from fake_bot_api import FakeBotApi, message_update
+    from utils.db_channel import add_stored_file
+    from utils.bot_identity import BOT_IDENTITY_KEY, identity_from_entry, remember_identity
+    from bot import build_clone_dispatcher
+    api = FakeBotApi(port=port).start()
+
+    # Saved under a username the bot no longer has, so a stale identity shows up in the link
+    bot_info = {"token": "400001:fake-token-auth", "visibility": "public", "usage": "filestore", "owner_id": str(USER_ID),
+                "standalone": False, "bot_id": 400001, "username": "old_name_bot", "first_name": "Old"}
+    dispatcher = build_clone_dispatcher(bot_info["token"], bot_info, ["1"])
+    remember_identity(dispatcher, identity_from_entry(bot_info))
+    dispatcher.error_handlers.clear()  # Only the handler's own catch may react to the 401
+    add_stored_file({"file_id": "f1", "file_name": "Movie.mkv", "message_id": 7, "chat_id": "-100", "user_id": str(USER_ID)})
+    problems = []
+
+    # The token is revoked: /genlink's reply gets a 401, which genlink catches itself
+    api.revoked.add(bot_info["token"])
+    dispatcher.process_update(Update.de_json(dict(message_update(USER_ID, "/genlink"), update_id=1), dispatcher.bot))
+    if BOT_IDENTITY_KEY in dispatcher.bot_data:
+        problems.append("identity still cached after a 401 caught by the handler")
+
+    # The token works again: the next link re-fetches the identity once and uses the current username
+    api.revoked.discard(bot_info["token"])
+    sent = len(api.calls_to("sendMessage"))
+    dispatcher.process_update(Update.de_json(callback_update(USER_ID, "genlink_7"), dispatcher.bot))
+    replies = [c[2].get("text", "") for c in api.calls_to("sendMessage")[sent:]]
+    me_calls = len(api.calls_to("getMe"))
+    print(f"🔑 getMe calls {me_calls}, reply {replies}")
+    if me_calls != 1:
+        problems.append(f"expected one getMe after the 401, got {me_calls}")
+    if not any("?start=file_7" in text and "old_name_bot" not in text for text in replies):
+        problems.append("link after the 401 doesn't use the re-fetched username")
+
+    for problem in problems:
+        print(f"🚨 {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ A 401 inside a handler dropped the cached identity!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_clones import free_port, wait_for
+
+def main():
+    """🗑️ Queue deletions, "restart" with some overdue, and check they go out as a few bulk deleteMessages calls."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--chats", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="check_auto_delete_")
+    os.makedirs(os.path.join(workdir, "config"))
+    os.chdir(workdir)
+    port = free_port()
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{port}"
+
+    from fake_bot_api import FakeBotApi
+    from utils.clone_runtime import get_clone_runtime
+    from features.auto_delete import DeletionScheduler, AUTO_DELETE_DB, MAX_DELETE_BATCH, set_auto_delete, get_deletion_scheduler
+    api = FakeBotApi(port=port).start()
+    bot = get_clone_runtime().make_bot("123456:fake-token-auto-delete")
+    chats = [-1000 - i for i in range(args.chats)]
+    per_chat = args.messages // args.chats
+
+    # Queued by a process that goes down before any of it is due
+    before_restart = DeletionScheduler(AUTO_DELETE_DB)
+    for chat_id in chats:
+        before_restart.schedule(bot, chat_id, range(1, per_chat // 2 + 1), -60)  # Overdue at the next start
+        before_restart.schedule(bot, chat_id, range(per_chat // 2 + 1, per_chat + 1), 2)
+    print(f"💾 {before_restart.pending()[0]} deletions queued on disk, {before_restart.pending()[1]} overdue")
+
+    started = time.perf_counter()
+    scheduler = get_deletion_scheduler().start()
+    recovered = wait_for(lambda: scheduler.pending()[0] <= args.messages - len(chats) * (per_chat // 2), 15)
+    recovery_seconds = time.perf_counter() - started
+    set_auto_delete(bot, chats[0], per_chat + 1, 1 / 3600)  # The one-message helper, due in 1s
+    emptied = wait_for(lambda: scheduler.pending()[0] == 0, 30)
+    seconds = time.perf_counter() - started
+
+    deleted = {}
+    calls = api.calls_to("deleteMessages") + api.calls_to("deleteMessage")
+    for _, method, params in calls:
+        ids = params["message_ids"] if method == "deleteMessages" else [params["message_id"]]
+        ids = json.loads(ids) if isinstance(ids, str) else ids  # PTB sends lists JSON-encoded
+        for message_id in ids:
+            deleted.setdefault(int(params["chat_id"]), []).append(int(message_id))
+    expected = {chat_id: list(range(1, per_chat + 1)) for chat_id in chats}
+    expected[chats[0]].append(per_chat + 1)
+    print(f"🗑️ {sum(len(ids) for ids in deleted.values())} messages deleted with {len(calls)} calls in {seconds:.1f}s (overdue ones after {recovery_seconds:.1f}s)")
+
+    problems = []
+    if not recovered:
+        problems.append("overdue deletions were not recovered at start")
+    if not emptied:
+        problems.append("the queue never emptied")
+    if {chat_id: sorted(ids) for chat_id, ids in deleted.items()} != expected:
+        problems.append("deleted messages don't match the queued ones (missing or repeated)")
+    if len(calls) > len(chats) * (-(-per_chat // MAX_DELETE_BATCH) + 2) + 1:
+        problems.append("deletions were not grouped into bulk calls")
+
+    scheduler.stop()
+    get_clone_runtime().stop()
+    for problem in problems:
+        print(f"🚨 {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Every queued deletion went out once, in bulk, across a restart!")
+
+if __name__ == "__main__":
+    main()
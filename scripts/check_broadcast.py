@@ -0,0 +1,90 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_clones import free_port, wait_for
+
+def main():
+    """📢 Broadcast to fake users, pause halfway like a restart, resume, and check nobody got it twice."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--blocked", type=int, default=10, help="Users who blocked the bot")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="check_broadcast_")
+    os.makedirs(os.path.join(workdir, "config"))
+    os.chdir(workdir)
+    port = free_port()
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["BROADCAST_PROGRESS_INTERVAL"] = "1"
+    os.environ["BROADCAST_CHECKPOINT_INTERVAL"] = "1"
+
+    from fake_bot_api import FakeBotApi
+    from utils.clone_runtime import get_clone_runtime
+    from utils.db_channel import get_setting
+    from utils.user_registry import get_user_registry, bot_id_of
+    from utils.broadcaster import start_broadcast, resume_broadcast, stop_broadcast, BROADCAST_KEY
+    api = FakeBotApi(port=port).start()
+    bot = get_clone_runtime().make_bot("123456:fake-token-broadcast")
+    users = list(range(1000, 1000 + args.users))
+    blocked = users[::max(1, args.users // args.blocked)][:args.blocked]
+    api.blocked.update(str(u) for u in blocked)
+    registry = get_user_registry()
+    for user_id in users:
+        registry.record(bot_id_of(bot.token), user_id)
+
+    def received():
+        return [int(c[2]["chat_id"]) for c in api.calls_to("sendMessage") if c[2].get("text") == "Hello everyone"]
+
+    started = time.perf_counter()
+    job = start_broadcast(bot, "Hello everyone", 7, 1)
+    wait_for(lambda: len(received()) >= args.users // 2, 60)
+    stop_broadcast(timeout=30)  # What a shutdown does
+    paused = get_setting(BROADCAST_KEY)
+    print(f"⏸️ Paused after user {paused['cursor']}: {paused['sent']} sent, {paused['blocked']} blocked")
+    resume_broadcast(bot)
+    finished = wait_for(lambda: (get_setting(BROADCAST_KEY) or {}).get("done"), 60)
+    seconds = time.perf_counter() - started
+    final = get_setting(BROADCAST_KEY)
+    sends = received()
+
+    def progress_edits():
+        return [c for c in api.calls_to("editMessageText") if str(c[2].get("chat_id")) == "7"]
+    wait_for(lambda: any("finished" in c[2]["text"] for c in progress_edits()), 10)
+    edits = progress_edits()
+    print(f"📢 {final['sent']} sent, {final['blocked']} blocked, {final['failed']} failed of {job['total']} in {seconds:.1f}s ({len(edits)} progress edits)")
+    print(f"📝 Last progress: {edits[-1][2]['text'] if edits else None!r}")
+
+    problems = []
+    if not finished:
+        problems.append("the resumed broadcast did not finish")
+    if sorted(sends) != users:
+        problems.append(f"{len(sends)} sends for {len(users)} users (duplicates or gaps)")
+    if list(registry.iter_users(bot_id_of(bot.token))) != sorted(set(users) - set(blocked)):
+        problems.append("blocked users were not all marked")
+    if final["sent"] != len(users) - len(blocked):
+        problems.append("sent count does not match the reachable users")
+    if not edits:
+        problems.append("the progress message was never edited")
+
+    # A second broadcast skips the users marked blocked
+    api.calls.clear()
+    start_broadcast(bot, "Hello everyone", 7, 1)
+    wait_for(lambda: (get_setting(BROADCAST_KEY) or {}).get("done"), 60)
+    if set(received()) & set(blocked):
+        problems.append("the next broadcast messaged blocked users again")
+
+    get_clone_runtime().stop()
+    for problem in problems:
+        print(f"🚨 {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Broadcast resumed from its checkpoint and reached every user once!")
+
+if __name__ == "__main__":
+    main()
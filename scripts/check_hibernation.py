@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_clones import free_port, wait_for
+
+def main():
+    """💤 Wake lazily started clones several times and check none of them asks getMe again."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--cycles", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="check_hibernation_")
+    os.makedirs(os.path.join(workdir, "config"))
+    os.chdir(workdir)
+    port = free_port()
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["CLONE_HIBERNATE_AFTER"] = "1"
+    os.environ["CLONE_HIBERNATE_POLL_INTERVAL"] = "1"
+
+    from fake_bot_api import FakeBotApi, message_update
+    from utils.db_channel import add_cloned_bot
+    from utils.clone_runtime import get_clone_runtime
+    from bot import start_cloned_bots
+    api = FakeBotApi(port=port).start()
+
+    # One entry saved with its identity (as the clone menu does now) and one from before that
+    bots = [
+        {"token": "300001:fake-token-known", "visibility": "public", "usage": "searchbot", "owner_id": "1", "standalone": False,
+         "bot_id": 300001, "username": "known_clone_bot", "first_name": "Known"},
+        {"token": "300002:fake-token-legacy", "visibility": "public", "usage": "searchbot", "owner_id": "1", "standalone": False},
+    ]
+    for bot in bots:
+        add_cloned_bot(bot)
+    start_cloned_bots(bots, ["1"], lazy=True)
+    runtime = get_clone_runtime()
+    problems = []
+
+    for cycle in range(1, args.cycles + 1):
+        if not wait_for(lambda: set(runtime.states().values()) == {"hibernated"}, 10):
+            problems.append(f"cycle {cycle}: clones didn't hibernate")
+        sent = len(api.calls_to("sendMessage"))
+        for bot in bots:
+            api.inject(bot["token"], message_update(42, "/start"))
+        if not wait_for(lambda: len(api.calls_to("sendMessage")) >= sent + len(bots), 10):
+            problems.append(f"cycle {cycle}: not every clone answered /start")
+        calls = {bot["token"]: len([c for c in api.calls_to("getMe") if c[0] == bot["token"]]) for bot in bots}
+        print(f"🔁 Wake {cycle}: getMe calls {list(calls.values())}")
+
+    known, legacy = (len([c for c in api.calls_to("getMe") if c[0] == bot["token"]]) for bot in bots)
+    if known:
+        problems.append(f"clone with a saved identity asked getMe {known} times")
+    if legacy > 1:
+        problems.append(f"clone without a saved identity asked getMe {legacy} times over {args.cycles} wakes")
+
+    runtime.stop()
+    for problem in problems:
+        print(f"🚨 {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Hibernating clones kept their identity!")
+
+if __name__ == "__main__":
+    main()
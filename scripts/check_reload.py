@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_clones import free_port, wait_for
+
+def main():
+    """🔄 Edit cloned_bots.json under running clones and check the hot reload picks every change up."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--clones", type=int, default=10)
+    parser.add_argument("--processes", type=int, default=0, help="Run clones under the process supervisor")
+    parser.add_argument("--interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="check_reload_")
+    os.makedirs(os.path.join(workdir, "config"))
+    os.chdir(workdir)
+    port = free_port()
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{port}"
+
+    from fake_bot_api import FakeBotApi, MAX_POLL_SECONDS, message_update
+    from utils.db_channel import CLONED_BOTS_FILE, save_json
+    from utils.clone_reloader import CloneReloader
+    from utils.clone_runtime import get_clone_runtime
+    from utils.clone_supervisor import start_clone_supervisor
+    from bot import load_runtime_bots, run_clone_shard, start_cloned_bots, update_cloned_bot
+    api = FakeBotApi(port=port).start()
+
+    def entry(i, **changes):
+        return dict({"token": f"{300000 + i}:fake-token-{i:06d}", "visibility": "public", "usage": "searchbot", "owner_id": "1", "standalone": False}, **changes)
+
+    bots = [entry(i) for i in range(args.clones)]
+    save_json(CLONED_BOTS_FILE, bots)
+    runtime = get_clone_runtime()
+    if args.processes:
+        supervisor = start_clone_supervisor(args.processes, run_clone_shard, (["1"],))
+        reloader = CloneReloader(
+            load_runtime_bots, lambda new: [supervisor.add_clone(bot["token"]) for bot in new],
+            supervisor.remove_clone, lambda bot: supervisor.update_clone(bot["token"]), interval=args.interval
+        )
+    else:
+        supervisor = None
+        start_cloned_bots(bots, ["1"])
+        reloader = CloneReloader(
+            load_runtime_bots, lambda new: start_cloned_bots(new, ["1"]),
+            runtime.remove_clone, lambda bot: update_cloned_bot(bot["token"], ["1"], bot), interval=args.interval
+        )
+    reloader.start(bots)
+
+    def polling(token):
+        """True while `token` still long-polls (a poll is held at most MAX_POLL_SECONDS)."""
+        count = len([c for c in api.calls_to("getUpdates") if c[0] == token])
+        time.sleep(MAX_POLL_SECONDS + 1)
+        return len([c for c in api.calls_to("getUpdates") if c[0] == token]) != count
+
+    def replies(token, command, text):
+        """Send `command` from user 42 and wait for a reply containing `text`."""
+        api.inject(token, message_update(42, command))
+        return wait_for(lambda: any(c[0] == token and text in c[2].get("text", "") for c in api.calls_to("sendMessage")), 15)
+
+    problems = []
+    if not all(replies(bot["token"], "/start", "Welcome") for bot in bots):
+        problems.append("not every clone answered after startup")
+
+    removed, private, filestore = bots[0]["token"], bots[1]["token"], bots[2]["token"]
+    added = entry(args.clones)
+    polls_started = {token: len([c for c in api.calls_to("deleteWebhook") if c[0] == token]) for token in (private, filestore)}
+    edited = [entry(1, visibility="private"), entry(2, usage="filestore")] + bots[3:] + [added]
+    edit_started = time.perf_counter()
+    with open(CLONED_BOTS_FILE, "w") as f:
+        json.dump(edited, f)  # Edited by hand, outside the store
+
+    checks = {
+        "added clone answers": lambda: replies(added["token"], "/start", "Welcome"),
+        "private clone turns others away": lambda: replies(private, "/start", "private"),
+        "filestore clone serves /genlink": lambda: replies(filestore, "/genlink", "stored any files"),
+        "removed clone stopped polling": lambda: wait_for(lambda: not polling(removed), 15),
+    }
+    for name, check in checks.items():
+        ok = check()
+        print(f"{'✅' if ok else '🚨'} {name} ({time.perf_counter() - edit_started:.2f}s after the edit)")
+        if not ok:
+            problems.append(name)
+    restarted = [t for t, n in polls_started.items() if len([c for c in api.calls_to("deleteWebhook") if c[0] == t]) != n]
+    if restarted:
+        problems.append(f"{len(restarted)} updated clones restarted their poll loop instead of updating in place")
+
+    reloader.stop()
+    if supervisor:
+        supervisor.stop()
+    runtime.stop()
+    for problem in problems:
+        print(f"🚨 {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Every cloned_bots change applied without a restart!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_clones import free_port, wait_for
+
+def hang_first_boot(conn, shard, shards, marker, admin_ids):
+    """🧊 Shard target that hangs before reporting ready the first time it runs, then boots normally."""
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        time.sleep(3600)
+    from bot import run_clone_shard
+    run_clone_shard(conn, shard, shards, admin_ids)
+
+def main():
+    """🧭 Run clones under the process supervisor against a fake Bot API, kill a shard and add a clone."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--clones", type=int, default=40)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="check_supervisor_")
+    os.makedirs(os.path.join(workdir, "config"))
+    os.chdir(workdir)
+    port = free_port()
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["CLONE_HEALTH_INTERVAL"] = "1"
+    os.environ["CLONE_READY_TIMEOUT"] = "3"
+
+    from fake_bot_api import FakeBotApi, message_update
+    from utils.db_channel import add_cloned_bot
+    from utils.clone_supervisor import start_clone_supervisor, CloneSupervisor
+    from bot import run_clone_shard
+    api = FakeBotApi(port=port).start()
+
+    tokens = [f"{200000 + i}:fake-token-{i:06d}" for i in range(args.clones)]
+    for token in tokens:
+        add_cloned_bot({"token": token, "visibility": "public", "usage": "searchbot", "owner_id": "1", "standalone": False})
+
+    supervisor = start_clone_supervisor(args.processes, run_clone_shard, (["1"],))
+    problems = []
+
+    def answers(tokens_to_check, timeout=30):
+        """Send /start to each clone and wait until every one has replied."""
+        before = {token: len([c for c in api.calls_to("sendMessage") if c[0] == token]) for token in tokens_to_check}
+        for token in tokens_to_check:
+            api.inject(token, message_update(42, "/start"))
+        return wait_for(lambda: all(
+            len([c for c in api.calls_to("sendMessage") if c[0] == token]) > before[token] for token in tokens_to_check
+        ), timeout)
+
+    shard_sizes = [sum(1 for t in tokens if supervisor.ring.owner(t) == w.shard) for w in supervisor.workers]
+    print(f"🧭 {args.clones} clones over {args.processes} shards: {shard_sizes}")
+    if not answers(tokens):
+        problems.append("not every clone answered after startup")
+    wait_for(lambda: len(supervisor.states()) == args.clones, 10)
+    print(f"📊 States reported by shards: {len(supervisor.states())}")
+
+    victim = supervisor.workers[0]
+    old_pid = victim.process.pid
+    victim.process.kill()
+    restarted = wait_for(lambda: victim.process.pid != old_pid and victim.ready, 30)
+    victim_tokens = [t for t in tokens if supervisor.ring.owner(t) == victim.shard]
+    print(f"💥 Killed shard 0 (pid {old_pid}) -> restarted: {restarted} (pid {victim.process.pid})")
+    if not restarted or not answers(victim_tokens):
+        problems.append("shard 0 did not come back with its clones")
+
+    new_token = "299999:fake-token-new"
+    add_cloned_bot({"token": new_token, "visibility": "public", "usage": "filestore", "owner_id": "1", "standalone": False})
+    started = time.perf_counter()
+    added = supervisor.add_clone(new_token)
+    print(f"➕ Added clone on shard {supervisor.ring.owner(new_token)}: {added} in {time.perf_counter() - started:.2f}s")
+    if not added or not answers([new_token]):
+        problems.append("new clone did not start on its shard")
+
+    supervisor.stop()
+
+    hung = CloneSupervisor(1, hang_first_boot, (os.path.join(workdir, "hung"), ["1"]))
+    hung.start()
+    stuck_pid = hung.workers[0].process.pid
+    recovered = wait_for(lambda: hung.workers[0].process.pid != stuck_pid and hung.workers[0].ready, 30)
+    print(f"🧊 Shard hung before ready (pid {stuck_pid}) -> restarted: {recovered} (pid {hung.workers[0].process.pid})")
+    if not recovered:
+        problems.append("a shard that hung while booting was never restarted")
+    hung.stop()
+
+    for problem in problems:
+        print(f"🚨 {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Supervisor kept every clone running!")
+
+if __name__ == "__main__":
+    main()
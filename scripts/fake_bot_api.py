@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import itertools
+import time
+import json
+import os
+import sys
+import threading
+import zlib
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.clone_runtime import read_http_message
+
+MAX_POLL_SECONDS = 2  # Long polls are held at most this long so tests stay quick
+SEND_METHODS = ("sendMessage", "forwardMessage", "copyMessage", "editMessageText", "forwardMessages", "copyMessages")
+
+class FakeBotApi:
+    """🧪 Local stand-in for api.telegram.org.
+
+    Speaks just enough of the Bot API for the bot's handlers: getMe for any
+    token, long-polled getUpdates fed by inject(), and message-returning
+    stubs for send/forward/copy/edit. Update types outside a bot's last
+    allowed_updates are dropped, like Telegram does. Sends into `blocked`
+    chats get a 403. With `chat_rate`, more
+    than that many sends into one chat within a second get a 429 with
+    retry_after. After setWebhook, injected updates are
+    POSTed to the webhook with its secret header instead (HTTP status codes
+    land in `deliveries`). Every call is recorded in `calls`.
+    Point TELEGRAM_API_URL at `url` to use it.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0, chat_rate=None):
+        self.host = host
+        self.port = port
+        self.latency = latency  # Seconds added to every call except getUpdates, like a far-away API
+        self.calls = []  # (token, method, params)
+        self.revoked = set()  # Tokens answered with 401
+        self.blocked = set()  # Chat IDs (str) whose users blocked every bot: sends get a 403
+        self.chat_rate = chat_rate
+        self.unlimited = set()  # Chat IDs (str) chat_rate doesn't apply to, e.g. a storage channel
+        self._sent = {}  # (token, chat_id) -> send times within the last second
+        self.flooded = []  # (token, method, params) answered with 429
+        self._updates = {}  # token -> pending update dicts
+        self._waiters = {}  # token -> asyncio.Event set when updates arrive
+        self.webhooks = {}  # token -> (url, secret_token)
+        self.allowed = {}  # token -> allowed_updates from the last getUpdates/setWebhook that sent one
+        self.deliveries = []  # (token, HTTP status) per webhook POST
+        self._posting = set()  # In-flight webhook POST tasks (the loop only keeps weak references)
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self.loop = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """▶️ Serve on a background thread."""
+        threading.Thread(target=self._run, name="fake-bot-api", daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(asyncio.start_server(self._serve, self.host, self.port, backlog=4096))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self.loop.run_forever()
+
+    def inject(self, token, update):
+        """📥 Queue an update (without update_id) for `token`; returns the assigned update_id."""
+        update = dict(update, update_id=next(self._update_ids))
+        self.loop.call_soon_threadsafe(self._deliver, token, update)
+        return update["update_id"]
+
+    def _deliver(self, token, update):
+        allowed = self.allowed.get(token)
+        if allowed and not set(update) & set(allowed):
+            return  # Not an update type this bot asked for
+        if token in self.webhooks:
+            task = self.loop.create_task(self._post_webhook(token, update))
+            self._posting.add(task)
+            task.add_done_callback(self._posting.discard)
+            return
+        self._updates.setdefault(token, []).append(update)
+        self._waiter(token).set()
+
+    async def _post_webhook(self, token, update):
+        url, secret = self.webhooks[token]
+        parts = urlsplit(url)
+        body = json.dumps(update).encode()
+        try:
+            reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+            writer.write((
+                f"POST {parts.path} HTTP/1.1\r\nHost: {parts.hostname}\r\nContent-Type: application/json\r\n"
+                f"X-Telegram-Bot-Api-Secret-Token: {secret}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+            ).encode() + body)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            writer.close()
+        except (OSError, IndexError, ValueError):
+            status = 0
+        self.deliveries.append((token, status))
+
+    def _waiter(self, token):
+        if token not in self._waiters:
+            self._waiters[token] = asyncio.Event()
+        return self._waiters[token]
+
+    def calls_to(self, method):
+        return [call for call in self.calls if call[1] == method]
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                message = await read_http_message(reader)
+                if message is None:
+                    break
+                start_line, headers, body = message
+                path = start_line.split()[1]
+                status, payload = await self._handle(path, headers, body)
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, path, headers, body):
+        _, bot_token, method = path.split("/", 2)
+        token = bot_token[3:]
+        params = json.loads(body) if body else {}
+        self.calls.append((token, method, params))
+        if self.latency and method != "getUpdates":
+            await asyncio.sleep(self.latency)
+        if token in self.revoked:
+            return 401, {"ok": False, "error_code": 401, "description": "Unauthorized"}
+        if method in SEND_METHODS and str(params.get("chat_id")) in self.blocked:
+            return 403, {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"}
+        if self.chat_rate and method in SEND_METHODS and self._flooding(token, params):
+            self.flooded.append((token, method, params))
+            return 429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1", "parameters": {"retry_after": 1}}
+        result = await self._result(token, method, params)
+        if method == "getUpdates" and result is None:
+            return 409, {"ok": False, "error_code": 409, "description": "Conflict: can't use getUpdates method while webhook is active"}
+        return 200, {"ok": True, "result": result}
+
+    def _flooding(self, token, params):
+        if str(params.get("chat_id")) in self.unlimited:
+            return False
+        now = time.monotonic()
+        sent = [t for t in self._sent.get((token, str(params.get("chat_id"))), []) if now - t < 1]
+        self._sent[(token, str(params.get("chat_id")))] = sent
+        if len(sent) >= self.chat_rate:
+            return True
+        sent.append(now)
+        return False
+
+    async def _result(self, token, method, params):
+        bot_id = zlib.crc32(token.encode())
+        if "allowed_updates" in params and method in ("getUpdates", "setWebhook"):
+            self.allowed[token] = params["allowed_updates"]
+        if method == "getMe":
+            return {"id": bot_id, "is_bot": True, "first_name": "Fake", "username": f"fake{bot_id}_bot"}
+        if method == "setWebhook":
+            self.webhooks[token] = (params["url"], params.get("secret_token", ""))
+            return True
+        if method == "deleteWebhook":
+            self.webhooks.pop(token, None)
+            return True
+        if method == "getUpdates":
+            if token in self.webhooks:
+                return None  # _handle answers 409 like the real API
+            offset = int(params.get("offset", 0))
+            # Updates below the offset are confirmed; drop them before deciding to wait
+            self._updates[token] = [u for u in self._updates.get(token, []) if u["update_id"] >= offset]
+            if not self._updates[token]:
+                waiter = self._waiter(token)
+                waiter.clear()
+                try:
+                    await asyncio.wait_for(waiter.wait(), min(int(params.get("timeout", 0)), MAX_POLL_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+            return self._updates[token]
+        if method in ("forwardMessages", "copyMessages"):
+            message_ids = params["message_ids"]
+            if isinstance(message_ids, str):
+                message_ids = json.loads(message_ids)  # PTB sends lists JSON-encoded
+            return [{"message_id": next(self._message_ids)} for _ in message_ids]
+        if method in SEND_METHODS:
+            return {
+                "message_id": next(self._message_ids), "date": 0, "text": params.get("text", ""),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+            }
+        return True
+
+def message_update(user_id, text):
+    """💬 A private text-message update from `user_id`."""
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+    message = {"message_id": 1, "date": 0, "chat": {"id": user_id, "type": "private"}, "from": user, "text": text}
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"message": message}
+
+def main():
+    """🧪 Run the fake Bot API in the foreground."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    api = FakeBotApi(port=args.port).start()
+    print(f"🧪 Fake Bot API listening on {api.url} - set TELEGRAM_API_URL={api.url}")
+    threading.Event().wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_channel import SqliteStore, SQLITE_FILE, migrate_json_to_sqlite
+
+def main():
+    """🚚 Copy settings.json and cloned_bots.json into the SQLite database."""
+    db_path = sys.argv[1] if len(sys.argv) > 1 else SQLITE_FILE
+    store = SqliteStore(db_path)
+    if migrate_json_to_sqlite(store):
+        print(f"✅ Migrated JSON settings into {db_path}! Set STORAGE_BACKEND=sqlite to use it.")
+    else:
+        print(f"ℹ️ {db_path} was already migrated, nothing to do.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CLONES = int(os.getenv("STRESS_CLONES", "8"))  # Simulated bots, each with its own worker pool
+WORKERS = int(os.getenv("STRESS_WORKERS", "4"))  # Handler threads per bot
+UPLOADS = int(os.getenv("STRESS_UPLOADS", "50"))  # Files stored per worker
+STORE_TIMEOUT = 30  # Seconds a worker waits for one upload to be saved
+os.environ.setdefault("OUTBOUND_BOT_RATE", "100000")  # Measure storage, not Telegram's pacing
+
+class FakeMessage:
+    """📨 Just enough of telegram.Message for the file-store handlers."""
+
+    def __init__(self, chat_id, message_id, document=None):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.document = document
+        self.photo = []
+        self.video = None
+        self.audio = None
+        self.text = ""
+
+    def reply_text(self, text, reply_markup=None, **kwargs):
+        return SimpleNamespace(message_id=0)
+
+class FakeBot:
+    """🤖 Bot stub whose forwards land at unique storage-channel message IDs."""
+
+    _counter = 0
+    _lock = threading.Lock()
+
+    def __init__(self, token="100000:stress"):
+        self.token = token
+
+    def forward_message(self, chat_id, from_chat_id, message_id, **kwargs):
+        with FakeBot._lock:
+            FakeBot._counter += 1
+            return SimpleNamespace(message_id=FakeBot._counter)
+
+    def get_me(self):
+        return SimpleNamespace(username="stress_bot", id=1)
+
+def wait_until_stored(user_id, file_id):
+    """⏳ store_file saves in the background once its forward lands, so wait until `file_id` is the user's latest file."""
+    from utils.db_channel import get_user_files
+    deadline = time.monotonic() + STORE_TIMEOUT
+    while [f["file_id"] for f in get_user_files(user_id, 1)] != [file_id]:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"upload {file_id} of user {user_id} wasn't saved")
+        time.sleep(0.001)
+
+def worker(clone, worker_id, errors):
+    from handlers.filestore import store_file, handle_batchgen_selection
+    from utils.db_channel import get_user_files
+    from utils.bot_identity import BOT_IDENTITY_KEY
+    user_id = clone * 1000 + worker_id
+    user = SimpleNamespace(id=user_id)
+    bot = FakeBot(f"{100000 + clone}:stress")
+    context = SimpleNamespace(bot=bot, user_data={}, args=[], bot_data={"is_main_bot": False, BOT_IDENTITY_KEY: bot.get_me()})
+    try:
+        for i in range(UPLOADS):
+            document = SimpleNamespace(file_id=f"f{user_id}_{i}", file_name=f"Clone{clone}.Worker{worker_id}.File{i}.mkv")
+            store_file(SimpleNamespace(effective_user=user, message=FakeMessage(user_id, i, document)), context)
+            wait_until_stored(user_id, document.file_id)
+            if i % 10 == 9:
+                # Every few uploads, bundle the user's two latest files into a batch
+                latest = get_user_files(user_id, 2)
+                context.user_data["batch_selection"] = [str(f["message_id"]) for f in latest]
+                query = SimpleNamespace(data="batch_done", message=FakeMessage(user_id, i), answer=lambda *a, **k: None)
+                handle_batchgen_selection(SimpleNamespace(effective_user=user, callback_query=query), context)
+    except Exception as e:
+        errors.append(f"clone {clone} worker {worker_id}: {e}")
+
+def main():
+    """🧨 Hammer the storage layer from many threads and clones, then check nothing was lost."""
+    workdir = tempfile.mkdtemp(prefix="stress_storage_")
+    os.makedirs(os.path.join(workdir, "config"))
+    os.chdir(workdir)
+    os.environ["FILESTORE_CHANNEL_ID"] = "-100"
+
+    from utils.db_channel import get_setting, get_user_files
+
+    errors = []
+    threads = [
+        threading.Thread(target=worker, args=(clone, worker_id, errors))
+        for clone in range(CLONES) for worker_id in range(WORKERS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    expected_files = CLONES * WORKERS * UPLOADS
+    expected_batches = CLONES * WORKERS * (UPLOADS // 10)
+    stored_files = get_setting("stored_files", [])
+    batches = get_setting("batches", [])
+    batch_ids = [b["batch_id"] for b in batches]
+    problems = list(errors)
+    if len(stored_files) != expected_files:
+        problems.append(f"stored_files: expected {expected_files}, got {len(stored_files)}")
+    if len({f["message_id"] for f in stored_files}) != len(stored_files):
+        problems.append("stored_files: duplicate message IDs")
+    if len(batches) != expected_batches:
+        problems.append(f"batches: expected {expected_batches}, got {len(batches)}")
+    if len(set(batch_ids)) != len(batch_ids):
+        problems.append("batches: duplicate batch IDs")
+    for clone in range(CLONES):
+        for worker_id in range(WORKERS):
+            if len(get_user_files(clone * 1000 + worker_id, UPLOADS)) != UPLOADS:
+                problems.append(f"user {clone * 1000 + worker_id}: per-user index is missing files")
+
+    print(f"🧨 {CLONES} clones x {WORKERS} workers x {UPLOADS} uploads in {workdir}")
+    print(f"📦 stored_files={len(stored_files)} batches={len(batches)} unique_batch_ids={len(set(batch_ids))}")
+    if problems:
+        for problem in problems:
+            print(f"🚨 {problem}")
+        sys.exit(1)
+    print("✅ No lost updates or duplicate IDs!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from telegram import User
+from telegram.error import Unauthorized
+import logging
+
+logger = logging.getLogger(__name__)
+
+BOT_IDENTITY_KEY = "bot_identity"  # bot_data key holding the bot's own User from getMe
+
+def remember_identity(dispatcher, me):
+    """🪪 Keep the bot's own User in bot_data and on the Bot, so nothing asks getMe for it again."""
+    dispatcher.bot_data[BOT_IDENTITY_KEY] = me
+    dispatcher.bot._bot = me  # Bot.username and CommandHandler's /cmd@bot check read this
+    return me
+
+def resolve_identity(dispatcher):
+    """🪪 Fetch the bot's identity (one getMe unless the Bot already has it) and remember it."""
+    return remember_identity(dispatcher, dispatcher.bot.bot)
+
+def identity_from_entry(entry):
+    """🪪 A clone's own User rebuilt from its cloned_bots entry, or None for entries saved without a username."""
+    if not entry.get("username"):
+        return None
+    bot_id = entry.get("bot_id") or int(entry["token"].split(":", 1)[0])
+    return User(id=int(bot_id), first_name=entry.get("first_name") or entry["username"], is_bot=True, username=entry["username"])
+
+def get_identity(context):
+    """🪪 The bot's own User for building links, resolved at most once per bot."""
+    me = context.bot_data.get(BOT_IDENTITY_KEY)
+    if me is None:
+        me = resolve_identity(context.dispatcher)
+    return me
+
+def forget_identity(dispatcher):
+    """🔄 Drop the cached identity; the next get_identity fetches it fresh."""
+    dispatcher.bot_data.pop(BOT_IDENTITY_KEY, None)
+    dispatcher.bot._bot = None
+
+def forget_identity_on_auth_error(context, error):
+    """🔑 Handlers catch their own errors, so their catches pass them here to drop the identity on a 401."""
+    if is_auth_error(error) and context.dispatcher:
+        forget_identity(context.dispatcher)
+
+def is_auth_error(error):
+    """🔑 True for a 401 from the Bot API (PTB also raises Unauthorized for 403 'Forbidden: ...', e.g. a blocked bot)."""
+    return isinstance(error, Unauthorized) and not str(error).startswith("Forbidden")
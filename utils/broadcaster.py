@@ -0,0 +1,185 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import Unauthorized, BadRequest
+from utils.db_channel import get_setting, set_setting
+from utils.logging_utils import log_error
+from utils.outbound import get_outbound, log_failure, BULK
+from utils.user_registry import get_user_registry, bot_id_of
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "20"))  # Sends queued at once; the outbound scheduler paces them
+BROADCAST_CHECKPOINT_INTERVAL = float(os.getenv("BROADCAST_CHECKPOINT_INTERVAL", "5"))  # Seconds between saved checkpoints
+BROADCAST_PROGRESS_INTERVAL = float(os.getenv("BROADCAST_PROGRESS_INTERVAL", "5"))  # Seconds between progress message edits
+BROADCAST_KEY = "broadcast"  # Setting holding the current (or last) broadcast job
+
+def is_unreachable(error):
+    """🚫 True when a user can't get messages from the bot anymore (blocked it, deactivated, or unknown chat)."""
+    if isinstance(error, Unauthorized):
+        return str(error).startswith("Forbidden")
+    return isinstance(error, BadRequest) and "chat not found" in str(error).lower()
+
+def broadcast_recipients(bot, after=0):
+    """👥 Stream the IDs of `bot`'s reachable users from the user registry, ascending and above `after`."""
+    return get_user_registry().iter_users(bot_id_of(bot.token), after)
+
+def count_recipients(bot):
+    """🔢 How many users a broadcast by `bot` started now would reach."""
+    users, blocked = get_user_registry().counts().get(bot_id_of(bot.token), (0, 0))
+    return users - blocked
+
+class Broadcast:
+    """📢 Sends one text to every recipient, resumable from its last checkpoint.
+
+    Recipients are streamed in ascending ID order, and up to
+    BROADCAST_CONCURRENCY sends are queued on the outbound scheduler's
+    bulk lane at a time, so the bot's rate limits hold and replies to users
+    still go first. Sends settle in order. The job's cursor is the last
+    settled user ID, and it is saved with the counts every
+    BROADCAST_CHECKPOINT_INTERVAL seconds. After a restart the job goes on
+    past the cursor, so at most one checkpoint's worth is sent twice.
+    Users who blocked the bot are marked in the user registry and skipped
+    until they use the bot again. The admin's progress message is edited every
+    BROADCAST_PROGRESS_INTERVAL seconds.
+    """
+
+    def __init__(self, bot, job):
+        self.bot = bot
+        self.job = job
+        self._stop = threading.Event()
+        self._cancelled = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="broadcast", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, cancel=False, timeout=None):
+        """⏹️ Stop after the queued sends; a cancelled job is finished, otherwise it resumes at the next start."""
+        self._cancelled = cancel
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _run(self):
+        global _running
+        job = self.job
+        self._run_started, self._run_done = time.monotonic(), 0
+        last_checkpoint = last_progress = time.monotonic()
+        window = deque()
+        try:
+            for user_id in broadcast_recipients(self.bot, job["cursor"]):
+                if self._stop.is_set():
+                    break
+                while len(window) >= BROADCAST_CONCURRENCY:
+                    self._settle(*window.popleft())
+                window.append((user_id, get_outbound().submit(
+                    self.bot, user_id, lambda u=user_id: self.bot.send_message(chat_id=u, text=job["text"]), BULK
+                )))
+                now = time.monotonic()
+                if now - last_checkpoint >= BROADCAST_CHECKPOINT_INTERVAL:
+                    self._checkpoint()
+                    last_checkpoint = now
+                if now - last_progress >= BROADCAST_PROGRESS_INTERVAL:
+                    self._report()
+                    last_progress = now
+            while window:
+                self._settle(*window.popleft())
+            job["done"] = self._cancelled or not self._stop.is_set()
+        except Exception as e:
+            log_error(f"🚨 Broadcast {job['id']} stopped at user {job['cursor']}: {str(e)}")
+        self._checkpoint()
+        self._report()
+        with _running_lock:
+            if _running is self:
+                _running = None
+        logger.info(f"✅ Broadcast {job['id']} {'finished' if job.get('done') else 'paused'}: {job['sent']} sent, {job['blocked']} blocked, {job['failed']} failed")
+
+    def _settle(self, user_id, future):
+        job = self.job
+        try:
+            future.result()
+            job["sent"] += 1
+        except Exception as e:
+            if is_unreachable(e):
+                job["blocked"] += 1
+                get_user_registry().mark_blocked(bot_id_of(self.bot.token), [user_id])
+            else:
+                job["failed"] += 1
+                log_error(f"🚨 Broadcast {job['id']} to {user_id} failed: {str(e)}")
+        job["cursor"] = user_id
+        self._run_done += 1
+
+    def _checkpoint(self):
+        """💾 Save the cursor and counts."""
+        set_setting(BROADCAST_KEY, dict(self.job))
+
+    def _report(self):
+        """📊 Edit the admin's progress message with counts, throughput and ETA."""
+        job = self.job
+        settled = job["sent"] + job["blocked"] + job["failed"]
+        elapsed = time.monotonic() - self._run_started
+        rate = self._run_done / elapsed if elapsed > 0 else 0
+        if job.get("done"):
+            head = "🛑 Broadcast cancelled!" if self._cancelled else "✅ Broadcast finished!"
+            eta, markup = "", None
+        else:
+            head = "⏸️ Broadcast paused, it resumes on restart." if self._stop.is_set() else "📢 Broadcasting..."
+            left = max(job["total"] - settled, 0)
+            eta = f"\n⏳ ETA: {int(left / rate)}s" if rate and not self._stop.is_set() else ""
+            markup = InlineKeyboardMarkup([[InlineKeyboardButton("Cancel 🚫", callback_data="cancel_broadcast")]])
+        text = (
+            f"{head}\n"
+            f"📬 {settled}/{job['total']} | ✅ {job['sent']} sent | 🚫 {job['blocked']} blocked | ⚠️ {job['failed']} failed\n"
+            f"⚡ {rate:.1f} msgs/s{eta}"
+        )
+        get_outbound().submit(self.bot, job["chat_id"], lambda: self.bot.edit_message_text(
+            text, chat_id=job["chat_id"], message_id=job["message_id"], reply_markup=markup
+        )).add_done_callback(log_failure(f"Broadcast {job['id']} progress update"))
+
+_running = None
+_running_lock = threading.Lock()
+
+def start_broadcast(bot, text, chat_id, message_id):
+    """📢 Start broadcasting `text`, reporting progress by editing message `message_id` in `chat_id`.
+
+    Returns the job, or None while another broadcast is still running.
+    """
+    global _running
+    with _running_lock:
+        if _running is not None:
+            return None
+        job = {
+            "id": str(int(time.time())), "text": text, "chat_id": chat_id, "message_id": message_id,
+            "cursor": 0, "total": count_recipients(bot), "sent": 0, "blocked": 0, "failed": 0, "done": False,
+        }
+        set_setting(BROADCAST_KEY, dict(job))
+        _running = Broadcast(bot, job).start()
+        return job
+
+def resume_broadcast(bot):
+    """▶️ Pick up an unfinished broadcast from its last checkpoint (call once at startup)."""
+    global _running
+    job = get_setting(BROADCAST_KEY)
+    if not job or job.get("done"):
+        return None
+    with _running_lock:
+        if _running is not None:
+            return None
+        logger.info(f"▶️ Resuming broadcast {job['id']} after user {job['cursor']}")
+        _running = Broadcast(bot, job).start()
+        return job
+
+def stop_broadcast(cancel=False, timeout=None):
+    """⏹️ Stop the running broadcast; returns False when none is running."""
+    with _running_lock:
+        running = _running
+    if running is None:
+        return False
+    running.stop(cancel, timeout)
+    return True
@@ -0,0 +1,69 @@
+import logging
+import os
+import threading
+import time
+from utils.logging_utils import log_error
+
+logger = logging.getLogger(__name__)
+
+CLONE_RELOAD_INTERVAL = float(os.getenv("CLONE_RELOAD_INTERVAL", "10"))  # Seconds between cloned_bots checks; 0 turns hot reload off
+
+class CloneReloader:
+    """🔄 Hot reload of cloned_bots without a restart.
+
+    Every `interval` seconds the clone list is read again and compared
+    with the previous copy. Only the differences are applied: new entries
+    start as one batch, removed entries stop, and entries whose settings
+    changed are updated in place, keeping their poll loop and connections.
+    The check runs on its own thread, so the main bot's dispatcher never
+    waits for it. The comparison is with the previous list, not with what
+    is running. So a clone the runtime dropped after a 401 (revoked token)
+    stays down until its entry changes.
+    """
+
+    def __init__(self, load_bots, start_clones, stop_clone, update_clone, interval=CLONE_RELOAD_INTERVAL):
+        self.load_bots = load_bots  # () -> clone entries that should be running
+        self.start_clones = start_clones  # (entries) -> start new clones
+        self.stop_clone = stop_clone  # (token) -> stop a removed clone
+        self.update_clone = update_clone  # (entry) -> apply changed settings to a running clone
+        self.interval = interval
+        self.known = {}  # token -> entry as of the last reload
+        self._stopped = threading.Event()
+
+    def start(self, bots=()):
+        """▶️ Watch for changes; `bots` are the entries already started."""
+        self.known = {bot["token"]: bot for bot in bots}
+        threading.Thread(target=self._run, name="clone-reloader", daemon=True).start()
+        logger.info(f"✅ Watching cloned_bots for changes every {self.interval:g}s! 🔄")
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.reload()
+            except Exception as e:
+                log_error(f"🚨 Reloading cloned_bots failed: {str(e)}")
+
+    def reload(self):
+        """🔄 Apply the difference between cloned_bots now and at the last reload; returns (added, removed, changed)."""
+        started = time.perf_counter()
+        current = {bot["token"]: bot for bot in self.load_bots()}
+        added = [bot for token, bot in current.items() if token not in self.known]
+        removed = [token for token in self.known if token not in current]
+        changed = [bot for token, bot in current.items() if token in self.known and self.known[token] != bot]
+        for token in removed:
+            self.stop_clone(token)
+        for bot in changed:
+            self.update_clone(bot)
+        if added:
+            self.start_clones(added)
+        self.known = current
+        if added or removed or changed:
+            logger.info(
+                f"🔄 Reloaded cloned_bots in {time.perf_counter() - started:.2f}s: "
+                f"{len(added)} started, {len(removed)} stopped, {len(changed)} updated"
+            )
+        return added, removed, changed
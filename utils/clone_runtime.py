@@ -0,0 +1,605 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import signal
+import ssl
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from telegram import Bot, Update
+from telegram.ext import (
+    Dispatcher, CommandHandler, MessageHandler, CallbackQueryHandler, InlineQueryHandler,
+    ChosenInlineResultHandler, ChatMemberHandler
+)
+from telegram.utils.request import Request
+from utils.db_channel import get_setting, update_setting
+from utils.bot_identity import BOT_IDENTITY_KEY, remember_identity
+from utils.logging_utils import log_error
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")  # Point at a local Bot API server or a fake for testing
+CLONE_WORKERS = int(os.getenv("CLONE_WORKERS", "8"))  # Handler threads shared by every clone
+CLONE_BOOT_CONCURRENCY = int(os.getenv("CLONE_BOOT_CONCURRENCY", "16"))  # Clones verified (get_me) in parallel at startup
+CLONE_POLL_TIMEOUT = int(os.getenv("CLONE_POLL_TIMEOUT", "30"))  # getUpdates long-poll seconds
+CLONE_POLL_TIMEOUT_MAX = int(os.getenv("CLONE_POLL_TIMEOUT_MAX", "50"))  # Long-poll seconds once a clone has gone quiet
+CLONE_POLL_QUIET_AFTER = 2  # Empty long polls in a row before a clone counts as quiet
+CLONE_POLL_BATCH_WINDOW = float(os.getenv("CLONE_POLL_BATCH_WINDOW", "0.2"))  # Seconds a busy clone waits between polls so updates arrive batched; 0 turns it off
+CLONE_MAX_CONNECTIONS = int(os.getenv("CLONE_MAX_CONNECTIONS", "1024"))  # Open Bot API sockets across all clones
+MAX_RETRY_DELAY = 60  # Longest back-off between failed polls
+CLONE_HIBERNATE_AFTER = int(os.getenv("CLONE_HIBERNATE_AFTER", "0"))  # Idle seconds before a clone hibernates; 0 keeps every clone resident
+CLONE_HIBERNATE_POLL_INTERVAL = int(os.getenv("CLONE_HIBERNATE_POLL_INTERVAL", "15"))  # Seconds between short polls of a hibernated clone
+STOP_TIMEOUT = 10  # Seconds stop() waits for the loop's tasks to unwind
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Public base URL; overrides the webhook_url setting
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", os.getenv("PORT", "8443")))  # Render provides PORT
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Key for per-token paths/headers; generated and stored if unset
+WEBHOOK_MAX_PENDING = 1000  # Undispatched updates per bot before deliveries get 503 (Telegram retries)
+
+# Handler kind -> Bot API update types it reads; edited messages and channel posts are never asked for
+HANDLER_UPDATE_TYPES = (
+    (CommandHandler, ("message",)),
+    (MessageHandler, ("message",)),
+    (CallbackQueryHandler, ("callback_query",)),
+    (InlineQueryHandler, ("inline_query",)),
+    (ChosenInlineResultHandler, ("chosen_inline_result",)),
+    (ChatMemberHandler, ("my_chat_member", "chat_member")),
+)
+
+def allowed_updates_for(handlers):
+    """📮 The allowed_updates list for getUpdates/setWebhook that covers `handlers`.
+
+    None (Telegram's default set) when a handler's kind isn't in
+    HANDLER_UPDATE_TYPES, so nothing it needs is filtered out.
+    """
+    update_types = set()
+    for handler in handlers:
+        for handler_class, types in HANDLER_UPDATE_TYPES:
+            if isinstance(handler, handler_class):
+                update_types.update(types)
+                break
+        else:
+            return None
+    return sorted(update_types)
+
+def dispatcher_allowed_updates(dispatcher):
+    """📮 allowed_updates for every handler registered on a dispatcher."""
+    return allowed_updates_for(handler for group in dispatcher.groups for handler in dispatcher.handlers[group])
+
+class BotApiError(Exception):
+    """🚨 A Bot API call answered with ok=false."""
+
+    def __init__(self, code, description, retry_after=None):
+        super().__init__(f"{code}: {description}")
+        self.code = code
+        self.description = description
+        self.retry_after = retry_after
+
+async def read_http_message(reader):
+    """📨 Read one HTTP/1.1 message as (start_line, headers, body), or None on a closed socket."""
+    start_line = await reader.readline()
+    if not start_line:
+        return None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if not size:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b"".join(chunks)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    elif start_line.startswith(b"HTTP/"):
+        body = await reader.read()  # Response delimited by the server closing the socket
+        headers["connection"] = "close"
+    else:
+        body = b""
+    return start_line.decode("latin-1").strip(), headers, body
+
+class AsyncBotApi:
+    """🌐 Minimal asyncio Bot API client.
+
+    Keep-alive connections go back to one idle pool that every token draws
+    from, so a few hundred clones long-polling at once cost a socket each
+    rather than a thread each.
+    """
+
+    def __init__(self, base_url=TELEGRAM_API_URL, max_connections=CLONE_MAX_CONNECTIONS):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.tls = parts.scheme == "https"
+        self.port = parts.port or (443 if self.tls else 80)
+        self.path = parts.path.rstrip("/")
+        self._ssl = ssl.create_default_context() if self.tls else None
+        self._idle = []  # (reader, writer) pairs ready for reuse
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def _exchange(self, reader, writer, token, method, params):
+        body = json.dumps(params or {}).encode()
+        head = (
+            f"POST {self.path}/bot{token}/{method} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        )
+        writer.write(head.encode() + body)
+        await writer.drain()
+        message = await read_http_message(reader)
+        if message is None:
+            raise ConnectionResetError("Bot API closed the connection")
+        return message
+
+    async def call(self, token, method, params=None, timeout=10):
+        """📡 Call a Bot API method and return its result (raises BotApiError on ok=false)."""
+        async with self._slots:
+            reused = bool(self._idle)
+            reader, writer = self._idle.pop() if reused else await asyncio.open_connection(self.host, self.port, ssl=self._ssl)
+            try:
+                try:
+                    _, headers, payload = await asyncio.wait_for(self._exchange(reader, writer, token, method, params), timeout)
+                except ConnectionError:
+                    if not reused:
+                        raise
+                    # The server dropped an idle keep-alive socket; retry once on a fresh one
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self._ssl)
+                    _, headers, payload = await asyncio.wait_for(self._exchange(reader, writer, token, method, params), timeout)
+            except BaseException:
+                writer.close()
+                raise
+            if headers.get("connection", "").lower() == "close":
+                writer.close()
+            else:
+                self._idle.append((reader, writer))
+        data = json.loads(payload)
+        if not data.get("ok"):
+            retry_after = (data.get("parameters") or {}).get("retry_after")
+            raise BotApiError(data.get("error_code"), data.get("description"), retry_after)
+        return data["result"]
+
+    def close(self):
+        """🔌 Close every idle connection."""
+        while self._idle:
+            self._idle.pop()[1].close()
+
+class CloneContext:
+    """🧩 One clone inside the runtime: its dispatcher (own bot_data/user_data) and poll offset.
+
+    Clones added with a `factory` can hibernate: the dispatcher and its
+    handler graph are dropped (user/chat data is kept) and rebuilt by the
+    factory when the next update arrives.
+    """
+
+    __slots__ = ("runtime", "token", "dispatcher", "factory", "offset", "task", "pending", "draining", "busy", "last_active", "saved", "identity",
+                 "allowed_updates", "allowed_synced")
+
+    def __init__(self, runtime, token, dispatcher=None, factory=None):
+        self.runtime = runtime
+        self.token = token
+        self.dispatcher = dispatcher
+        self.factory = factory  # () -> Dispatcher, for rehydrating
+        self.offset = 0
+        self.task = None
+        self.pending = []  # Webhook updates waiting for dispatch
+        self.draining = False
+        self.busy = False  # A batch is being dispatched
+        self.last_active = time.monotonic()
+        self.saved = None  # (user_data, chat_data) kept while hibernated
+        self.identity = None  # The bot's own User, kept while hibernated so waking needs no getMe
+        self.allowed_updates = None  # Update types to receive; None for Telegram's default set
+        self.allowed_synced = False  # allowed_updates already sent with a getUpdates call
+
+    @property
+    def bot(self):
+        return self.dispatcher.bot
+
+    @property
+    def state(self):
+        return "active" if self.dispatcher is not None else "hibernated"
+
+    def hibernate(self):
+        """💤 Drop the dispatcher and handler graph, keeping user/chat data."""
+        dispatcher = self.dispatcher
+        if dispatcher is None or self.factory is None:
+            return False
+        if dispatcher.user_data or dispatcher.chat_data:
+            self.saved = (dispatcher.user_data, dispatcher.chat_data)
+        # PTB's own getMe (e.g. CommandHandler reading bot.username) only lands on the Bot
+        self.identity = dispatcher.bot_data.get(BOT_IDENTITY_KEY) or dispatcher.bot._bot
+        self.dispatcher = None
+        return True
+
+    def rehydrate(self):
+        """⚡ Rebuild the dispatcher from the factory (no-op while active)."""
+        if self.dispatcher is None:
+            dispatcher = self.factory()
+            if self.saved:
+                dispatcher.user_data, dispatcher.chat_data = self.saved
+                self.saved = None
+            if self.identity:
+                remember_identity(dispatcher, self.identity)  # bot_data holds it while awake, so forget_identity still works
+                self.identity = None
+            self.dispatcher = dispatcher
+            logger.info(f"⚡ Rehydrated clone with token ending {self.token[-4:]}! 🌟")
+        return self.dispatcher
+
+    def stop(self):
+        """🛑 Stop polling this clone."""
+        self.runtime.remove_clone(self.token)
+
+def webhook_key():
+    """🔐 Secret used to derive webhook paths and headers (stored on first use so restarts keep them)."""
+    return WEBHOOK_SECRET or update_setting("webhook_secret", lambda current: current or secrets.token_hex(32))
+
+def get_webhook_url():
+    """🌍 Public base URL for webhook mode, or None to long-poll."""
+    return WEBHOOK_URL or get_setting("webhook_url")
+
+class CloneRuntime:
+    """🧵 Runs every cloned bot on one asyncio event loop.
+
+    Each clone gets a thread-free PTB Dispatcher; the loop long-polls all of
+    their tokens concurrently and hands each batch of updates to a shared
+    handler thread pool. Outgoing calls from handlers (reply_text,
+    forward_message, ...) go through one shared urllib3 pool.
+
+    After use_webhook(), nothing polls: one HTTP server on the same loop
+    receives updates for every registered bot (the main bot included) on
+    per-token secret paths, and each bot's webhook is set when it's added.
+
+    With `hibernate_after`, clones idle that long are hibernated: their
+    handler graph is unloaded and, when polling, getUpdates drops to a short
+    poll every CLONE_HIBERNATE_POLL_INTERVAL seconds. The first update that
+    arrives rebuilds the dispatcher and is handled in the same round-trip.
+    """
+
+    def __init__(self, workers=CLONE_WORKERS, hibernate_after=CLONE_HIBERNATE_AFTER):
+        self.clones = {}  # token -> CloneContext
+        self.hibernate_after = hibernate_after
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="clone-worker")
+        # Sized for the handler pool or the startup burst of get_me calls, whichever is bigger
+        self.request = Request(con_pool_size=max(workers, CLONE_BOOT_CONCURRENCY) + 4)
+        self.loop = asyncio.new_event_loop()
+        self.api = None
+        self.webhook_url = None
+        self._routes = {}  # webhook path id -> CloneContext
+        self._server = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """▶️ Start the event loop thread (idempotent)."""
+        with self._lock:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._run, name="clone-runtime", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.api = AsyncBotApi()
+        if self.hibernate_after:
+            self.loop.create_task(self._hibernate_idle())
+        self._ready.set()
+        self.loop.run_forever()
+
+    def make_bot(self, token):
+        """🤖 A Bot for `token` sharing the runtime's HTTP connection pool."""
+        return Bot(token, base_url=f"{TELEGRAM_API_URL}/bot", base_file_url=f"{TELEGRAM_API_URL}/file/bot", request=self.request)
+
+    def make_dispatcher(self, bot):
+        """📡 A Dispatcher without its own threads; the runtime feeds it updates."""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # workers=0 only disables run_async, which no handler uses
+            return Dispatcher(bot, None, workers=0, use_context=True)
+
+    def use_webhook(self, base_url, listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT):
+        """🌍 Switch to webhook mode: start the shared server; bots added afterwards get webhooks."""
+        self.start()
+        self.webhook_url = base_url.rstrip("/")
+        self._key = webhook_key().encode()
+        self._server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._serve, listen, port, backlog=1024), self.loop
+        ).result()
+        logger.info(f"✅ Webhook server listening on {listen}:{port} for {self.webhook_url}! 🌍")
+
+    def _webhook_ids(self, token):
+        """🔐 (path id, secret header) for a token - derived, so the token never appears in URLs."""
+        path_id = hmac.new(self._key, b"path:" + token.encode(), hashlib.sha256).hexdigest()[:32]
+        secret = hmac.new(self._key, b"secret:" + token.encode(), hashlib.sha256).hexdigest()
+        return path_id, secret
+
+    def add_clone(self, dispatcher=None, token=None, factory=None, allowed_updates=None, identity=None):
+        """➕ Start receiving updates for a dispatcher; replaces a running bot with the same token.
+
+        Long-polls by default; in webhook mode it registers the bot's
+        webhook instead. The main bot's dispatcher can be added too. With a
+        `factory` the clone may hibernate; passing only `token` and
+        `factory` adds it already hibernated (lazy start). Only the update
+        types in `allowed_updates` are delivered; by default they are
+        derived from the dispatcher's handlers. A lazy clone given its
+        `identity` (own User) wakes without a getMe.
+        """
+        self.start()
+        clone = CloneContext(self, token or dispatcher.bot.token, dispatcher, factory)
+        clone.identity = identity
+        if allowed_updates is None and dispatcher is not None:
+            allowed_updates = dispatcher_allowed_updates(dispatcher)
+        clone.allowed_updates = allowed_updates
+        with self._lock:
+            previous = self.clones.get(clone.token)
+            self.clones[clone.token] = clone
+            if self.webhook_url:
+                self._routes[self._webhook_ids(clone.token)[0]] = clone
+        if previous and previous.task:
+            previous.task.cancel()
+        runner = self._register_webhook(clone) if self.webhook_url else self._poll(clone)
+        clone.task = asyncio.run_coroutine_threadsafe(runner, self.loop)
+        return clone
+
+    def set_allowed_updates(self, token, allowed_updates):
+        """📮 Change the update types a running bot receives (sent with its next poll, or a new setWebhook)."""
+        clone = self.clones.get(token)
+        if clone is None or clone.allowed_updates == allowed_updates:
+            return
+        clone.allowed_updates = allowed_updates
+        clone.allowed_synced = False
+        if self.webhook_url:
+            asyncio.run_coroutine_threadsafe(self._register_webhook(clone), self.loop)
+
+    def remove_clone(self, token, deregister=True):
+        """➖ Stop receiving updates for a bot; in webhook mode also delete its webhook (even if it never started)."""
+        with self._lock:
+            clone = self.clones.pop(token, None)
+            if clone and self.webhook_url:
+                self._routes.pop(self._webhook_ids(token)[0], None)
+        if clone and clone.task:
+            clone.task.cancel()
+        if self.webhook_url and deregister:
+            asyncio.run_coroutine_threadsafe(self._delete_webhook(token), self.loop)
+        return clone
+
+    def stop(self):
+        """🛑 Stop every clone, the event loop and the handler pool (webhooks stay set for the next start)."""
+        for token in list(self.clones):
+            self.remove_clone(token, deregister=False)
+        if self._thread:
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(STOP_TIMEOUT)
+            except Exception as e:
+                log_error(f"🚨 Clone runtime shutdown didn't finish cleanly: {str(e)}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+        self.executor.shutdown(wait=True)
+
+    async def _shutdown(self):
+        """🧹 Cancel every task on the loop (polls, webhook deliveries, the hibernation tick) and let them unwind, then close connections."""
+        if self._server:
+            self._server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._server:
+            await self._server.wait_closed()
+        self.api.close()
+
+    def states(self):
+        """📊 {token: "active" | "hibernated"} for every running bot."""
+        return {token: clone.state for token, clone in list(self.clones.items())}
+
+    async def _hibernate_idle(self):
+        """💤 Periodically hibernate clones that have been idle for `hibernate_after` seconds."""
+        while True:
+            await asyncio.sleep(max(1, min(60, self.hibernate_after / 4)))
+            cutoff = time.monotonic() - self.hibernate_after
+            for clone in list(self.clones.values()):
+                if not clone.busy and not clone.pending and clone.last_active < cutoff and clone.hibernate():
+                    logger.info(f"💤 Hibernated clone with token ending {clone.token[-4:]} after {self.hibernate_after}s idle")
+
+    def idle(self, stop_signals=(signal.SIGINT, signal.SIGTERM)):
+        """💤 Block until a stop signal arrives (Updater.idle for webhook mode)."""
+        stopped = threading.Event()
+        for signum in stop_signals:
+            signal.signal(signum, lambda *args: stopped.set())
+        while not stopped.wait(1):
+            pass
+
+    async def _register_webhook(self, clone):
+        token = clone.token
+        path_id, secret = self._webhook_ids(token)
+        params = {"url": f"{self.webhook_url}/webhook/{path_id}", "secret_token": secret, "allowed_updates": clone.allowed_updates or []}
+        delay = 1
+        while self.clones.get(token) is clone:
+            try:
+                await self.api.call(token, "setWebhook", params)
+                logger.info(f"✅ Webhook set for bot with token ending {token[-4:]}! 🌍")
+                return
+            except asyncio.CancelledError:
+                raise
+            except BotApiError as e:
+                if e.code == 401:
+                    log_error(f"🚨 Bot with token ending {token[-4:]} was revoked; not setting its webhook")
+                    self.remove_clone(token, deregister=False)
+                    return
+                logger.warning(f"⚠️ setWebhook failed for bot with token ending {token[-4:]}: {e.description}")
+                await asyncio.sleep(e.retry_after or delay)
+            except Exception as e:
+                logger.warning(f"⚠️ setWebhook failed for bot with token ending {token[-4:]}: {str(e) or type(e).__name__}")
+                await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    async def _delete_webhook(self, token):
+        try:
+            await self.api.call(token, "deleteWebhook")
+            logger.info(f"✅ Webhook deleted for bot with token ending {token[-4:]}! 🌟")
+        except Exception as e:
+            logger.warning(f"⚠️ deleteWebhook failed for bot with token ending {token[-4:]}: {str(e)}")
+
+    async def _serve(self, reader, writer):
+        """🌍 Webhook endpoint: POST /webhook/<path id> with Telegram's secret header."""
+        try:
+            while True:
+                message = await read_http_message(reader)
+                if message is None:
+                    break
+                start_line, headers, body = message
+                status = self._accept(start_line, headers, body)
+                reason = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 503: "Service Unavailable"}[status]
+                writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Length: 0\r\n\r\n".encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _accept(self, start_line, headers, body):
+        method, path = start_line.split()[:2]
+        if method == "GET" and path == "/":
+            return 200  # Health check
+        clone = self._routes.get(path[len("/webhook/"):]) if method == "POST" and path.startswith("/webhook/") else None
+        if clone is None:
+            return 404
+        if not hmac.compare_digest(headers.get("x-telegram-bot-api-secret-token", ""), self._webhook_ids(clone.token)[1]):
+            logger.warning(f"⚠️ Rejected webhook call with a bad secret for bot with token ending {clone.token[-4:]}")
+            return 403
+        if len(clone.pending) >= WEBHOOK_MAX_PENDING:
+            return 503
+        try:
+            update = json.loads(body)
+        except ValueError:
+            return 400
+        clone.pending.append(update)
+        if not clone.draining:
+            clone.draining = True
+            self.loop.create_task(self._drain(clone))
+        return 200
+
+    async def _drain(self, clone):
+        """📤 Dispatch a bot's webhook updates in arrival order, one batch at a time."""
+        try:
+            while clone.pending:
+                updates, clone.pending = clone.pending, []
+                await self._run_batch(clone, updates)
+        finally:
+            clone.draining = False
+
+    async def _poll(self, clone):
+        """📥 Long-poll one clone, adapting to its traffic.
+
+        A clone whose long polls keep coming back empty switches to
+        CLONE_POLL_TIMEOUT_MAX, so an idle fleet makes fewer requests. A busy
+        clone (updates closer together than CLONE_POLL_BATCH_WINDOW) waits
+        that long between polls, so each poll brings a batch instead of
+        one update.
+        """
+        token = clone.token
+        delay = 1
+        quiet = 0  # Empty long polls in a row
+        gap = None  # Smoothed seconds between updates while traffic flows
+        last_batch = None
+        try:
+            # Like Updater.start_polling: a leftover webhook would make getUpdates fail with 409
+            await self.api.call(token, "deleteWebhook")
+        except Exception as e:
+            logger.warning(f"⚠️ deleteWebhook failed for clone with token ending {token[-4:]}: {str(e)}")
+        while self.clones.get(token) is clone:
+            # Hibernated clones short-poll now and then instead of holding a long poll open
+            hibernated = clone.dispatcher is None
+            if hibernated:
+                poll_timeout = 0
+            else:
+                poll_timeout = CLONE_POLL_TIMEOUT_MAX if quiet >= CLONE_POLL_QUIET_AFTER else CLONE_POLL_TIMEOUT
+            params = {"offset": clone.offset, "timeout": poll_timeout}
+            if not clone.allowed_synced:
+                # Telegram remembers allowed_updates, so it is only sent when it changes
+                params["allowed_updates"] = clone.allowed_updates or []
+            try:
+                updates = await self.api.call(token, "getUpdates", params, timeout=poll_timeout + 10)
+                delay = 1
+                if "allowed_updates" in params:
+                    clone.allowed_synced = params["allowed_updates"] == (clone.allowed_updates or [])
+            except asyncio.CancelledError:
+                raise
+            except BotApiError as e:
+                if e.code == 401:
+                    log_error(f"🚨 Clone with token ending {token[-4:]} was revoked; stopped polling it")
+                    self.remove_clone(token)
+                    return
+                logger.warning(f"⚠️ getUpdates failed for clone with token ending {token[-4:]}: {e.description}")
+                await asyncio.sleep(e.retry_after or delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            except Exception as e:
+                logger.warning(f"⚠️ getUpdates failed for clone with token ending {token[-4:]}: {str(e) or type(e).__name__}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            if updates:
+                quiet = 0
+                now = time.monotonic()
+                if last_batch is not None:
+                    sample = (now - last_batch) / len(updates)
+                    gap = sample if gap is None else gap * 0.7 + sample * 0.3
+                last_batch = now
+                clone.offset = updates[-1]["update_id"] + 1
+                await self._run_batch(clone, updates)
+                if CLONE_POLL_BATCH_WINDOW and gap is not None and gap < CLONE_POLL_BATCH_WINDOW:
+                    # Busy clone: let the next few updates queue up and fetch them together
+                    await asyncio.sleep(CLONE_POLL_BATCH_WINDOW)
+            elif hibernated:
+                await asyncio.sleep(CLONE_HIBERNATE_POLL_INTERVAL)
+            else:
+                quiet += 1
+                gap = last_batch = None
+
+    async def _run_batch(self, clone, updates):
+        """📤 Dispatch one batch on the handler pool; one batch at a time per clone keeps updates in order."""
+        clone.busy = True
+        try:
+            await self.loop.run_in_executor(self.executor, self._dispatch, clone, updates)
+        finally:
+            clone.busy = False
+            clone.last_active = time.monotonic()
+
+    def _dispatch(self, clone, updates):
+        try:
+            dispatcher = clone.rehydrate()
+        except Exception as e:
+            log_error(f"🚨 Failed to rehydrate clone with token ending {clone.token[-4:]}, dropped {len(updates)} updates: {str(e)}")
+            return
+        for data in updates:
+            try:
+                dispatcher.process_update(Update.de_json(data, dispatcher.bot))
+            except Exception as e:
+                log_error(f"🚨 Failed to dispatch update {data.get('update_id')} for clone with token ending {clone.token[-4:]}: {str(e)}")
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+def get_clone_runtime():
+    """🧵 Return the process-wide clone runtime, creating it on first use."""
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = CloneRuntime()
+    return _runtime
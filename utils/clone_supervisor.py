@@ -0,0 +1,253 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from bisect import bisect
+from utils.clone_runtime import get_clone_runtime
+from utils.db_channel import flush_settings, STORAGE_BACKEND, SETTINGS_FLUSH_INTERVAL
+from utils.logging_utils import log_error
+
+logger = logging.getLogger(__name__)
+
+CLONE_PROCESSES = int(os.getenv("CLONE_PROCESSES", "0"))  # Worker processes for clones; 0 runs them in the main process
+CLONE_HEALTH_INTERVAL = int(os.getenv("CLONE_HEALTH_INTERVAL", "10"))  # Seconds between shard health checks
+HEALTH_TIMEOUT = 5  # Seconds a shard gets to answer a ping
+START_TIMEOUT = 60  # Seconds a shard gets to start one clone
+CLONE_READY_TIMEOUT = int(os.getenv("CLONE_READY_TIMEOUT", "300"))  # Seconds a (re)started shard gets to start its clones and report ready
+MAX_RESTART_DELAY = 60  # Longest back-off between restarts of a crashing shard
+STABLE_AFTER = 60  # Seconds of uptime after which a shard's restart back-off resets
+VIRTUAL_NODES = 64  # Ring points per shard, so tokens spread evenly
+
+def _hash(key):
+    return int.from_bytes(hashlib.sha1(key.encode()).digest()[:8], "big")
+
+class HashRing:
+    """💍 Consistent hashing of bot tokens onto shard numbers."""
+
+    def __init__(self, shards, virtual_nodes=VIRTUAL_NODES):
+        points = sorted((_hash(f"shard-{shard}-{i}"), shard) for shard in range(shards) for i in range(virtual_nodes))
+        self._keys = [key for key, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def owner(self, token):
+        """🎯 Shard that runs `token`."""
+        return self._shards[bisect(self._keys, _hash(token)) % len(self._keys)]
+
+def shard_storage_problem():
+    """🚫 Why the configured storage can't be shared with shard processes, or None if it can."""
+    if STORAGE_BACKEND == "journal":
+        return "the journal backend has a single writer"
+    if STORAGE_BACKEND == "json" and SETTINGS_FLUSH_INTERVAL > 0:
+        return "write-behind (SETTINGS_FLUSH_INTERVAL > 0) keeps changes in one process's memory"
+    return None
+
+def run_shard(conn, shard, shards, load_bots, start_clones, start_clone, update_clone):
+    """🧩 Worker process loop: run this shard's clones and answer supervisor commands.
+
+    `load_bots()` lists every clone entry that should be running somewhere,
+    `start_clones(bots)` starts a batch of them in this process's runtime,
+    `start_clone(token)` starts one newly added clone and
+    `update_clone(token)` applies its changed cloned_bots entry in place.
+    """
+    ring = HashRing(shards)
+    runtime = get_clone_runtime()
+
+    def sync():
+        wanted = {bot["token"]: bot for bot in load_bots() if ring.owner(bot["token"]) == shard}
+        for token in set(runtime.clones) - set(wanted):
+            runtime.remove_clone(token)
+        start_clones([bot for token, bot in wanted.items() if token not in runtime.clones])
+
+    sync()
+    conn.send("ready")
+    logger.info(f"✅ Shard {shard}/{shards} running {len(runtime.clones)} clones! 🧩")
+    while True:
+        try:
+            command, argument = conn.recv()
+        except (EOFError, OSError):
+            break  # Supervisor is gone
+        if command == "ping":
+            conn.send(runtime.states())
+        elif command == "start":
+            conn.send(argument in runtime.clones or bool(start_clone(argument)))
+        elif command == "remove":
+            conn.send(runtime.remove_clone(argument) is not None)
+        elif command == "update":
+            conn.send(bool(update_clone(argument)))
+        elif command == "stop":
+            conn.send(True)
+            break
+    runtime.stop()
+    flush_settings()
+
+class ShardWorker:
+    """👷 One shard's process, command pipe and restart bookkeeping."""
+
+    def __init__(self, shard):
+        self.shard = shard
+        self.process = None
+        self.conn = None
+        self.lock = threading.Lock()  # One command in flight per pipe
+        self.started_at = 0
+        self.ready = False  # Finished starting its clones; only then is it pinged
+        self.failures = 0
+        self.restart_at = 0
+        self.states = {}  # token -> state from the last ping
+
+class CloneSupervisor:
+    """🧭 Shards cloned bots across worker processes.
+
+    Tokens map to shards by consistent hashing, so a new clone lands on
+    exactly one worker. Each worker runs its shard on its own CloneRuntime.
+    A monitor thread pings every worker. A worker that died, stopped
+    answering, or didn't report ready within CLONE_READY_TIMEOUT of its
+    start is killed and restarted with exponential back-off. On
+    restart the worker re-reads cloned_bots and starts its shard again.
+    """
+
+    def __init__(self, processes, target, args=()):
+        self.ring = HashRing(processes)
+        self.workers = [ShardWorker(shard) for shard in range(processes)]
+        self.target = target  # target(conn, shard, shards, *args), run in each worker
+        self.args = args
+        self._context = multiprocessing.get_context("spawn")  # Never fork a process that already runs threads
+        self._stopped = threading.Event()
+
+    def start(self):
+        """▶️ Spawn every shard and start health checks."""
+        for worker in self.workers:
+            self._spawn(worker)
+        threading.Thread(target=self._monitor, name="clone-supervisor", daemon=True).start()
+        logger.info(f"✅ Clone supervisor started {len(self.workers)} shard processes! 🧭")
+
+    def _spawn(self, worker):
+        parent_conn, child_conn = self._context.Pipe()
+        worker.process = self._context.Process(
+            target=self.target, args=(child_conn, worker.shard, len(self.workers)) + tuple(self.args),
+            name=f"clone-shard-{worker.shard}", daemon=True
+        )
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+        worker.started_at = time.monotonic()
+        worker.ready = False
+        worker.states = {}
+
+    def _call(self, worker, command, argument=None, timeout=HEALTH_TIMEOUT):
+        """📨 Send a command to a shard and wait for its reply (None if it didn't answer)."""
+        with worker.lock:
+            try:
+                worker.conn.send((command, argument))
+                deadline = time.monotonic() + timeout
+                while worker.conn.poll(max(0, deadline - time.monotonic())):
+                    reply = worker.conn.recv()
+                    if reply != "ready":
+                        return reply
+                    worker.ready = True  # Boot finished while we waited; our reply comes next
+            except (EOFError, OSError):
+                pass
+            # No answer: a late reply would desync the pipe, so the shard gets restarted
+            self._kill(worker)
+            return None
+
+    def _kill(self, worker):
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(timeout=5)
+
+    def _monitor(self):
+        while not self._stopped.wait(CLONE_HEALTH_INTERVAL):
+            for worker in self.workers:
+                if self._stopped.is_set():
+                    return
+                self._check(worker)
+
+    def _check(self, worker):
+        """🩺 Ping a shard; restart it (with back-off) if it's dead or unresponsive."""
+        now = time.monotonic()
+        if worker.process.is_alive():
+            if not worker.lock.acquire(blocking=False):
+                return  # Busy starting a clone; check next round
+            booting = False
+            try:
+                if not worker.ready:
+                    if worker.conn.poll(0):
+                        worker.ready = worker.conn.recv() == "ready"
+                    booting = not worker.ready
+            except (EOFError, OSError):
+                pass
+            finally:
+                worker.lock.release()
+            if booting:
+                # Still starting its shard; being alive is enough until the ready deadline
+                if now - worker.started_at < CLONE_READY_TIMEOUT:
+                    return
+                log_error(f"🚨 Clone shard {worker.shard} didn't report ready within {CLONE_READY_TIMEOUT}s; killing it")
+                self._kill(worker)
+            else:
+                states = self._call(worker, "ping")
+                if states is not None:
+                    worker.states = states
+                    if worker.failures and now - worker.started_at > STABLE_AFTER:
+                        worker.failures = 0
+                    return
+        if not worker.restart_at:
+            worker.failures += 1
+            worker.restart_at = now + min(2 ** (worker.failures - 1), MAX_RESTART_DELAY)
+            log_error(f"🚨 Clone shard {worker.shard} is down (exit code {worker.process.exitcode}); restarting in {worker.restart_at - now:.0f}s")
+        if now >= worker.restart_at:
+            worker.restart_at = 0
+            self._spawn(worker)
+            logger.info(f"🔄 Restarted clone shard {worker.shard} (attempt {worker.failures})! 🧭")
+
+    def owner(self, token):
+        return self.workers[self.ring.owner(token)]
+
+    def add_clone(self, token):
+        """➕ Start a newly added clone on the shard that owns its token; True once it runs."""
+        worker = self.owner(token)
+        started = self._call(worker, "start", token, timeout=START_TIMEOUT)
+        if started:
+            worker.states[token] = "active"
+        return bool(started)
+
+    def remove_clone(self, token):
+        """➖ Stop a clone on the shard that owns its token."""
+        worker = self.owner(token)
+        worker.states.pop(token, None)
+        return bool(self._call(worker, "remove", token))
+
+    def update_clone(self, token):
+        """🔧 Have the owning shard re-read a clone's entry and apply it in place."""
+        return bool(self._call(self.owner(token), "update", token))
+
+    def states(self):
+        """📊 {token: state} across all shards, as of their last health check."""
+        states = {}
+        for worker in self.workers:
+            states.update(worker.states)
+        return states
+
+    def stop(self):
+        """🛑 Ask every shard to shut down cleanly, killing any that don't."""
+        self._stopped.set()
+        for worker in self.workers:
+            if worker.process.is_alive():
+                self._call(worker, "stop")
+                worker.process.join(timeout=10)
+                self._kill(worker)
+
+_supervisor = None
+
+def start_clone_supervisor(processes, target, args=()):
+    """🧭 Start the process-wide clone supervisor."""
+    global _supervisor
+    _supervisor = CloneSupervisor(processes, target, args)
+    _supervisor.start()
+    return _supervisor
+
+def get_clone_supervisor():
+    """🧭 The running clone supervisor, or None when clones run in this process."""
+    return _supervisor
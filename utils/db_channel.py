@@ -1,10 +1,33 @@
+import atexit
 import json
 import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
 from utils.logging_utils import log_error
 
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
 SETTINGS_FILE = "config/settings.json"
 CLONED_BOTS_FILE = "config/cloned_bots.json"
 FILES_FILE = "config/files.json"
+SQLITE_FILE = os.getenv("SQLITE_FILE", "config/bot.db")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")  # "json", "journal" or "sqlite"
+JOURNAL_FSYNC_INTERVAL = float(os.getenv("JOURNAL_FSYNC_INTERVAL", "0.05"))  # Seconds between batched fsyncs
+JOURNAL_COMPACT_BYTES = int(os.getenv("JOURNAL_COMPACT_BYTES", str(8 * 1024 * 1024)))
+# Write-behind for the JSON backend: 0 writes through on every change, otherwise the
+# max seconds a change may wait before it's flushed
+SETTINGS_FLUSH_INTERVAL = float(os.getenv("SETTINGS_FLUSH_INTERVAL", "0"))
+SETTINGS_FLUSH_MAX_DIRTY = int(os.getenv("SETTINGS_FLUSH_MAX_DIRTY", "100"))  # Flush early after this many changes
+SETTINGS_FLUSH_MIN_GAP = float(os.getenv("SETTINGS_FLUSH_MIN_GAP", "0.25"))  # Never flush more often than this
+
+# Keys that hold the big catalogs; the SQLite backend keeps each in its own table
+COLLECTION_KEYS = ("stored_files", "batches", "files", "cloned_bots")
 
 def load_json(file_path, default):
     """📂 Load JSON file with error handling."""
@@ -17,25 +40,865 @@ def load_json(file_path, default):
         log_error(f"🚨 Error loading {file_path}: {str(e)}")
         return default
 
+def _write_atomic(file_path, text):
+    """🛡️ Write a file via temp file + fsync + rename so readers never see a torn write."""
+    tmp_path = f"{file_path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 def save_json(file_path, data):
     """💾 Save JSON file with error handling."""
     try:
-        with open(file_path, "w") as f:
-            json.dump(data, f, indent=4)
+        _write_atomic(file_path, json.dumps(data, indent=4))
     except Exception as e:
         log_error(f"🚨 Error saving {file_path}: {str(e)}")
 
+def _file_stamp(file_path):
+    """🕒 Return (mtime, size) of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(file_path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def _detach(value):
+    """✂️ Shallow-copy containers so callers can mutate them before set_setting."""
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+_cloned_bots_file = (None, [])  # (stamp, entries) of CLONED_BOTS_FILE as last parsed
+_cloned_bots_file_lock = threading.Lock()
+
+def _load_cloned_bots_file():
+    """📂 Entries of cloned_bots.json, re-parsed only when its mtime/size changes."""
+    global _cloned_bots_file
+    stamp = _file_stamp(CLONED_BOTS_FILE)
+    with _cloned_bots_file_lock:
+        if stamp != _cloned_bots_file[0]:
+            bots = load_json(CLONED_BOTS_FILE, []) if stamp else []
+            _cloned_bots_file = (stamp, bots if isinstance(bots, list) else [])
+        return _cloned_bots_file[1]
+
+def _merge_bots(*bot_lists):
+    """🤝 Merge cloned bot lists, keeping the first entry seen for each token."""
+    merged, seen = [], set()
+    for bots in bot_lists:
+        for bot in bots or []:
+            if bot.get("token") and bot["token"] not in seen:
+                seen.add(bot["token"])
+                merged.append(bot)
+    return merged
+
+class SettingsStore:
+    """🧠 Process-wide in-memory copy of a JSON settings file.
+
+    The file is parsed once and reads are served from memory. Writes go
+    through to disk immediately, and the file is only re-parsed when its
+    mtime/size changes (e.g. edited by hand or by another instance).
+    Writes hold the store lock plus an flock on settings.json.lock, so
+    read-modify-write cycles are atomic across threads and processes.
+
+    With a flush_interval the store is write-behind instead: changes apply
+    in memory at once and a background thread writes them out in coalesced
+    batches, after flush_interval seconds or max_dirty changes, but never
+    more often than every min_gap seconds. While changes are pending,
+    external edits to the file are not reloaded (ours win on the next
+    flush), so use write-behind with a single process.
+    """
+
+    # Lookup indexes over the in-memory catalogs: name -> (catalog key, field, unique)
+    # Unique indexes map id -> first entry; the others map id -> entries in insertion order
+    INDEXES = {
+        "file_by_message": ("stored_files", "message_id", True),
+        "files_by_user": ("stored_files", "user_id", False),
+        "batch_by_id": ("batches", "batch_id", True),
+    }
+
+    def __init__(self, file_path, flush_interval=0, max_dirty=SETTINGS_FLUSH_MAX_DIRTY, min_gap=SETTINGS_FLUSH_MIN_GAP):
+        self.file_path = file_path
+        self._lock = threading.RLock()
+        self._data = None
+        self._stamp = None
+        self._indexes = {}
+        self.lock_path = file_path + ".lock"
+        self._tx_depth = 0
+        self.flush_interval = flush_interval
+        self.max_dirty = max_dirty
+        self.min_gap = min_gap
+        self._dirty = 0
+        self._generation = 0  # Bumped whenever the catalogs may have lost entries (reload or replacement)
+        self._flush_lock = threading.Lock()
+        self._flush_wake = threading.Event()
+        self._flusher = None
+
+    @contextmanager
+    def _transaction(self):
+        """🔐 Hold the store lock (and the lock file) and refresh before a write."""
+        with self._lock:
+            lock_file = None
+            if self._tx_depth == 0 and fcntl:
+                lock_file = open(self.lock_path, "a")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._tx_depth += 1
+            try:
+                self._refresh()
+                yield
+            finally:
+                self._tx_depth -= 1
+                if lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+
+    def _save(self):
+        if not self.flush_interval:
+            save_json(self.file_path, self._data)
+            self._stamp = _file_stamp(self.file_path)
+            return
+        self._dirty += 1
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="settings-flush", daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+        if self._dirty >= self.max_dirty:
+            self._flush_wake.set()
+
+    def flush(self):
+        """💾 Write pending write-behind changes to disk now."""
+        with self._flush_lock:
+            with self._lock:
+                written = self._dirty
+                if not written:
+                    return
+                text = json.dumps(self._data, indent=4)
+            try:
+                _write_atomic(self.file_path, text)
+            except Exception as e:
+                # Still dirty, so the next flush retries and _refresh won't reload over the changes
+                log_error(f"🚨 Error saving {self.file_path}: {str(e)}")
+                return
+            with self._lock:
+                self._dirty -= written  # Changes made during the write stay pending
+                self._stamp = _file_stamp(self.file_path)
+
+    def _flush_loop(self):
+        last_flush = 0
+        while True:
+            self._flush_wake.wait(self.flush_interval)
+            self._flush_wake.clear()
+            # Cap the write rate even when the dirty threshold keeps firing
+            time.sleep(max(0, last_flush + self.min_gap - time.monotonic()))
+            self.flush()
+            last_flush = time.monotonic()
+
+    def _refresh(self):
+        stamp = _file_stamp(self.file_path)
+        if self._data is None or (stamp != self._stamp and not self._dirty):
+            data = load_json(self.file_path, {})
+            self._data = data if isinstance(data, dict) else {}
+            self._stamp = stamp
+            self._indexes = {}
+            self._generation += 1
+
+    def _index(self, name):
+        """🗂️ Return a lookup index over a catalog, building it on first use."""
+        index = self._indexes.get(name)
+        if index is None:
+            index = {}
+            for item in self._data.get(self.INDEXES[name][0]) or []:
+                self._index_item(name, index, item)
+            self._indexes[name] = index
+        return index
+
+    def _index_item(self, name, index, item):
+        _, field, unique = self.INDEXES[name]
+        if not isinstance(item, dict) or item.get(field) is None:
+            return
+        if unique:
+            index.setdefault(str(item[field]), item)
+        else:
+            index.setdefault(str(item[field]), []).append(item)
+
+    def _reindex(self, key, item=None):
+        """🗂️ Add an appended item to the key's indexes, or drop them when the key is replaced."""
+        if item is None and key in ("files", "stored_files"):
+            self._generation += 1
+        for name, (index_key, _, _) in self.INDEXES.items():
+            if index_key != key or name not in self._indexes:
+                continue
+            if item is None:
+                del self._indexes[name]
+            else:
+                self._index_item(name, self._indexes[name], item)
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._refresh()
+            return _detach(self._data.get(key, default))
+
+    def get_stored_file(self, message_id):
+        with self._lock:
+            self._refresh()
+            return _detach(self._index("file_by_message").get(str(message_id)))
+
+    def get_user_files(self, user_id, limit):
+        with self._lock:
+            self._refresh()
+            entries = self._index("files_by_user").get(str(user_id), [])
+            return [_detach(entry) for entry in entries[-limit:]]
+
+    def get_batch(self, batch_id):
+        with self._lock:
+            self._refresh()
+            return _detach(self._index("batch_by_id").get(str(batch_id)))
+
+    def set(self, key, value):
+        with self._transaction():
+            self._data[key] = value
+            self._reindex(key)
+            self._save()
+
+    def update(self, key, fn, default=None):
+        """🔁 Atomically replace a setting with fn(current value); returns the new value."""
+        with self._transaction():
+            value = fn(_detach(self._data.get(key, default)))
+            self.set(key, value)
+            return value
+
+    def _append(self, key, item):
+        with self._transaction():
+            items = self._data.get(key)
+            if not isinstance(items, list):
+                items = []
+            items.append(item)
+            self._data[key] = items
+            self._reindex(key, item)
+            self._save()
+
+    def add_stored_file(self, entry):
+        self._append("stored_files", entry)
+
+    def add_batch(self, entry):
+        self._append("batches", entry)
+
+    def _admin_batch(self, batch_id):
+        """📦 The admin batch ("id" key) with this ID in memory, or None (lock held)."""
+        batches = self._data.get("batches")
+        return next((b for b in batches if isinstance(b, dict) and b.get("id") == batch_id), None) if isinstance(batches, list) else None
+
+    def append_batch_file(self, batch_id, file_id):
+        with self._transaction():
+            batch = self._admin_batch(batch_id)
+            if batch is None:
+                return None
+            batch.setdefault("files", []).append(file_id)
+            self._save()
+            return _detach(batch)
+
+    def put_file(self, name, data):
+        with self._transaction():
+            files = self._data.get("files")
+            if not isinstance(files, dict):
+                files = {}
+            files[name] = data
+            self._data["files"] = files
+            self._save()
+
+    def file_names(self, since=None):
+        """📜 Names added to the files and stored_files catalogs after cursor `since`.
+
+        Returns (names, cursor, complete). complete means `names` is every
+        name, because `since` is None or the catalogs were reloaded or
+        replaced since, and names may have gone away.
+        """
+        with self._lock:
+            self._refresh()
+            files = self._data.get("files")
+            files = files if isinstance(files, dict) else {}
+            stored = self._data.get("stored_files")
+            stored = stored if isinstance(stored, list) else []
+            cursor = (self._generation, len(files), len(stored))
+            complete = since is None or since[0] != self._generation or since[1] > len(files) or since[2] > len(stored)
+            seen_files, seen_stored = (0, 0) if complete else since[1:]
+            names = list(islice(files, seen_files, None)) + [entry.get("file_name") for entry in stored[seen_stored:]]
+            return names, cursor, complete
+
+    def add_cloned_bot(self, bot):
+        with self._transaction():
+            if any(existing["token"] == bot["token"] for existing in self.get_cloned_bots()):
+                return False
+            self._append("cloned_bots", bot)
+            return True
+
+    def get_cloned_bots(self):
+        return _merge_bots(_load_cloned_bots_file(), self.get("cloned_bots", []))
+
+    def invalidate(self):
+        """🔄 Drop the cached copy so the next read re-parses the file."""
+        with self._lock:
+            self._data = None
+            self._stamp = None
+
+class JournalStore(SettingsStore):
+    """📝 settings.json snapshot plus an append-only journal of deltas.
+
+    set_setting journals the key's new value and the add_*/put_file helpers
+    journal just the new item, so a write costs the size of the change
+    instead of the whole catalog. A background thread fsyncs the journal
+    every JOURNAL_FSYNC_INTERVAL seconds and, once it grows past
+    JOURNAL_COMPACT_BYTES, folds it into a fresh snapshot that replaces
+    settings.json atomically. Startup replays snapshot + journal.
+    """
+
+    SEQ_KEY = "__journal_seq__"  # Last journal record folded into the snapshot
+
+    def __init__(self, file_path, fsync_interval=JOURNAL_FSYNC_INTERVAL, compact_bytes=JOURNAL_COMPACT_BYTES):
+        super().__init__(file_path)
+        self.journal_path = file_path + ".journal"
+        self.compacting_path = file_path + ".journal.compacting"
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+        self._seq = 0
+        self._journal = None
+        self._journal_bytes = 0
+        self._unsynced = False
+        self._closed = False
+        self._wake = threading.Event()
+        self._thread = None
+
+    @contextmanager
+    def _transaction(self):
+        # Single-writer: the journal belongs to this process, so the store lock is enough
+        with self._lock:
+            self._refresh()
+            yield
+
+    def _refresh(self):
+        # The journal is the source of truth for this process; load once
+        if self._data is None:
+            self._load()
+
+    def _load(self):
+        data = load_json(self.file_path, {})
+        data = data if isinstance(data, dict) else {}
+        self._seq = data.pop(self.SEQ_KEY, 0)
+        self._data = data
+        interrupted = os.path.exists(self.compacting_path)
+        if interrupted:
+            self._replay(self.compacting_path)
+        self._replay(self.journal_path)
+        if interrupted:
+            # A compaction died before finishing; fold everything into a snapshot now
+            self._write_snapshot(self._snapshot_text())
+            os.remove(self.compacting_path)
+        self._journal = open(self.journal_path, "a")
+        self._journal_bytes = self._journal.tell()
+        self._thread = threading.Thread(target=self._background, name="settings-journal", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _replay(self, path):
+        if not os.path.exists(path):
+            return
+        good_bytes = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    log_error(f"🚨 Ignoring torn journal tail in {path} after {good_bytes} bytes")
+                    break
+                good_bytes += len(line)
+                if record["seq"] > self._seq:
+                    self._apply(record)
+                    self._seq = record["seq"]
+        if good_bytes < os.path.getsize(path):
+            # Drop the torn tail so new records don't get glued onto it
+            with open(path, "r+b") as f:
+                f.truncate(good_bytes)
+
+    def _apply(self, record):
+        op, key = record["op"], record["key"]
+        if op == "set":
+            self._data[key] = record["value"]
+            self._reindex(key)
+        elif op == "append":
+            items = self._data.get(key)
+            if not isinstance(items, list):
+                items = self._data[key] = []
+            items.append(record["item"])
+            self._reindex(key, record["item"])
+        elif op == "batch_file":
+            batch = self._admin_batch(record["batch_id"])
+            if batch is not None:
+                batch.setdefault("files", []).append(record["item"])
+        elif op == "put":
+            entries = self._data.get(key)
+            if not isinstance(entries, dict):
+                entries = self._data[key] = {}
+            entries[record["name"]] = record["value"]
+
+    def _log(self, record):
+        """🖊️ Apply a delta in memory and append it to the journal (lock held)."""
+        self._apply(record)
+        self._seq += 1
+        record["seq"] = self._seq
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._journal.write(line)
+        self._journal.flush()
+        self._journal_bytes += len(line)
+        self._unsynced = True
+        if self._journal_bytes >= self.compact_bytes:
+            self._wake.set()
+
+    def set(self, key, value):
+        with self._transaction():
+            self._log({"op": "set", "key": key, "value": value})
+
+    def _append(self, key, item):
+        with self._transaction():
+            self._log({"op": "append", "key": key, "item": item})
+
+    def append_batch_file(self, batch_id, file_id):
+        with self._transaction():
+            if self._admin_batch(batch_id) is None:
+                return None
+            self._log({"op": "batch_file", "key": "batches", "batch_id": batch_id, "item": file_id})
+            return _detach(self._admin_batch(batch_id))
+
+    def put_file(self, name, data):
+        with self._transaction():
+            self._log({"op": "put", "key": "files", "name": name, "value": data})
+
+    def invalidate(self):
+        """🔄 The journal keeps memory and disk in sync; nothing to drop."""
+
+    def flush(self):
+        """💾 fsync whatever the journal hasn't synced yet."""
+        if self._journal is not None:
+            self._fsync()
+
+    def _snapshot_text(self):
+        snapshot = dict(self._data)
+        snapshot[self.SEQ_KEY] = self._seq
+        return json.dumps(snapshot, separators=(",", ":"))
+
+    def _write_snapshot(self, text):
+        _write_atomic(self.file_path, text)
+        dir_fd = os.open(os.path.dirname(os.path.abspath(self.file_path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def _fsync(self):
+        with self._lock:
+            if not self._unsynced or self._journal is None:
+                return
+            self._unsynced = False
+            fd = self._journal.fileno()
+        # Only this thread rotates the journal, so the fd stays valid outside the lock
+        os.fsync(fd)
+
+    def _compact(self):
+        with self._lock:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journal.close()
+            os.replace(self.journal_path, self.compacting_path)
+            self._journal = open(self.journal_path, "a")
+            self._journal_bytes = 0
+            self._unsynced = False
+            text = self._snapshot_text()
+        self._write_snapshot(text)
+        os.remove(self.compacting_path)
+
+    def _background(self):
+        while not self._closed:
+            self._wake.wait(self.fsync_interval)
+            self._wake.clear()
+            try:
+                self._fsync()
+                if self._journal_bytes >= self.compact_bytes and not self._closed:
+                    self._compact()
+            except Exception as e:
+                log_error(f"🚨 Settings journal error: {str(e)}")
+
+    def close(self):
+        """🔒 Stop the background thread and fsync whatever is pending."""
+        if self._thread is None or self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        with self._lock:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+class SqliteStore:
+    """🗄️ Embedded SQLite storage for large deployments.
+
+    The catalogs in COLLECTION_KEYS live in their own indexed tables so an
+    upload is a single-row insert; every other setting is a row in a
+    key/value table. get/set keep the same shapes as the JSON backend.
+    Edits to cloned_bots.json are imported on the next get_cloned_bots, so
+    hot reload works as with the JSON backends.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS stored_files (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id TEXT, user_id TEXT, file_name TEXT, data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_stored_files_message_id ON stored_files(message_id);
+        CREATE INDEX IF NOT EXISTS idx_stored_files_user_id ON stored_files(user_id, seq);
+        CREATE INDEX IF NOT EXISTS idx_stored_files_file_name ON stored_files(file_name);
+        CREATE TABLE IF NOT EXISTS batches (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id TEXT, name TEXT, data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_batches_batch_id ON batches(batch_id);
+        CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, data TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS cloned_bots (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            token TEXT UNIQUE NOT NULL, owner_id TEXT, data TEXT NOT NULL
+        );
+    """
+    FILE_TOKENS_KEY = "cloned_bots_file_tokens"  # Tokens cloned_bots.json held at its last import
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._generation = 0  # Bumped when this connection replaces a catalog
+        self._cloned_bots_stamp = None  # Stamp of cloned_bots.json at its last import
+
+    def _insert(self, key, item):
+        data = json.dumps(item)
+        if key == "stored_files":
+            self._conn.execute(
+                "INSERT INTO stored_files (message_id, user_id, file_name, data) VALUES (?, ?, ?, ?)",
+                (str(item.get("message_id")), str(item.get("user_id")), item.get("file_name"), data)
+            )
+        elif key == "batches":
+            batch_id = item.get("batch_id", item.get("id"))
+            self._conn.execute(
+                "INSERT INTO batches (batch_id, name, data) VALUES (?, ?, ?)",
+                (str(batch_id) if batch_id is not None else None, item.get("name"), data)
+            )
+        elif key == "cloned_bots":
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO cloned_bots (token, owner_id, data) VALUES (?, ?, ?)",
+                (item["token"], item.get("owner_id"), data)
+            )
+            return cursor.rowcount > 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in ("stored_files", "batches", "cloned_bots"):
+                rows = self._conn.execute(f"SELECT data FROM {key} ORDER BY seq").fetchall()
+                return [json.loads(row[0]) for row in rows] if rows else default
+            if key == "files":
+                rows = self._conn.execute("SELECT name, data FROM files").fetchall()
+                return {name: json.loads(data) for name, data in rows} if rows else default
+            row = self._conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+            return json.loads(row[0]) if row else default
+
+    @contextmanager
+    def _transaction(self):
+        """🔐 Run a write in one IMMEDIATE transaction (nested calls join the outer one)."""
+        with self._lock:
+            if self._conn.in_transaction:
+                yield
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def set(self, key, value):
+        with self._transaction():
+            if key in COLLECTION_KEYS:
+                # Full replacement of a catalog; prefer the add_* helpers for appends
+                if key == "files":
+                    # New rowids go past the old ones, so file_names cursors see the replacement
+                    last = self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM files").fetchone()[0]
+                    self._conn.execute("DELETE FROM files")
+                    self._conn.executemany(
+                        "INSERT INTO files (rowid, name, data) VALUES (?, ?, ?)",
+                        [(last + i, name, json.dumps(data)) for i, (name, data) in enumerate((value or {}).items(), start=1)]
+                    )
+                else:
+                    self._conn.execute(f"DELETE FROM {key}")
+                    for item in value or []:
+                        self._insert(key, item)
+                if key in ("files", "stored_files"):
+                    self._generation += 1
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                (key, json.dumps(value))
+            )
+
+    def update(self, key, fn, default=None):
+        """🔁 Atomically replace a setting with fn(current value); returns the new value."""
+        with self._transaction():
+            value = fn(self.get(key, default))
+            self.set(key, value)
+            return value
+
+    def add_stored_file(self, entry):
+        with self._lock:
+            self._insert("stored_files", entry)
+
+    def add_batch(self, entry):
+        with self._lock:
+            self._insert("batches", entry)
+
+    def append_batch_file(self, batch_id, file_id):
+        with self._transaction():
+            rows = self._conn.execute("SELECT seq, data FROM batches WHERE batch_id = ? ORDER BY seq", (str(batch_id),)).fetchall()
+            for seq, data in rows:
+                batch = json.loads(data)
+                if batch.get("id") == batch_id:
+                    batch.setdefault("files", []).append(file_id)
+                    self._conn.execute("UPDATE batches SET data = ? WHERE seq = ?", (json.dumps(batch), seq))
+                    return batch
+            return None
+
+    def put_file(self, name, data):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (name, data) VALUES (?, ?)",
+                (name, json.dumps(data))
+            )
+
+    def add_cloned_bot(self, bot):
+        with self._lock:
+            return self._insert("cloned_bots", bot)
+
+    def get_stored_file(self, message_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM stored_files WHERE message_id = ? ORDER BY seq LIMIT 1",
+                (str(message_id),)
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+
+    def get_user_files(self, user_id, limit):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM stored_files WHERE user_id = ? ORDER BY seq DESC LIMIT ?",
+                (str(user_id), limit)
+            ).fetchall()
+            return [json.loads(row[0]) for row in reversed(rows)]
+
+    def get_batch(self, batch_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM batches WHERE batch_id = ? ORDER BY seq", (str(batch_id),)
+            ).fetchall()
+            # Admin batches ("id") share the id space; deep links only resolve "batch_id" ones
+            batches = (json.loads(row[0]) for row in rows)
+            return next((b for b in batches if b.get("batch_id") is not None), None)
+
+    def get_cloned_bots(self):
+        self._import_cloned_bots_file()
+        return self.get("cloned_bots", [])
+
+    def _import_cloned_bots_file(self):
+        """📥 Apply edits to cloned_bots.json since its last import.
+
+        Its entries are added or replace the table's, and entries dropped
+        from the file since then are deleted. Clones added from the menu
+        only live in the table and are left alone, as is everything when the
+        file doesn't exist.
+        """
+        stamp = _file_stamp(CLONED_BOTS_FILE)
+        if stamp is None or stamp == self._cloned_bots_stamp:
+            return
+        bots = _merge_bots(_load_cloned_bots_file())
+        with self._transaction():
+            tokens = [bot["token"] for bot in bots]
+            removed = set(self.get(self.FILE_TOKENS_KEY, [])) - set(tokens)
+            self._conn.executemany("DELETE FROM cloned_bots WHERE token = ?", [(token,) for token in removed])
+            self._conn.executemany(
+                "INSERT INTO cloned_bots (token, owner_id, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(token) DO UPDATE SET owner_id = excluded.owner_id, data = excluded.data WHERE data != excluded.data",
+                [(bot["token"], bot.get("owner_id"), json.dumps(bot)) for bot in bots]
+            )
+            self.set(self.FILE_TOKENS_KEY, tokens)
+        self._cloned_bots_stamp = stamp
+
+    def file_names(self, since=None):
+        """📜 Names added to the files and stored_files tables after cursor `since`.
+
+        Returns (names, cursor, complete) like SettingsStore.file_names; rows
+        gone from below the cursor (a replaced catalog) make it complete.
+        """
+        with self._lock:
+            # data_version moves with every commit from another connection; our own inserts index themselves
+            version = (self._conn.execute("PRAGMA data_version").fetchone()[0], self._generation)
+            if since is not None and since[0] == version:
+                return [], since, False
+            self._conn.execute("BEGIN")  # One snapshot for the counts and the names
+            try:
+                counts = [
+                    self._conn.execute(f"SELECT COALESCE(MAX({column}), 0), COUNT(*) FROM {table}").fetchone()
+                    for table, column in (("files", "rowid"), ("stored_files", "seq"))
+                ]
+                complete = since is None or any(
+                    self._conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {column} <= ?", (last,)).fetchone()[0] != count
+                    for (table, column), (last, count) in zip((("files", "rowid"), ("stored_files", "seq")), (since[1:3], since[3:5]))
+                )
+                seen_files, seen_stored = (0, 0) if complete else (since[1], since[3])
+                names = [row[0] for row in self._conn.execute("SELECT name FROM files WHERE rowid > ? ORDER BY rowid", (seen_files,))]
+                names += [row[0] for row in self._conn.execute("SELECT file_name FROM stored_files WHERE seq > ? ORDER BY seq", (seen_stored,))]
+            finally:
+                self._conn.execute("COMMIT")
+            return names, (version,) + counts[0] + counts[1], complete
+
+    def is_empty(self):
+        with self._lock:
+            for table in ("settings",) + COLLECTION_KEYS:
+                if self._conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                    return False
+            return True
+
+    def invalidate(self):
+        """🔄 Nothing is cached outside SQLite itself."""
+
+    def flush(self):
+        """💾 SQLite commits every write; nothing to flush."""
+
+def migrate_json_to_sqlite(store, settings_file=SETTINGS_FILE, cloned_bots_file=CLONED_BOTS_FILE):
+    """🚚 One-shot import of settings.json and cloned_bots.json into a SqliteStore.
+
+    The import is a single transaction, so a crash or error part-way
+    leaves the database untouched and the next start imports again.
+    """
+    settings = load_json(settings_file, {})
+    cloned_bots = _merge_bots(load_json(cloned_bots_file, []), settings.get("cloned_bots", []))
+    with store._transaction():
+        if store.get("migrated_from_json"):
+            return False
+        for key, value in settings.items():
+            if key != "cloned_bots":
+                store.set(key, value)
+        store.set("cloned_bots", cloned_bots)
+        store.set("migrated_from_json", True)  # Last: only set once everything else is in
+    return True
+
+def _create_store():
+    """🏗️ Build the storage backend selected by STORAGE_BACKEND."""
+    if STORAGE_BACKEND == "sqlite":
+        store = SqliteStore(SQLITE_FILE)
+        if store.is_empty() and (os.path.exists(SETTINGS_FILE) or os.path.exists(CLONED_BOTS_FILE)):
+            migrate_json_to_sqlite(store)
+        return store
+    if STORAGE_BACKEND == "journal":
+        return JournalStore(SETTINGS_FILE)
+    return SettingsStore(SETTINGS_FILE, flush_interval=SETTINGS_FLUSH_INTERVAL)
+
+_settings_store = _create_store()
+
 def get_setting(key, default=None):
-    """🔍 Get a setting from settings.json."""
-    settings = load_json(SETTINGS_FILE, {})
-    return settings.get(key, default)
+    """🔍 Get a setting from the configured storage backend."""
+    return _settings_store.get(key, default)
 
 def set_setting(key, value):
-    """📝 Set a setting in settings.json."""
-    settings = load_json(SETTINGS_FILE, {})
-    settings[key] = value
-    save_json(SETTINGS_FILE, settings)
+    """📝 Set a setting in the configured storage backend."""
+    _settings_store.set(key, value)
+
+def flush_settings():
+    """💾 Push pending writes to disk (call on shutdown)."""
+    _settings_store.flush()
+
+def update_setting(key, fn, default=None):
+    """🔁 Atomically read-modify-write a setting: stores and returns fn(current value).
+
+    Use this instead of get_setting -> mutate -> set_setting, which loses
+    updates when handlers run concurrently (worker pool, clones).
+    """
+    return _settings_store.update(key, fn, default)
+
+def next_sequence(name, start=None):
+    """🔢 Atomically bump and return a named counter.
+
+    `start` is called once, when the counter doesn't exist yet, to seed it
+    from existing data.
+    """
+    def bump(sequences):
+        sequences = sequences or {}
+        if name not in sequences:
+            sequences[name] = start() if start else 0
+        sequences[name] += 1
+        return sequences
+    return update_setting("sequences", bump, {})[name]
+
+def next_batch_id():
+    """🔢 Allocate a batch ID (shared by admin and file-store batches)."""
+    def highest_existing():
+        ids = [str(b.get("batch_id", b.get("id"))) for b in get_setting("batches", []) or []]
+        return max((int(i) for i in ids if i.isdigit()), default=0)
+    return str(next_sequence("batches", highest_existing))
+
+def add_stored_file(entry):
+    """📦 Append one file-store entry to stored_files."""
+    _settings_store.add_stored_file(entry)
+
+def add_batch(entry):
+    """📦 Append one batch to batches."""
+    _settings_store.add_batch(entry)
+
+def append_batch_file(batch_id, file_id):
+    """➕ Add a file to an admin batch in place; returns the updated batch, or None if there's no such batch."""
+    return _settings_store.append_batch_file(batch_id, file_id)
+
+def get_stored_file(message_id):
+    """🔎 Look up a stored file by its storage-channel message ID."""
+    return _settings_store.get_stored_file(message_id)
+
+def file_names_since(since=None):
+    """📜 File names stored after cursor `since`, from any process; returns (names, cursor, complete).
+
+    complete means `names` lists every file name (first call, or names may
+    have been removed since), so the caller should drop names not in it.
+    """
+    return _settings_store.file_names(since)
+
+def get_user_files(user_id, limit=5):
+    """🗃️ Get a user's latest stored files, oldest first."""
+    return _settings_store.get_user_files(user_id, limit)
+
+def get_batch(batch_id):
+    """🔎 Look up a file-store batch by its batch ID."""
+    return _settings_store.get_batch(batch_id)
+
+def put_file(name, data):
+    """📄 Insert or replace one entry of the files catalog."""
+    _settings_store.put_file(name, data)
+
+def add_cloned_bot(bot):
+    """🤖 Register a cloned bot; returns False if its token is already registered."""
+    return _settings_store.add_cloned_bot(bot)
 
 def get_cloned_bots():
     """🤖 Get list of cloned bots."""
-    return load_json(CLONED_BOTS_FILE, [])
+    return _settings_store.get_cloned_bots()
@@ -0,0 +1,48 @@
+import os
+from utils.outbound import get_outbound, log_failure, BULK
+
+FILESTORE_DELIVERY = os.getenv("FILESTORE_DELIVERY", "forward")  # "forward" keeps the 'Forwarded from' header, "copy" sends plain copies
+BULK_DELIVERY = os.getenv("BULK_DELIVERY", "1") != "0"  # 0 for Bot API servers without the bulk methods (before 7.0)
+MAX_MESSAGES_PER_CALL = 100  # forwardMessages/copyMessages limit
+
+def plan_chunks(file_entries, limit=MAX_MESSAGES_PER_CALL):
+    """🧮 Group stored files into runs one bulk call can deliver, keeping their order.
+
+    A run is adjacent files from the same storage chat whose message IDs
+    go strictly up (as the Bot API requires), at most `limit` long.
+    Returns [(from_chat_id, [message_id, ...]), ...].
+    """
+    chunks = []
+    for entry in file_entries:
+        from_chat_id, message_id = str(entry["chat_id"]), int(entry["message_id"])
+        if chunks and chunks[-1][0] == from_chat_id and chunks[-1][1][-1] < message_id and len(chunks[-1][1]) < limit:
+            chunks[-1][1].append(message_id)
+        else:
+            chunks.append((from_chat_id, [message_id]))
+    return chunks
+
+def send_chunk(bot, chat_id, from_chat_id, message_ids):
+    """📨 Forward (or copy) one run of messages with a single Bot API call."""
+    copy = FILESTORE_DELIVERY == "copy"
+    if len(message_ids) == 1:
+        send = bot.copy_message if copy else bot.forward_message
+        return [send(chat_id=chat_id, from_chat_id=from_chat_id, message_id=message_ids[0])]
+    # PTB 13 has no wrappers for the bulk methods, so post them directly
+    return bot._post(
+        "copyMessages" if copy else "forwardMessages",
+        {"chat_id": chat_id, "from_chat_id": from_chat_id, "message_ids": message_ids}
+    )
+
+def deliver_files(bot, chat_id, file_entries, priority=BULK, label="File delivery"):
+    """📦 Queue stored files for `chat_id` as a few bulk calls; returns one Future per call, in order.
+
+    The calls go through the outbound scheduler, one after another in
+    the chat's queue. Failures are logged under `label`.
+    """
+    outbound = get_outbound()
+    futures = []
+    for from_chat_id, message_ids in plan_chunks(file_entries, MAX_MESSAGES_PER_CALL if BULK_DELIVERY else 1):
+        future = outbound.submit(bot, chat_id, lambda f=from_chat_id, m=message_ids: send_chunk(bot, chat_id, f, m), priority)
+        future.add_done_callback(log_failure(f"{label} of {len(message_ids)} messages from {from_chat_id} to {chat_id}"))
+        futures.append(future)
+    return futures
@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from telegram.error import RetryAfter
+from utils.logging_utils import log_error
+
+logger = logging.getLogger(__name__)
+
+OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", "4"))  # Threads sending queued calls for every bot in this process
+OUTBOUND_BOT_RATE = float(os.getenv("OUTBOUND_BOT_RATE", "25"))  # Sends per second per bot (Telegram allows about 30)
+OUTBOUND_INTERACTIVE_RESERVE = 5  # Per-bot tokens bulk sends leave for replies users are waiting on
+OUTBOUND_CHAT_RATE = 1.0  # Sends per second into one private chat
+OUTBOUND_CHAT_BURST = 5  # Sends a private chat can take back to back
+OUTBOUND_GROUP_RATE = 20 / 60  # Sends per second into one group or channel (Telegram: 20 per minute)
+OUTBOUND_GROUP_BURST = 3
+OUTBOUND_MAX_RETRIES = 5  # RetryAfter answers before a call fails
+MAX_BUCKETS = 10000  # Idle (full) buckets are dropped beyond this many
+
+INTERACTIVE = 0  # Replies a user is waiting for
+BULK = 1  # Batch deliveries and broadcasts
+LANES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+class TokenBucket:
+    """🪣 `rate` tokens per second up to `capacity`, or none at all while blocked by a RetryAfter."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now, need=1):
+        """⏳ Seconds until `need` tokens are available (0 if they are now)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        return 0 if self.tokens >= need else (need - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, seconds, now):
+        """⛔ No tokens for `seconds`; then one (for the retry) and refilling from there."""
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 1
+        self.updated = self.blocked_until
+
+    def idle(self, now):
+        return now >= self.blocked_until and self.wait_time(now, self.capacity) == 0
+
+class OutboundJob:
+    __slots__ = ("future", "token", "chat_id", "key", "fn", "lane", "retries")
+
+    def __init__(self, token, chat_id, fn, lane):
+        self.future = Future()
+        self.token = token
+        self.chat_id = chat_id
+        self.key = (token, str(chat_id))  # 123 and "123" are the same chat
+        self.fn = fn
+        self.lane = lane
+        self.retries = 0
+
+class OutboundScheduler:
+    """📤 One queue for outgoing Bot API calls of the main bot and every clone in this process.
+
+    Each call waits for a token from its bot's bucket (OUTBOUND_BOT_RATE)
+    and from its chat's bucket (private chats and groups have their own
+    rates), then runs on a sender thread. Calls to one chat run one at a
+    time and in order, and chats take turns. The interactive lane is always checked
+    first. Bulk sends also leave OUTBOUND_INTERACTIVE_RESERVE of the
+    bot's tokens untouched, so replies never queue behind a big batch.
+    Our own storage channels (add_storage_chat) aren't paced like a
+    group: their bucket runs at the bot's rate and calls into them don't
+    wait for each other. A RetryAfter blocks the chat's bucket and the
+    bot's for the given time and requeues the call at the front.
+    """
+
+    def __init__(self, workers=OUTBOUND_WORKERS):
+        self.workers = workers
+        self._cond = threading.Condition()
+        self._lanes = {lane: OrderedDict() for lane in LANES}  # lane -> (token, chat_id) -> deque of jobs
+        self._depth = {lane: 0 for lane in LANES}
+        self._buckets = {}  # token or (token, chat_id) -> TokenBucket
+        self._sending = set()  # (token, chat_id) keys with a call in flight
+        self._storage_chats = set()  # Chat IDs (str) of the bots' own storage channels
+        self._threads = []
+
+    def submit(self, bot, chat_id, fn, priority=INTERACTIVE):
+        """📥 Queue `fn()` (a call by `bot` into `chat_id`); returns a Future with its result."""
+        job = OutboundJob(bot.token, chat_id, fn, priority)
+        with self._cond:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._work, name=f"outbound-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+            self._lanes[priority].setdefault(job.key, deque()).append(job)
+            self._depth[priority] += 1
+            self._cond.notify()
+        return job.future
+
+    def call(self, bot, chat_id, fn, priority=INTERACTIVE):
+        """📤 Queue `fn()` and wait for its result (or exception)."""
+        return self.submit(bot, chat_id, fn, priority).result()
+
+    def add_storage_chat(self, chat_id):
+        """📦 Treat `chat_id` as our own storage channel: paced at the bot's rate, calls not serialized."""
+        with self._cond:
+            self._storage_chats.add(str(chat_id))
+
+    def depth(self):
+        """📊 Calls waiting per lane, e.g. {"interactive": 0, "bulk": 120}."""
+        with self._cond:
+            return {name: self._depth[lane] for lane, name in LANES.items()}
+
+    def _bucket(self, key, rate, capacity):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                now = time.monotonic()
+                for idle_key in [k for k, b in self._buckets.items() if b.idle(now)]:
+                    del self._buckets[idle_key]
+            bucket = self._buckets[key] = TokenBucket(rate, capacity)
+        return bucket
+
+    def _bot_bucket(self, token):
+        return self._bucket(token, OUTBOUND_BOT_RATE, max(OUTBOUND_BOT_RATE, 1 + OUTBOUND_INTERACTIVE_RESERVE))
+
+    def _chat_bucket(self, key):
+        if key[1] in self._storage_chats:
+            return self._bucket(key, OUTBOUND_BOT_RATE, max(OUTBOUND_BOT_RATE, 1))
+        if key[1].startswith(("-", "@")):  # Groups and channels
+            return self._bucket(key, OUTBOUND_GROUP_RATE, OUTBOUND_GROUP_BURST)
+        return self._bucket(key, OUTBOUND_CHAT_RATE, OUTBOUND_CHAT_BURST)
+
+    def _next_job(self):
+        """🎯 Pop the first job whose buckets allow it now; otherwise (None, seconds until one might)."""
+        now = time.monotonic()
+        soonest = None
+        for lane in sorted(LANES):
+            need = 1 if lane == INTERACTIVE else 1 + OUTBOUND_INTERACTIVE_RESERVE
+            queues = self._lanes[lane]
+            for key, jobs in queues.items():
+                if key in self._sending and key[1] not in self._storage_chats:
+                    continue  # Its previous call must finish first to keep the order
+                bot_bucket = self._bot_bucket(key[0])
+                chat_bucket = self._chat_bucket(key)
+                wait = max(bot_bucket.wait_time(now, need), chat_bucket.wait_time(now))
+                if wait == 0:
+                    bot_bucket.take(now)
+                    chat_bucket.take(now)
+                    job = jobs.popleft()
+                    if jobs:
+                        queues.move_to_end(key)  # Other chats go next
+                    else:
+                        del queues[key]
+                    self._depth[lane] -= 1
+                    self._sending.add(key)
+                    return job, None
+                soonest = wait if soonest is None else min(soonest, wait)
+        return None, soonest
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job, wait = self._next_job()
+                while job is None:
+                    self._cond.wait(wait)
+                    job, wait = self._next_job()
+            self._run(job)
+
+    def _run(self, job):
+        try:
+            result = job.fn()
+        except RetryAfter as e:
+            if job.retries >= OUTBOUND_MAX_RETRIES:
+                job.future.set_exception(e)
+                return
+            job.retries += 1
+            logger.warning(f"⚠️ Flood limit for bot with token ending {job.token[-4:]} in chat {job.chat_id}; retrying in {e.retry_after}s")
+            with self._cond:
+                now = time.monotonic()
+                self._chat_bucket(job.key).block(e.retry_after, now)
+                self._bot_bucket(job.token).block(e.retry_after, now)  # Telegram throttles the whole bot, not just this chat
+                queues = self._lanes[job.lane]
+                queues.setdefault(job.key, deque()).appendleft(job)
+                self._depth[job.lane] += 1
+        except BaseException as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+        finally:
+            with self._cond:
+                self._sending.discard(job.key)
+                self._cond.notify_all()
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_outbound():
+    """📤 The process-wide outbound scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = OutboundScheduler()
+        return _scheduler
+
+def log_failure(what):
+    """🚨 A Future callback that logs a failed send nobody waits on."""
+    def callback(future):
+        if future.exception():
+            log_error(f"🚨 {what} failed: {str(future.exception())}")
+    return callback
+
+def send_message(bot, chat_id, text, priority=INTERACTIVE, **kwargs):
+    """💬 bot.send_message through the outbound scheduler."""
+    return get_outbound().call(bot, chat_id, lambda: bot.send_message(chat_id=chat_id, text=text, **kwargs), priority)
+
+def forward_message(bot, chat_id, from_chat_id, message_id, priority=INTERACTIVE, **kwargs):
+    """📨 bot.forward_message through the outbound scheduler."""
+    return get_outbound().call(
+        bot, chat_id,
+        lambda: bot.forward_message(chat_id=chat_id, from_chat_id=from_chat_id, message_id=message_id, **kwargs),
+        priority
+    )
+
+def reply_text(message, text, priority=INTERACTIVE, **kwargs):
+    """💬 message.reply_text through the outbound scheduler."""
+    return get_outbound().call(message.bot, message.chat_id, lambda: message.reply_text(text, **kwargs), priority)
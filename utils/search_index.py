@@ -0,0 +1,218 @@
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from heapq import nlargest
+from itertools import islice
+from utils.db_channel import file_names_since
+
+MAX_PREFIX = 5  # Longest token prefix that gets its own posting list
+MAX_CANDIDATES = 5000  # Newest matches ranked per query; older ones are skipped
+FUZZY_THRESHOLD = 0.3  # Minimum trigram similarity for a typo'd token to count as a match
+FUZZY_EXPANSIONS = 5  # Most similar vocabulary tokens tried per query token
+TOKEN_RE = re.compile(r"\w+")
+
+def normalize(text):
+    """🔡 Lowercase and strip accents so 'Café' and 'cafe' match."""
+    text = str(text).lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+def tokenize(text):
+    """✂️ Split a file name or query into normalized word tokens."""
+    return TOKEN_RE.findall(normalize(text))
+
+def trigrams(token):
+    """🔤 Padded character trigrams of a token ('cat' -> '  c', ' ca', 'cat', 'at ')."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _newest_common(postings, limit):
+    """🤝 Intersect posting lists, returning up to `limit` doc IDs, newest first."""
+    if len(postings) == 1:
+        return postings[0][::-1][:limit]
+    common = set(postings[0])
+    for other in postings[1:]:
+        common.intersection_update(other)
+        if not common:
+            return []
+    return sorted(common, reverse=True)[:limit]
+
+def _contains(postings, doc_id):
+    """🔎 Binary-search a sorted posting list."""
+    i = bisect_left(postings, doc_id)
+    return i < len(postings) and postings[i] == doc_id
+
+class SearchIndex:
+    """🔍 Tokenized inverted index over file names.
+
+    Every name is split into tokens; each token gets a posting list, and so
+    does each of its prefixes up to MAX_PREFIX characters, so "mov" finds
+    "Movie.2023.mkv". Doc IDs grow with insertion, which keeps posting lists
+    sorted (newest last). When nothing matches exactly, query tokens are
+    expanded to similar vocabulary tokens through a trigram index over the
+    distinct tokens, so "intrstellar" still finds "Interstellar".
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._names = []  # doc_id -> original name
+        self._doc_ids = {}  # name -> doc_id
+        self._tokens = {}  # full token -> posting list
+        self._prefixes = {}  # token prefix (<= MAX_PREFIX chars) -> posting list
+        self._vocab = []  # vocab_id -> distinct token
+        self._vocab_grams = array("H")  # vocab_id -> number of trigrams
+        self._trigrams = {}  # trigram -> vocab_ids containing it
+
+    def __len__(self):
+        return len(self._names)
+
+    def names(self):
+        """📜 Every indexed name, oldest first."""
+        with self._lock:
+            return list(self._names)
+
+    def add(self, name):
+        """➕ Index a file name (no-op if it's already indexed)."""
+        if not name:
+            return
+        with self._lock:
+            if name in self._doc_ids:
+                return
+            doc_id = len(self._names)
+            self._names.append(name)
+            self._doc_ids[name] = doc_id
+            grams = set()
+            for token in set(tokenize(name)):
+                if token not in self._tokens:
+                    self._add_vocab(token)
+                self._tokens.setdefault(token, array("I")).append(doc_id)
+                grams.update(token[:i] for i in range(1, min(len(token), MAX_PREFIX) + 1))
+            for gram in grams:
+                self._prefixes.setdefault(gram, array("I")).append(doc_id)
+
+    def _add_vocab(self, token):
+        vocab_id = len(self._vocab)
+        self._vocab.append(token)
+        grams = trigrams(token)
+        self._vocab_grams.append(min(len(grams), 65535))
+        for gram in grams:
+            self._trigrams.setdefault(gram, array("I")).append(vocab_id)
+
+    def similar_tokens(self, token, limit=FUZZY_EXPANSIONS):
+        """🔤 Vocabulary tokens most similar to `token` as [(token, similarity)]."""
+        grams = trigrams(token)
+        with self._lock:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._trigrams.get(gram, ()))
+            scored = []
+            for vocab_id, common in shared.items():
+                similarity = common / (len(grams) + self._vocab_grams[vocab_id] - common)
+                if similarity >= FUZZY_THRESHOLD:
+                    scored.append((similarity, self._vocab[vocab_id]))
+            return [(vocab_token, similarity) for similarity, vocab_token in nlargest(limit, scored)]
+
+    def _postings(self, token):
+        """📋 Posting list of docs with a token starting with `token`."""
+        return self._prefixes.get(token[:MAX_PREFIX], array("I"))
+
+    def _score(self, doc_id, query_tokens, phrase):
+        name = self._names[doc_id]
+        exact = sum(1 for token in query_tokens if _contains(self._tokens.get(token, ()), doc_id))
+        in_phrase = bool(phrase) and phrase in normalize(name)
+        # Exact token hits first, then whole-phrase hits, then shorter (more specific) names
+        return (exact, in_phrase, -len(name), doc_id)
+
+    def _fuzzy_search(self, query_tokens, limit):
+        """🔤 Rank docs by trigram similarity of their tokens to the query tokens."""
+        expansions = [self.similar_tokens(token) for token in set(query_tokens)]
+        expansions = [expansion for expansion in expansions if expansion]
+        if not expansions:
+            return []
+        doc_sets = []
+        for expansion in expansions:
+            docs = set()
+            for vocab_token, _ in expansion:
+                docs.update(self._tokens[vocab_token])
+            doc_sets.append(docs)
+        # Prefer docs that match every query token; fall back to any of them
+        candidates = set.intersection(*doc_sets) or set.union(*doc_sets)
+        candidates = sorted(candidates, reverse=True)[:MAX_CANDIDATES]
+
+        def score(doc_id):
+            total = sum(
+                max((similarity for vocab_token, similarity in expansion
+                     if _contains(self._tokens[vocab_token], doc_id)), default=0)
+                for expansion in expansions
+            )
+            return (total, -len(self._names[doc_id]), doc_id)
+
+        ranked = nlargest(limit, candidates, key=score)
+        return [self._names[doc_id] for doc_id in ranked]
+
+    def search(self, query, limit=50, fuzzy=True):
+        """🔎 Return up to `limit` names matching every query token, best first.
+
+        With `fuzzy`, a query with no exact (prefix) match is retried with
+        trigram similarity so typos still find something.
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+        with self._lock:
+            postings = sorted((self._postings(token) for token in set(query_tokens)), key=len)
+            if not postings[0]:
+                return self._fuzzy_search(query_tokens, limit) if fuzzy else []
+            long_tokens = [token for token in set(query_tokens) if len(token) > MAX_PREFIX]
+            if long_tokens:
+                # Prefix postings stop at MAX_PREFIX chars; check the full token on the candidates
+                matches = (
+                    doc_id for doc_id in _newest_common(postings, len(self._names))
+                    if all(any(t.startswith(token) for t in tokenize(self._names[doc_id])) for token in long_tokens)
+                )
+                candidates = list(islice(matches, MAX_CANDIDATES))
+            else:
+                candidates = _newest_common(postings, MAX_CANDIDATES)
+            if not candidates:
+                return self._fuzzy_search(query_tokens, limit) if fuzzy else []
+            # Only multi-word queries get the (costlier) phrase bonus
+            phrase = normalize(query).strip() if len(query_tokens) > 1 else ""
+            ranked = nlargest(limit, candidates, key=lambda doc_id: self._score(doc_id, query_tokens, phrase))
+            return [self._names[doc_id] for doc_id in ranked]
+
+_index = None
+_index_cursor = None  # Where the index is in the store's catalogs
+_index_lock = threading.Lock()
+
+def get_search_index():
+    """🗂️ Return the process-wide search index, built from storage on first use.
+
+    Each call first adds whatever was stored since the last one, by this
+    process or another (clone shards share the store), so the index never
+    falls behind. When the store reloaded or replaced a catalog, the index
+    is rebuilt if any of its names are gone.
+    """
+    global _index, _index_cursor
+    with _index_lock:
+        names, _index_cursor, complete = file_names_since(_index_cursor)
+        if _index is not None and complete:
+            current = set(names)
+            if any(name not in current for name in _index.names()):
+                _index = None  # Posting lists only grow, so start over
+        if _index is None:
+            _index = SearchIndex()
+        for name in names:
+            _index.add(name)
+        return _index
+
+def index_file_name(name):
+    """➕ Add a newly stored file name to the search index (if it has been built)."""
+    with _index_lock:  # Wait out an in-flight build so the name isn't missed
+        index = _index
+    if index is not None:
+        index.add(name)
@@ -0,0 +1,195 @@
+import array
+import bisect
+import logging
+import os
+import struct
+import threading
+from utils.logging_utils import log_error
+
+logger = logging.getLogger(__name__)
+
+USER_REGISTRY_FILE = os.getenv("USER_REGISTRY_FILE", "config/users.log")
+USER_MERGE_PENDING = 1024  # New IDs buffered per bot (or 1/64 of its users, if more) before a merge into the sorted array
+USER_ITER_CHUNK = 1000  # IDs copied out per lock hold while streaming
+USER_READ_RECORDS = 1 << 20  # Log records applied per pass when catching up (startup replays the whole log)
+
+SEEN, BLOCKED = 1, 2  # Record kinds: the user used the bot / the bot can't reach them
+RECORD = struct.Struct("<Bqq")  # kind, bot ID, user ID: 17 bytes per change
+
+def bot_id_of(token):
+    """🔢 A bot's numeric ID, the part of its token before the colon."""
+    return int(token.split(":", 1)[0])
+
+class IdSet:
+    """🔢 A set of int IDs kept as a sorted array('q'), 8 bytes per ID.
+
+    New IDs wait in a small set and are merged into the array in one sort
+    pass once the set holds USER_MERGE_PENDING IDs or 1/64 of the array,
+    so adding stays cheap however big the array gets.
+    """
+
+    __slots__ = ("ids", "pending")
+
+    def __init__(self):
+        self.ids = array.array("q")
+        self.pending = set()
+
+    def __contains__(self, value):
+        if value in self.pending:
+            return True
+        i = bisect.bisect_left(self.ids, value)
+        return i < len(self.ids) and self.ids[i] == value
+
+    def __len__(self):
+        return len(self.ids) + len(self.pending)
+
+    def add(self, value):
+        if value not in self:
+            self.pending.add(value)
+            if len(self.pending) >= max(USER_MERGE_PENDING, len(self.ids) >> 6):
+                self.merge()
+
+    def update(self, values):
+        """➕ Add many IDs with at most one merge."""
+        self.pending.update(value for value in set(values) if value not in self)
+        if len(self.pending) >= max(USER_MERGE_PENDING, len(self.ids) >> 6):
+            self.merge()
+
+    def discard(self, value):
+        self.pending.discard(value)
+        i = bisect.bisect_left(self.ids, value)
+        if i < len(self.ids) and self.ids[i] == value:
+            del self.ids[i]
+
+    def merge(self):
+        if self.pending:
+            merged = self.ids.tolist()
+            merged.extend(self.pending)
+            merged.sort()  # One long sorted run plus a short tail: timsort merges it in linear time
+            self.ids = array.array("q", merged)
+            self.pending = set()
+
+    def after(self, value, limit):
+        """📜 Up to `limit` IDs above `value`, ascending."""
+        self.merge()
+        i = bisect.bisect_right(self.ids, value)
+        return self.ids[i:i + limit]
+
+class UserRegistry:
+    """👥 Which users each bot (main bot and clones) has seen, shared by all of them.
+
+    Changes are 17-byte records appended to one log file: a user seen by a
+    bot for the first time, or found blocked. Nothing else is ever written,
+    so the log only grows with new users. Memory holds an IdSet of users
+    and of blocked users per bot, rebuilt from the log at startup. Before
+    every read the registry reads whatever the log gained since the last
+    read, so clone worker processes appending to the same file stay in
+    sync. A user seen again after being blocked is reachable again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._users = {}  # bot ID -> IdSet of users
+        self._blocked = {}  # bot ID -> IdSet of users the bot can't reach
+        self._fd = None
+        self._reader = None
+        self._offset = 0
+
+    def _open(self):
+        if self._fd is not None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        size = os.fstat(self._fd).st_size
+        if size % RECORD.size:
+            # Appends from live processes are whole records, so a partial one is a crash leftover
+            log_error(f"🚨 Dropping a torn record at the end of {self.path}")
+            os.ftruncate(self._fd, size - size % RECORD.size)
+        self._reader = open(self.path, "rb")
+
+    def _catch_up(self):
+        """📥 Apply records appended since the last read, ours or another process's (lock held)."""
+        self._open()
+        size = os.fstat(self._fd).st_size
+        while size - self._offset >= RECORD.size:
+            self._reader.seek(self._offset)
+            data = self._reader.read(min(size - self._offset, USER_READ_RECORDS * RECORD.size))
+            data = data[:len(data) - len(data) % RECORD.size]
+            seen = {}  # bot ID -> user IDs, added in one go: set membership doesn't depend on order
+            for kind, bot_id, user_id in RECORD.iter_unpack(data):
+                if kind == SEEN:
+                    seen.setdefault(bot_id, []).append(user_id)
+                    blocked = self._blocked.get(bot_id)
+                    if blocked and user_id in blocked:
+                        blocked.discard(user_id)
+                elif kind == BLOCKED:
+                    self._blocked.setdefault(bot_id, IdSet()).add(user_id)
+            for bot_id, user_ids in seen.items():
+                self._users.setdefault(bot_id, IdSet()).update(user_ids)
+            self._offset += len(data)
+
+    def _append(self, kind, bot_id, user_ids):
+        if user_ids:
+            os.write(self._fd, b"".join(RECORD.pack(kind, bot_id, user_id) for user_id in user_ids))
+            self._catch_up()
+
+    def record(self, bot_id, user_id):
+        """✍️ Note that `user_id` used the bot; returns True if that's news (new, or back after blocking it)."""
+        user_id = int(user_id)
+        with self._lock:
+            self._catch_up()
+            if user_id in self._users.get(bot_id, ()) and user_id not in self._blocked.get(bot_id, ()):
+                return False
+            self._append(SEEN, bot_id, [user_id])
+            return True
+
+    def mark_blocked(self, bot_id, user_ids):
+        """🚫 Note users the bot can't reach anymore; fan-out jobs skip them until they come back."""
+        with self._lock:
+            self._catch_up()
+            blocked = self._blocked.get(bot_id, ())
+            self._append(BLOCKED, bot_id, [int(u) for u in user_ids if int(u) not in blocked])
+
+    def is_known(self, bot_id, user_id):
+        with self._lock:
+            self._catch_up()
+            return int(user_id) in self._users.get(bot_id, ())
+
+    def counts(self):
+        """📊 {bot ID: (users, blocked)} for every bot with users."""
+        with self._lock:
+            self._catch_up()
+            return {bot_id: (len(users), len(self._blocked.get(bot_id, ()))) for bot_id, users in self._users.items()}
+
+    def iter_users(self, bot_id, after=0, skip_blocked=True):
+        """📜 Stream a bot's user IDs above `after` in ascending order, without holding the lock between chunks."""
+        while True:
+            with self._lock:
+                self._catch_up()
+                users = self._users.get(bot_id)
+                chunk = users.after(after, USER_ITER_CHUNK) if users is not None else ()
+                if not chunk:
+                    return
+                blocked = self._blocked.get(bot_id, ()) if skip_blocked else ()
+                reachable = [user_id for user_id in chunk if user_id not in blocked]
+            yield from reachable
+            after = chunk[-1]
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_user_registry():
+    """👥 The process-wide user registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = UserRegistry(USER_REGISTRY_FILE)
+        return _registry
+
+def record_user(bot, user_id):
+    """✍️ Note that `user_id` used `bot`; never lets a registry problem break the handler."""
+    try:
+        get_user_registry().record(bot_id_of(bot.token), user_id)
+    except Exception as e:
+        log_error(f"🚨 Failed to record user {user_id}: {str(e)}")